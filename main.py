@@ -1,119 +1,489 @@
+import argparse
 import asyncio
+import itertools
 import logging
+import os
+import signal
 import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 
 import dotenv
 
 from src import config
-from src.gemini_api import generate_transcript, generate_article
+from src.batch import run_batch
+from src.cache import ContentCache
+from src.gemini_api import close_clients
 from src.logger import configure_logging
-from src.youtube import get_playlist_video_infos, remove_from_playlist
-from src.md_writer import save_transcript_to_markdown
+from src.metrics import METRICS, write_run_report
+from src.pipeline import VideoJob, VideoPipeline
+from src.scheduler import VideoScheduler
+from src.youtube import PlaylistPoller, iter_playlists_video_infos
 from src.file_mover import move_files_to_vault, cleanup_empty_directories
+from src.state_store import StateStore
+from src.vault_index import VaultIndex
+from src.work_queue import WorkQueue
 
 dotenv.load_dotenv()
 
 logger = logging.getLogger(__name__)
 GEMINI_API_KEY = config.GEMINI_API_KEY
 if not GEMINI_API_KEY:
-    logger.error("環境変数 GEMINI_API_KEY が設定されていません。")
+    logger.error(
+        "環境変数 GEMINI_API_KEY（または GEMINI_API_KEYS）が設定されていません。"
+    )
     sys.exit(1)
 
 
-async def process_video(
-    video: Dict[str, str], index: int, total: int, semaphore: asyncio.Semaphore
-) -> bool:
+def _folders() -> List[str]:
+    """保存先フォルダの一覧（重複なし、Vault・output/からの相対パス）"""
+    return list(dict.fromkeys(folder for _, folder in config.PLAYLISTS)) or [""]
+
+
+def _join_folder(base: str, folder: str) -> str:
+    """ベースディレクトリと保存先フォルダを結合"""
+    return os.path.join(base, folder) if folder else base
+
+
+async def _open_vault_indexes() -> Tuple[bool, Dict[str, VaultIndex]]:
+    """
+    保存先フォルダごとにVaultのノート索引を作成（1回の走査でファイル名と動画IDを読み込む）
+
+    Returns:
+        (処理を続行できるか, 保存先フォルダ -> ノート索引（Vault未設定の場合は空）) のタプル
     """
-    動画を非同期で処理する
+    if not config.OBSIDIAN_VAULT_PATH:
+        if config.DIRECT_TO_VAULT:
+            logger.warning(
+                "OBSIDIAN_VAULT_PATHが設定されていないため、output/に保存します。"
+            )
+        return True, {}
+
+    if config.DIRECT_TO_VAULT and not os.path.isdir(config.OBSIDIAN_VAULT_PATH):
+        logger.error(f"保存先のVaultが存在しません: {config.OBSIDIAN_VAULT_PATH}")
+        return False, {}
+
+    vault_indexes = {}
+    for folder in _folders():
+        vault_indexes[folder] = await asyncio.to_thread(
+            VaultIndex, _join_folder(config.OBSIDIAN_VAULT_PATH, folder)
+        )
+    return True, vault_indexes
+
+
+async def _submit_scheduled(
+    pipeline: VideoPipeline,
+    scheduler: VideoScheduler,
+    video_count: int,
+    stop: Optional[asyncio.Event] = None,
+) -> int:
+    """
+    スケジューラの順に動画をパイプラインへ投入（トークン予算に達した時点で停止）
 
     Args:
-        video: 動画情報
-        index: 処理順番
-        total: 総動画数
-        semaphore: 同時実行数制限
+        pipeline: 投入先のパイプライン
+        scheduler: 投入待ちの動画を保持するスケジューラ
+        video_count: これまでに投入した動画数
+        stop: 停止要求（設定されたら投入を中断）
 
     Returns:
-        処理成功の可否
+        投入後の動画数
     """
-    async with semaphore:
-        logger.info(f"[{index}/{total}] 処理中: {video['title']}")
+    while stop is None or not stop.is_set():
+        video = scheduler.pop()
+        if video is None:
+            break
+        video_count += 1
+        if await pipeline.submit(VideoJob(video, video_count)):
+            scheduler.charge(video)
+    return video_count
 
-        try:
-            # 文字起こし
-            transcript = await generate_transcript(config.GEMINI_API_KEY, video["url"])
-            if not transcript:
-                logger.warning(f"[{index}/{total}] 文字起こしに失敗: {video['title']}")
-                return False
 
-            # 記事生成
-            article = await generate_article(config.GEMINI_API_KEY, transcript)
-            if not article:
-                logger.warning(f"[{index}/{total}] 記事生成に失敗: {video['title']}")
-                return False
+async def _submit_batch(
+    pipeline: VideoPipeline,
+    scheduler: VideoScheduler,
+    state: StateStore,
+    cache: ContentCache,
+) -> int:
+    """
+    投入する動画を確定し、生成をバッチジョブで行ってからパイプラインへ投入
 
-            # マークダウンファイルに保存（同期処理）
-            saved_path = save_transcript_to_markdown(video, transcript, article)
-            logger.info(f"[{index}/{total}] 保存完了: {saved_path}")
+    バッチジョブの結果はキャッシュに格納されるため、パイプラインでは
+    APIを呼ばずに保存・削除まで進む（失敗した動画のみ通常どおり生成する）。
 
-            # 再生リストから削除（同期処理）
-            remove_from_playlist(video["playlist_item_id"])
+    Returns:
+        投入した動画数
+    """
+    admitted = []
+    while True:
+        video = scheduler.pop()
+        if video is None:
+            break
+        # 他のワーカーが担当する動画はバッチジョブに含めない
+        if pipeline.should_generate(video) and not await pipeline.acquire(video):
+            METRICS.increment("videos_leased_elsewhere")
+            continue
+        admitted.append(video)
+        if pipeline.should_generate(video):
+            scheduler.charge(video)
 
-            return True
+    await run_batch(
+        state, cache, [video for video in admitted if pipeline.should_generate(video)]
+    )
 
-        except Exception as e:
-            logger.error(f"[{index}/{total}] エラー発生: {video['title']} - {e}")
-            return False
+    for video_count, video in enumerate(admitted, 1):
+        await pipeline.submit(VideoJob(video, video_count))
+    return len(admitted)
 
 
-async def main_async() -> None:
-    """非同期メイン処理"""
-    # 再生リストから動画情報一覧を取得
-    video_infos = get_playlist_video_infos()
-    if not video_infos:
-        logger.info("処理する動画がありません。")
-        sys.exit(0)
-    logger.debug(f"対象の動画数: {len(video_infos)}")
+def _open_work_queue() -> Optional[WorkQueue]:
+    """WORK_QUEUE_PATH が設定されている場合は作業キューを開く"""
+    if not config.WORK_QUEUE_PATH:
+        return None
+    work_queue = WorkQueue(config.WORK_QUEUE_PATH)
+    logger.info(
+        f"作業キューで他のワーカーと分担します: {config.WORK_QUEUE_PATH}"
+        f"（ワーカーID: {work_queue.worker_id}）"
+    )
+    return work_queue
 
-    # 同時実行数の制限（APIレート制限対策）
-    semaphore = asyncio.Semaphore(config.MAX_CONCURRENT)
 
-    # 非同期タスクの作成
-    tasks = [
-        process_video(video, i, len(video_infos), semaphore)
-        for i, video in enumerate(video_infos, 1)
-    ]
+def _write_run_report() -> None:
+    """設定された出力先に実行レポートを書き出す"""
+    write_run_report(config.RUN_REPORT_PATH, config.RUN_REPORT_PROMETHEUS_PATH)
 
-    # すべてのタスクを並行実行
-    logger.info(f"並行処理を開始します（最大同時実行数: {config.MAX_CONCURRENT}）")
-    results = await asyncio.gather(*tasks)
 
-    # 処理成功数をカウント
-    processed_count = sum(1 for result in results if result)
+def _move_to_vault(
+    pipeline: VideoPipeline,
+    state: StateStore,
+    vault_indexes: Dict[str, VaultIndex],
+    processed_count: int,
+    file_paths: Optional[List[str]] = None,
+) -> None:
+    """
+    output/に保存したノートをObsidianVaultの保存先フォルダへ移動
 
+    file_paths を指定した場合はそのファイルのみ移動し、output/は削除しない
+    （監視モードで処理中の動画のノートと競合しないようにするため）。
+    """
     if not config.OBSIDIAN_VAULT_PATH:
         logger.info(
             "OBSIDIAN_VAULT_PATHが設定されていません。ファイル移動をスキップします。"
         )
         return
 
-    # 全処理完了後、ObsidianVaultへファイル移動
-    if processed_count > 0:
-        logger.info("全ての処理が完了しました。ファイル移動を開始します。")
-        moved_count = move_files_to_vault("output", config.OBSIDIAN_VAULT_PATH)
-        if moved_count > 0:
-            logger.info(f"{moved_count}個のファイルをObsidianVaultに移動しました。")
+    # Vaultへ直接保存した場合は、以前の実行でoutput/に残ったノートのみ移動
+    if config.DIRECT_TO_VAULT and not os.path.isdir("output"):
+        logger.info("ノートはVaultに直接保存済みのため、移動処理は不要です。")
+        return
+
+    if processed_count <= 0 and not config.DIRECT_TO_VAULT:
+        logger.info("処理されたファイルがないため、移動処理をスキップします。")
+        return
+
+    def on_moved(source_path: str, destination: str) -> None:
+        state.mark_moved(source_path, destination)
+        pipeline.forget_output(source_path)
+
+    logger.info("全ての処理が完了しました。ファイル移動を開始します。")
+    moved_count = 0
+    for folder in _folders():
+        source_dir = _join_folder("output", folder)
+        vault_dir = _join_folder(config.OBSIDIAN_VAULT_PATH, folder)
+        paths = None
+        if file_paths is not None:
+            paths = [path for path in file_paths if os.path.dirname(path) == source_dir]
+            if not paths:
+                continue
+        if not os.path.isdir(source_dir):
+            continue
+        if folder and os.path.isdir(config.OBSIDIAN_VAULT_PATH):
+            os.makedirs(vault_dir, exist_ok=True)
+
+        with METRICS.span("move_to_vault"):
+            moved_count += move_files_to_vault(
+                source_dir,
+                vault_dir,
+                on_moved=on_moved,
+                index=vault_indexes.get(folder),
+                update_existing=config.VAULT_EXISTING_NOTE_POLICY == "update",
+                file_paths=paths,
+            )
+        # 空になった保存先フォルダを親フォルダまで順に削除
+        while file_paths is None and folder:
+            cleanup_empty_directories(_join_folder("output", folder))
+            folder = os.path.dirname(folder)
+
+    if moved_count > 0:
+        logger.info(f"{moved_count}個のファイルをObsidianVaultに移動しました。")
+        if file_paths is None:
             cleanup_empty_directories("output")
-        else:
-            logger.info("移動対象のファイルがありませんでした。")
     else:
-        logger.info("処理されたファイルがないため、移動処理をスキップします。")
+        logger.info("移動対象のファイルがありませんでした。")
+
+
+async def main_async(batch: bool = False) -> None:
+    """
+    非同期メイン処理
+
+    Args:
+        batch: 文字起こし・記事生成を Gemini Batch API のジョブでまとめて行う
+    """
+    # 1ページ目を取得し、動画がなければ状態DB・キャッシュ・Geminiに触れずに終了
+    # 複数の再生リストは1件ずつ交互に取り出して公平に投入する
+    videos = iter_playlists_video_infos(
+        [playlist_id for playlist_id, _ in config.PLAYLISTS]
+    )
+    first_video = await anext(videos, None)
+    if first_video is None:
+        logger.info("処理する動画がありません。")
+        return
+
+    # 処理状態ストア（処理済み動画の再処理を防止）
+    state = StateStore(config.STATE_DB_PATH)
+    work_queue = None
+    try:
+        # 生成結果キャッシュ（失敗後の再実行で文字起こし・記事を再利用）
+        cache = ContentCache(config.CACHE_DIR, config.CACHE_MAX_MB * 1024 * 1024)
+
+        ok, vault_indexes = await _open_vault_indexes()
+        if not ok:
+            return
+
+        # 段階ごとに同時実行数を分けたパイプラインで処理
+        work_queue = _open_work_queue()
+        pipeline = VideoPipeline(state, cache, vault_indexes, work_queue=work_queue)
+        pipeline.start()
+
+        # 再生リストの順では、ページ単位で取得しながら届いた動画から順に投入
+        # 短い順・古い順では、全件を取得してから並べ替えて投入
+        scheduler = VideoScheduler(token_budget=config.RUN_TOKEN_BUDGET, state=state)
+        # バッチモードでは全件を取得してから生成をまとめて依頼する
+        streaming = scheduler.streaming and not batch
+        video_count = 0
+        scheduler.push(first_video)
+        if streaming:
+            video_count = await _submit_scheduled(pipeline, scheduler, video_count)
+        async for video in videos:
+            if scheduler.budget_exhausted:
+                break
+            scheduler.push(video)
+            if streaming:
+                video_count = await _submit_scheduled(pipeline, scheduler, video_count)
+        if batch:
+            video_count = await _submit_batch(pipeline, scheduler, state, cache)
+        video_count = await _submit_scheduled(pipeline, scheduler, video_count)
+        if scheduler.budget_exhausted:
+            METRICS.increment("videos_deferred", len(scheduler))
+        if scheduler.retry_waiting or scheduler.dead_lettered:
+            logger.info(
+                "失敗した動画をスキップしました（再試行待ち: %d 件、再試行の打ち切り: %d 件）",
+                scheduler.retry_waiting,
+                scheduler.dead_lettered,
+            )
+            METRICS.increment("videos_retry_waiting", scheduler.retry_waiting)
+            METRICS.increment("videos_dead_letter_skipped", scheduler.dead_lettered)
+        results = await pipeline.join()
+        await close_clients()
+        logger.debug(f"対象の動画数: {video_count}")
+
+        # 処理成功数をカウント
+        processed_count = sum(1 for job in results if job.success)
+
+        # 全処理完了後、ObsidianVaultへファイル移動
+        _move_to_vault(pipeline, state, vault_indexes, processed_count)
+    finally:
+        if work_queue:
+            work_queue.close()
+        state.close()
+
+
+def _install_stop_handlers(stop: asyncio.Event) -> None:
+    """
+    SIGINT/SIGTERM で停止要求を受け付けるシグナルハンドラを登録
+
+    1回目のシグナルで停止要求を出してハンドラを解除するため、
+    2回目のシグナルでは通常どおり即座に終了する。
+    """
+    loop = asyncio.get_running_loop()
+
+    def request_stop() -> None:
+        logger.info("停止要求を受け付けました。処理中の動画の完了を待ちます。")
+        stop.set()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, request_stop)
+        except (NotImplementedError, RuntimeError):
+            # Windows等では未対応のため、Ctrl+Cで即座に終了する
+            pass
+
+
+async def watch_async() -> None:
+    """
+    監視モード: 再生リストを定期的に確認し、追加された動画を処理し続ける
+
+    YouTube・Geminiのクライアントとパイプラインのワーカーを起動し続け、
+    再生リストはETagによる条件付きリクエストで確認する。
+    停止要求を受けると新しい動画の投入をやめ、投入済みの動画の処理完了を待って終了する。
+    """
+    state = StateStore(config.STATE_DB_PATH)
+    work_queue = None
+    try:
+        cache = ContentCache(config.CACHE_DIR, config.CACHE_MAX_MB * 1024 * 1024)
+
+        ok, vault_indexes = await _open_vault_indexes()
+        if not ok:
+            return
+
+        work_queue = _open_work_queue()
+        pipeline = VideoPipeline(state, cache, vault_indexes, work_queue=work_queue)
+        pipeline.start()
+
+        stop = asyncio.Event()
+        _install_stop_handlers(stop)
+
+        pollers = [PlaylistPoller(playlist_id) for playlist_id, _ in config.PLAYLISTS]
+        # トークン予算は監視モードの起動から終了までで1回の実行として扱う
+        # 再試行待ちの動画は投入せず、次に処理できる日時を過ぎた後の確認で投入する
+        scheduler = VideoScheduler(token_budget=config.RUN_TOKEN_BUDGET, state=state)
+        # 投入済み（処理中・処理済み）の再生リスト項目と、処理中の項目
+        submitted: Set[str] = set()
+        in_flight: Set[str] = set()
+        video_count = 0
+        processed_count = 0
+        logger.info(
+            "監視モードを開始します（確認間隔: %d 秒）", config.WATCH_INTERVAL_SECONDS
+        )
+
+        while not stop.is_set():
+            playlists = []
+            for poller in pollers:
+                try:
+                    playlists.append(await asyncio.to_thread(poller.poll))
+                except Exception as e:
+                    logger.error(f"再生リストの確認に失敗: {poller.playlist_id} - {e}")
+
+            if len(playlists) == len(pollers):
+                # 再生リストから削除された項目は記録から外す（全再生リストを確認できた場合のみ）
+                current = {
+                    video["playlist_item_id"]
+                    for videos in playlists
+                    for video in videos
+                }
+                submitted = (submitted & current) | in_flight
+
+            # 各再生リストの未投入の動画を1件ずつ交互に取り出して公平に投入
+            # （短い順・古い順の場合は、今回追加された動画の中で並べ替える）
+            new_videos = [
+                [
+                    video
+                    for video in videos
+                    if video["playlist_item_id"] not in submitted
+                ]
+                for videos in playlists
+            ]
+            for video in itertools.chain.from_iterable(
+                itertools.zip_longest(*new_videos)
+            ):
+                if video is None or not scheduler.push(video):
+                    continue
+                submitted.add(video["playlist_item_id"])
+                in_flight.add(video["playlist_item_id"])
+            video_count = await _submit_scheduled(
+                pipeline, scheduler, video_count, stop
+            )
+            if scheduler.budget_exhausted and not stop.is_set():
+                logger.info(
+                    "推定トークン数が上限に達したため、監視モードを終了します。"
+                )
+                METRICS.increment("videos_deferred", len(scheduler))
+                stop.set()
+
+            # 処理が終了した動画を反映（失敗した動画は次回の確認で再投入）
+            finished = pipeline.take_completed()
+            for job in finished:
+                in_flight.discard(job.video["playlist_item_id"])
+                if not job.success:
+                    submitted.discard(job.video["playlist_item_id"])
+            saved_paths = [
+                job.saved_path
+                for job in finished
+                if job.success and not job.skipped and job.saved_path
+            ]
+            if (
+                saved_paths
+                and config.OBSIDIAN_VAULT_PATH
+                and not config.DIRECT_TO_VAULT
+            ):
+                await asyncio.to_thread(
+                    _move_to_vault,
+                    pipeline,
+                    state,
+                    vault_indexes,
+                    len(saved_paths),
+                    saved_paths,
+                )
+            processed_count += len(saved_paths)
+            # ダッシュボードから途中経過を確認できるよう、確認のたびにレポートを更新
+            await asyncio.to_thread(_write_run_report)
+
+            try:
+                await asyncio.wait_for(stop.wait(), config.WATCH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+        results = await pipeline.join()
+        await close_clients()
+        succeeded = sum(1 for job in results if job.success and not job.skipped)
+        processed_count += succeeded
+        logger.info(f"監視モードを終了します（処理した動画: {processed_count}）")
+        _move_to_vault(pipeline, state, vault_indexes, succeeded)
+    finally:
+        if work_queue:
+            work_queue.close()
+        state.close()
 
 
 def main() -> None:
     """同期的なエントリーポイント"""
-    asyncio.run(main_async())
+    parser = argparse.ArgumentParser(
+        description="YouTube再生リストの動画を文字起こし・記事化してObsidianに保存"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="再生リストを定期的に確認し、追加された動画を処理し続ける",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="文字起こし・記事生成を Gemini Batch API のジョブでまとめて行う（大量の動画向け）",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="失敗した動画の記録を消去し、再試行待ち・再試行を打ち切った動画も処理する",
+    )
+    args = parser.parse_args()
+    if args.watch and args.batch:
+        parser.error("--watch と --batch は同時に指定できません")
+
+    if args.retry_failed:
+        state = StateStore(config.STATE_DB_PATH)
+        logger.info(f"失敗した動画の記録を消去しました: {state.clear_failures()} 件")
+        state.close()
+
+    METRICS.reset()
+    try:
+        if args.watch:
+            asyncio.run(watch_async())
+        else:
+            asyncio.run(main_async(batch=args.batch))
+    finally:
+        _write_run_report()
 
 
 if __name__ == "__main__":
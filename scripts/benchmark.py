@@ -0,0 +1,527 @@
+"""
+オフラインベンチマークスクリプト
+Gemini API・YouTube Data API を疑似バックエンド（fake_backends.py）に置き換えて
+main_async を実行し、スループット・段階ごとのレイテンシ・最大RSSを計測する
+（APIの利用枠を消費しない）
+
+使用方法:
+    uv run python scripts/benchmark.py --videos 100 --concurrency 8
+    uv run python scripts/benchmark.py --videos 100 --sweep 1,2,4,8,16
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fake_backends import (
+    FakeCaptionSource,
+    FakeGeminiClient,
+    FakeYouTube,
+    GeminiProfile,
+    LatencyProfile,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# main.py はAPIキー未設定時に終了するため、計測用のダミー値を設定
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+BENCHMARK_API_KEY = "benchmark"
+BENCHMARK_PLAYLIST_ID = "BENCHMARK"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """プロセスの最大RSS（MB、取得できない環境ではNone）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    疑似バックエンドで main_async を1回実行して計測
+
+    Args:
+        args: コマンドライン引数
+
+    Returns:
+        計測結果の辞書
+    """
+    import main
+    from src import captions, config, gemini_api, key_pool, youtube
+    from src.metrics import METRICS
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark-")
+    os.chdir(work_dir)
+
+    # .env の設定に関わらず、作業ディレクトリ内で完結する設定で実行
+    config.GEMINI_API_KEY = BENCHMARK_API_KEY
+    config.PLAYLIST_ID = BENCHMARK_PLAYLIST_ID
+    config.PLAYLISTS = [(BENCHMARK_PLAYLIST_ID, "")]
+    config.DELETE_FROM_PLAYLIST = True
+    config.OBSIDIAN_VAULT_PATH = ""
+    config.DIRECT_TO_VAULT = False
+    config.STATE_DB_PATH = os.path.join(work_dir, "state.db")
+    config.CACHE_DIR = os.path.join(work_dir, "cache")
+    config.STREAMING_MODE = args.streaming
+    config.TRANSCRIBE_CONCURRENCY = args.concurrency
+    config.ARTICLE_CONCURRENCY = args.article_concurrency or args.concurrency
+    config.GEMINI_RATE_LIMITS = config._parse_rate_limits(args.rate_limits)
+    config.REMOVE_BATCH_WAIT_SECONDS = 0.1
+    config.SCHEDULE_ORDER = args.schedule
+    config.RUN_TOKEN_BUDGET = args.token_budget
+    config.BATCH_POLL_SECONDS = 0.05
+    config.SINGLE_PASS_MODE = args.single_pass
+    config.CAPTIONS_ENABLED = args.caption_rate > 0
+    config.WORK_QUEUE_PATH = args.work_queue
+    if args.deadlines:
+        config.GEMINI_DEADLINES = config._parse_deadlines(args.deadlines)
+    config.HEDGE_STAGES = [stage for stage in args.hedge_stages.split(",") if stage]
+    config.HEDGE_MIN_SECONDS = 0
+    config.ARTICLE_FALLBACK_MODEL = args.article_fallback_model
+
+    youtube._youtube = FakeYouTube(
+        {BENCHMARK_PLAYLIST_ID: args.videos},
+        [int(value) for value in args.durations.split(",") if value],
+        LatencyProfile(args.youtube_latency_ms),
+        seed=args.seed,
+    )
+    # APIキーごとに別の疑似クライアント（レート制限はキーごとに適用される）
+    api_keys = [BENCHMARK_API_KEY] + [
+        f"{BENCHMARK_API_KEY}-{n}" for n in range(2, args.api_keys + 1)
+    ]
+    config.GEMINI_API_KEYS = api_keys
+    clients = [
+        FakeGeminiClient(
+            GeminiProfile(
+                latency=LatencyProfile(args.latency_ms, args.latency_sigma),
+                ms_per_video_minute=args.ms_per_video_minute,
+                error_rate=args.error_rate,
+                rate_limit_rate=args.rate_limit_rate,
+                transcript_chars=args.transcript_chars,
+                article_chars=args.article_chars,
+                max_output_chars=args.max_output_chars,
+                model_latency_ms={
+                    model: float(ms)
+                    for model, ms in (
+                        entry.rsplit("=", 1)
+                        for entry in args.model_latency_ms.split(",")
+                        if entry
+                    )
+                },
+            ),
+            seed=args.seed + n,
+            video_seconds=youtube._youtube.duration_of_url,
+        )
+        for n in range(len(api_keys))
+    ]
+    gemini_api._clients.update(zip(api_keys, clients))
+    key_pool._pools.clear()
+    captions._source = FakeCaptionSource(
+        args.caption_rate,
+        youtube._youtube.duration_of,
+        LatencyProfile(args.youtube_latency_ms),
+        seed=args.seed,
+    )
+
+    # 段階ごとの処理時間・トークン使用量・動画ごとの成否は計測モジュールで記録
+    METRICS.reset()
+    started = time.perf_counter()
+    asyncio.run(main.main_async(batch=args.batch))
+    elapsed = time.perf_counter() - started
+    report = METRICS.snapshot()
+    succeeded = report["counters"].get("videos_succeeded", 0)
+
+    return {
+        "videos": args.videos,
+        "concurrency": args.concurrency,
+        "streaming": args.streaming,
+        "schedule": args.schedule,
+        "batch": args.batch,
+        "single_pass": args.single_pass,
+        "caption_rate": args.caption_rate,
+        "elapsed_seconds": round(elapsed, 3),
+        "succeeded": succeeded,
+        "failed": report["counters"].get("videos_failed", 0),
+        "leased_elsewhere": report["counters"].get("videos_leased_elsewhere", 0),
+        "throughput_per_minute": round(succeeded / elapsed * 60, 2),
+        "first_note_seconds": report["milestones_seconds"].get("first_note_saved"),
+        "api_keys": args.api_keys,
+        "gemini_calls": {
+            model: sum(client.calls.get(model, 0) for client in clients)
+            for model in sorted({model for client in clients for model in client.calls})
+        },
+        "gemini_batch_requests": sum(client.batch_requests for client in clients),
+        "tokens_by_key": {
+            key: usage.get("total", 0)
+            for key, usage in report["tokens"]["by_key"].items()
+        },
+        "transcript_sources": {
+            counter.removeprefix("transcript_source_"): value
+            for counter, value in report["counters"].items()
+            if counter.startswith("transcript_source_")
+        },
+        "article_models": {
+            counter.removeprefix("article_model_"): value
+            for counter, value in report["counters"].items()
+            if counter.startswith("article_model_")
+        },
+        "hedged": {
+            counter.removeprefix("gemini_"): value
+            for counter, value in report["counters"].items()
+            if counter.startswith(("gemini_hedge", "gemini_deadline_exceeded"))
+        },
+        "tokens": report["tokens"]["total"],
+        "stages": {
+            f"{stage}/{label}" if label != "all" else stage: {
+                "count": stats["count"],
+                "p50_ms": round(stats["p50_seconds"] * 1000, 1),
+                "p95_ms": round(stats["p95_seconds"] * 1000, 1),
+                "p99_ms": round(stats["p99_seconds"] * 1000, 1),
+            }
+            for stage, labels in report["stages"].items()
+            for label, stats in labels.items()
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    """計測結果を表示"""
+    print(
+        f"動画数: {result['videos']}  同時実行数: {result['concurrency']}"
+        f"  ストリーミング: {result['streaming']}"
+    )
+    print(
+        f"経過時間: {result['elapsed_seconds']:.2f} s  成功: {result['succeeded']}"
+        f"  失敗: {result['failed']}"
+        f"  スループット: {result['throughput_per_minute']:.1f} 本/分"
+    )
+    if result["peak_rss_mb"] is not None:
+        print(f"最大RSS: {result['peak_rss_mb']:.1f} MB")
+    if result["first_note_seconds"] is not None:
+        print(f"最初のノート保存まで: {result['first_note_seconds']:.2f} s")
+    print(
+        f"Gemini呼び出し回数: {result['gemini_calls']}"
+        f"  バッチリクエスト数: {result['gemini_batch_requests']}"
+    )
+    if result["transcript_sources"]:
+        print(f"文字起こしの取得経路: {result['transcript_sources']}")
+    if result["hedged"]:
+        print(
+            f"ヘッジ・応答期限: {result['hedged']}"
+            f"  記事の生成モデル: {result['article_models']}"
+        )
+    print(f"トークン使用量: {result['tokens']}")
+    if result["api_keys"] > 1:
+        print(f"APIキーごとのトークン使用量: {result['tokens_by_key']}")
+    print(f"{'段階':<40} {'件数':>6} {'p50[ms]':>10} {'p95[ms]':>10} {'p99[ms]':>10}")
+    for stage, stats in result["stages"].items():
+        print(
+            f"{stage:<40} {stats['count']:>6} {stats['p50_ms']:>10.1f}"
+            f" {stats['p95_ms']:>10.1f} {stats['p99_ms']:>10.1f}"
+        )
+
+
+def _child_argv(argv: List[str], option: str) -> List[str]:
+    """子プロセスに渡す引数（option とその値、--json を除く）"""
+    child_argv = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg == option:
+            skip = True
+            continue
+        if arg.startswith(f"{option}=") or arg == "--json":
+            continue
+        child_argv.append(arg)
+    return child_argv
+
+
+def run_workers(args: argparse.Namespace, argv: List[str]) -> None:
+    """
+    作業キュー（WORK_QUEUE_PATH）を共有する複数のワーカープロセスで同じ再生リストを処理
+
+    各ワーカーは同じ内容の疑似再生リストを持つため、作業キューがなければ全員が全件を処理する。
+    処理した動画数の合計が動画数と一致すれば、重複なく分担できている。
+    """
+    import sqlite3
+
+    queue_path = os.path.join(tempfile.mkdtemp(prefix="benchmark-queue-"), "queue.db")
+    base_argv = _child_argv(argv, "--workers")
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                __file__,
+                *base_argv,
+                "--work-queue",
+                queue_path,
+                "--json",
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(args.workers)
+    ]
+    results = []
+    for process in processes:
+        stdout, _ = process.communicate()
+        if process.returncode != 0:
+            raise SystemExit(
+                f"ワーカーが異常終了しました（終了コード {process.returncode}）"
+            )
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+    elapsed = time.perf_counter() - started
+
+    with sqlite3.connect(queue_path) as conn:
+        statuses = dict(
+            conn.execute("SELECT status, COUNT(*) FROM leases GROUP BY status")
+        )
+    processed = sum(result["succeeded"] for result in results)
+    summary = {
+        "workers": args.workers,
+        "videos": args.videos,
+        "elapsed_seconds": round(elapsed, 3),
+        "processed": processed,
+        "duplicates": max(0, processed - statuses.get("done", 0)),
+        "lease_statuses": statuses,
+        "per_worker": [
+            {
+                "succeeded": result["succeeded"],
+                "failed": result["failed"],
+                "leased_elsewhere": result["leased_elsewhere"],
+                "elapsed_seconds": result["elapsed_seconds"],
+            }
+            for result in results
+        ],
+    }
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+        return
+
+    print(
+        f"ワーカー数: {args.workers}  動画数: {args.videos}"
+        f"  経過時間: {summary['elapsed_seconds']:.2f} s"
+    )
+    print(
+        f"処理した動画数の合計: {processed}  重複: {summary['duplicates']}"
+        f"  リースの状態: {statuses}"
+    )
+    print(f"{'ワーカー':>8} {'成功':>6} {'失敗':>6} {'他が担当':>8} {'経過[s]':>10}")
+    for n, worker in enumerate(summary["per_worker"], 1):
+        print(
+            f"{n:>8} {worker['succeeded']:>6} {worker['failed']:>6}"
+            f" {worker['leased_elsewhere']:>8} {worker['elapsed_seconds']:>10.2f}"
+        )
+
+
+def run_sweep(args: argparse.Namespace, argv: List[str]) -> None:
+    """
+    同時実行数ごとに別プロセスでベンチマークを実行して比較
+
+    最大RSSやモジュールの状態が前の実行の影響を受けないよう、1回ずつ別プロセスで実行する。
+    """
+    base_argv = _child_argv(argv, "--sweep")
+    results = []
+    for concurrency in [int(value) for value in args.sweep.split(",") if value]:
+        completed = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                *base_argv,
+                "--concurrency",
+                str(concurrency),
+                "--json",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return
+
+    print(
+        f"{'同時実行数':>10} {'本/分':>10} {'経過[s]':>10} {'失敗':>6}"
+        f" {'文字起こしp95[ms]':>18} {'最大RSS[MB]':>12}"
+    )
+    for result in results:
+        transcribe = result["stages"].get("transcribe", {})
+        print(
+            f"{result['concurrency']:>10} {result['throughput_per_minute']:>10.1f}"
+            f" {result['elapsed_seconds']:>10.2f} {result['failed']:>6}"
+            f" {transcribe.get('p95_ms', 0.0):>18.1f}"
+            f" {result['peak_rss_mb'] or 0.0:>12.1f}"
+        )
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", type=int, default=50, help="再生リストの動画数")
+    parser.add_argument(
+        "--concurrency", type=int, default=3, help="文字起こしの同時実行数"
+    )
+    parser.add_argument(
+        "--article-concurrency",
+        type=int,
+        default=0,
+        help="記事生成の同時実行数（0で --concurrency と同じ）",
+    )
+    parser.add_argument(
+        "--sweep", default="", help="カンマ区切りの同時実行数ごとに実行して比較"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=200, help="Gemini応答時間の中央値（ms）"
+    )
+    parser.add_argument(
+        "--latency-sigma", type=float, default=0.5, help="Gemini応答時間の対数正規σ"
+    )
+    parser.add_argument(
+        "--model-latency-ms",
+        default="",
+        help='モデルごとの応答時間の中央値（"モデル名=ms" のカンマ区切り）',
+    )
+    parser.add_argument(
+        "--ms-per-video-minute",
+        type=float,
+        default=0,
+        help="文字起こしで動画1分ごとに加算する応答時間（ms）",
+    )
+    parser.add_argument(
+        "--youtube-latency-ms", type=float, default=50, help="YouTube API応答時間（ms）"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Geminiが500を返す確率"
+    )
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="Geminiが429を返す確率"
+    )
+    parser.add_argument(
+        "--transcript-chars", type=int, default=30000, help="文字起こしの文字数"
+    )
+    parser.add_argument("--article-chars", type=int, default=4000, help="記事の文字数")
+    parser.add_argument(
+        "--durations",
+        default="600",
+        help="動画の再生時間（秒、カンマ区切りで動画に順に割り当て）",
+    )
+    parser.add_argument(
+        "--rate-limits",
+        default="",
+        help="GEMINI_RATE_LIMITS と同じ形式のレート制限（既定は無制限）",
+    )
+    parser.add_argument(
+        "--streaming", action="store_true", help="ストリーミングモードで実行"
+    )
+    parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="文字起こしと記事を1回のリクエストで生成（SINGLE_PASS_MODE）",
+    )
+    parser.add_argument(
+        "--max-output-chars",
+        type=int,
+        default=0,
+        help="Geminiの出力の上限（文字数、超えると MAX_TOKENS で打ち切る。0で無制限）",
+    )
+    parser.add_argument(
+        "--api-keys",
+        type=int,
+        default=1,
+        help="APIキーの数（GEMINI_API_KEYS、レート制限はキーごとに適用）",
+    )
+    parser.add_argument(
+        "--caption-rate",
+        type=float,
+        default=0.0,
+        help="字幕トラックがある動画の割合（0より大きいと CAPTIONS_ENABLED を有効化）",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="バッチモード（疑似Batch API）で実行",
+    )
+    parser.add_argument(
+        "--schedule",
+        default="playlist",
+        help="SCHEDULE_ORDER と同じ投入順序（playlist / shortest / oldest）",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=0,
+        help="RUN_TOKEN_BUDGET と同じ推定トークン数の上限（0で無制限）",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="作業キューを共有するワーカープロセスの数（同じ再生リストを分担して処理）",
+    )
+    parser.add_argument(
+        "--work-queue",
+        default="",
+        help="WORK_QUEUE_PATH と同じ作業キューのパス（--workers で自動設定）",
+    )
+    parser.add_argument(
+        "--deadlines",
+        default="",
+        help="GEMINI_DEADLINES と同じ形式の生成内容ごとの応答期限（秒）",
+    )
+    parser.add_argument(
+        "--hedge-stages",
+        default="",
+        help="HEDGE_STAGES と同じヘッジリクエストを送る生成内容（例: article）",
+    )
+    parser.add_argument(
+        "--article-fallback-model",
+        default="",
+        help="ARTICLE_FALLBACK_MODEL と同じ記事のヘッジで使用するモデル",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    parser.add_argument("--verbose", action="store_true", help="処理ログを表示")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """ベンチマークを実行"""
+    argv = sys.argv[1:]
+    args = parse_args(argv)
+    if args.sweep:
+        run_sweep(args, argv)
+        return
+    if args.workers:
+        run_workers(args, argv)
+        return
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    result = run_benchmark(args)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
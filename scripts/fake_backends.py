@@ -0,0 +1,582 @@
+"""
+ベンチマーク用の疑似バックエンド
+Gemini API（genai.Client）とYouTube Data API（googleapiclient のリソース）の代わりに
+ローカルで応答を返し、レイテンシ・エラー率・429率・応答サイズを設定できる
+"""
+
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+
+@dataclass
+class LatencyProfile:
+    """
+    対数正規分布のレイテンシ設定
+
+    Attributes:
+        median_ms: レイテンシの中央値（ミリ秒）
+        sigma: 対数正規分布のσ（0で常に中央値）
+    """
+
+    median_ms: float = 0.0
+    sigma: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """レイテンシ（秒）を1つ生成"""
+        if self.median_ms <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median_ms / 1000
+        return rng.lognormvariate(math.log(self.median_ms), self.sigma) / 1000
+
+
+class FakeRateLimitError(Exception):
+    """429 RESOURCE_EXHAUSTED を模した例外"""
+
+    code = 429
+    status = "RESOURCE_EXHAUSTED"
+
+
+class FakeServerError(Exception):
+    """500 INTERNAL を模した例外"""
+
+    code = 500
+    status = "INTERNAL"
+
+
+def make_text(chars: int, prefix: str) -> str:
+    """
+    指定した文字数の改行を含むテキストを生成
+
+    Args:
+        chars: 文字数
+        prefix: 各行の先頭に付ける文字列
+
+    Returns:
+        生成したテキスト
+    """
+    line = f"{prefix} " + "あいうえおかきくけこ" * 8 + "\n"
+    return (line * (chars // len(line) + 1))[:chars]
+
+
+class _UsageMetadata:
+    """usage_metadata を模したオブジェクト"""
+
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class _FakeFinishReason:
+    """FinishReason を模したオブジェクト"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _FakeCandidate:
+    def __init__(self, finish_reason: str):
+        self.finish_reason = _FakeFinishReason(finish_reason)
+
+
+class FakeResponse:
+    """GenerateContentResponse を模したオブジェクト"""
+
+    def __init__(
+        self,
+        text: str,
+        usage: Optional[_UsageMetadata] = None,
+        finish_reason: str = "STOP",
+    ):
+        self.text = text
+        self.usage_metadata = usage
+        self.candidates = [_FakeCandidate(finish_reason)]
+
+
+@dataclass
+class GeminiProfile:
+    """
+    疑似Gemini APIの応答設定
+
+    Attributes:
+        latency: 1リクエストのレイテンシ
+        ms_per_video_minute: 文字起こしで動画1分ごとに加算するレイテンシ（ミリ秒）
+        error_rate: 500エラーを返す確率
+        rate_limit_rate: 429を返す確率
+        transcript_chars: 文字起こしの応答サイズ（文字数）
+        article_chars: 記事・要約の応答サイズ（文字数）
+        stream_chunk_chars: ストリーミング時の1チャンクの文字数
+        batch_polls: バッチジョブが終了するまでの状態確認の回数
+        max_output_chars: 出力の上限（文字数、超える場合は MAX_TOKENS で打ち切る。0で無制限）
+        model_latency_ms: モデルごとのレイテンシの中央値（ms、指定のないモデルは latency）
+    """
+
+    latency: LatencyProfile
+    ms_per_video_minute: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    transcript_chars: int = 30000
+    article_chars: int = 4000
+    stream_chunk_chars: int = 2000
+    batch_polls: int = 2
+    max_output_chars: int = 0
+    model_latency_ms: Dict[str, float] = field(default_factory=dict)
+
+
+class _FakeModels:
+    """client.aio.models を模したオブジェクト"""
+
+    def __init__(
+        self,
+        profile: GeminiProfile,
+        rng: random.Random,
+        video_seconds: Optional[Callable[[str], int]] = None,
+    ):
+        self.profile = profile
+        self.rng = rng
+        self.video_seconds = video_seconds or (lambda url: 0)
+        self.calls: Dict[str, int] = {}
+        self._transcript = make_text(profile.transcript_chars, "transcript")
+        self._article = make_text(profile.article_chars, "article")
+
+    def _transcript_seconds(self, contents: Any) -> int:
+        """文字起こしリクエストの対象区間の長さ（秒）"""
+        part = contents.parts[0]
+        metadata = getattr(part, "video_metadata", None)
+        if metadata is not None:
+            start = int(str(metadata.start_offset).rstrip("s"))
+            end = int(str(metadata.end_offset).rstrip("s"))
+            return end - start
+        return self.video_seconds(part.file_data.file_uri)
+
+    async def _respond(
+        self, model: str, contents: Any, config: Any = None
+    ) -> FakeResponse:
+        """レイテンシを待ってから応答またはエラーを返す"""
+        self.calls[model] = self.calls.get(model, 0) + 1
+        latency = self.profile.latency
+        if model in self.profile.model_latency_ms:
+            latency = LatencyProfile(
+                self.profile.model_latency_ms[model], latency.sigma
+            )
+        latency = latency.sample(self.rng)
+        if self.profile.ms_per_video_minute and not isinstance(contents, str):
+            latency += (
+                self.profile.ms_per_video_minute
+                * self._transcript_seconds(contents)
+                / 60
+                / 1000
+            )
+        await asyncio.sleep(latency)
+
+        roll = self.rng.random()
+        if roll < self.profile.rate_limit_rate:
+            raise FakeRateLimitError("429 RESOURCE_EXHAUSTED (fake)")
+        if roll < self.profile.rate_limit_rate + self.profile.error_rate:
+            raise FakeServerError("500 INTERNAL (fake)")
+
+        return self.response_for(contents, config)
+
+    def response_for(self, contents: Any, config: Any = None) -> FakeResponse:
+        """リクエストの内容に応じた応答を作成"""
+        # 文字列の入力は記事生成・要約、それ以外（動画のContent）は文字起こし
+        # JSON出力を指定した動画の入力は、文字起こしと記事の構造化出力
+        if isinstance(contents, str):
+            text = self._article
+            prompt_tokens = len(contents) // 3
+        elif getattr(config, "response_mime_type", None) == "application/json":
+            text = json.dumps(
+                {
+                    "transcript": self._transcript,
+                    "article": self._article,
+                    "hashtags": ["benchmark", "fake"],
+                },
+                ensure_ascii=False,
+            )
+            prompt_tokens = 50000
+        else:
+            text = self._transcript
+            prompt_tokens = 50000
+
+        limit = self.profile.max_output_chars
+        if limit and len(text) > limit:
+            return FakeResponse(
+                text[:limit], _UsageMetadata(prompt_tokens, limit // 3), "MAX_TOKENS"
+            )
+        return FakeResponse(text, _UsageMetadata(prompt_tokens, len(text) // 3))
+
+    async def generate_content(
+        self, model: str, contents: Any, config: Any = None
+    ) -> FakeResponse:
+        """models.generate_content の代替"""
+        return await self._respond(model, contents, config)
+
+    async def generate_content_stream(
+        self, model: str, contents: Any, config: Any = None
+    ) -> AsyncIterator[FakeResponse]:
+        """models.generate_content_stream の代替（最終チャンクに usage_metadata を付与）"""
+        response = await self._respond(model, contents, config)
+        size = self.profile.stream_chunk_chars
+
+        async def chunks() -> AsyncIterator[FakeResponse]:
+            text = response.text
+            for start in range(0, len(text), size):
+                await asyncio.sleep(0)
+                last = start + size >= len(text)
+                yield FakeResponse(
+                    text[start : start + size],
+                    response.usage_metadata if last else None,
+                )
+
+        return chunks()
+
+
+class _FakeJobState:
+    """JobState を模したオブジェクト"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _FakeInlinedResponse:
+    """InlinedResponse を模したオブジェクト"""
+
+    def __init__(self, response: Optional[FakeResponse], error: Optional[str]):
+        self.response = response
+        self.error = error
+
+
+class _FakeBatchDest:
+    def __init__(self, inlined_responses: List[_FakeInlinedResponse]):
+        self.inlined_responses = inlined_responses
+
+
+class FakeBatchJob:
+    """BatchJob を模したオブジェクト"""
+
+    def __init__(self, name: str, model: str, requests: List[Any]):
+        self.name = name
+        self.model = model
+        self.requests = requests
+        self.state = _FakeJobState("JOB_STATE_PENDING")
+        self.dest: Optional[_FakeBatchDest] = None
+        self.polls = 0
+
+
+class _FakeBatches:
+    """
+    client.aio.batches を模したオブジェクト
+
+    ジョブは batch_polls 回目の状態確認で終了し、リクエストごとに
+    error_rate の確率で失敗する（429は発生しない）。
+    """
+
+    def __init__(self, models: _FakeModels):
+        self._models = models
+        self.jobs: Dict[str, FakeBatchJob] = {}
+        self.requests = 0
+
+    async def create(self, model: str, src: List[Any], config: Any = None):
+        """batches.create の代替（インラインリクエストのみ）"""
+        name = f"batches/fake-{len(self.jobs) + 1}"
+        self.jobs[name] = FakeBatchJob(
+            name, model, [request.contents for request in src]
+        )
+        self.requests += len(src)
+        return self.jobs[name]
+
+    async def get(self, name: str) -> FakeBatchJob:
+        """batches.get の代替"""
+        job = self.jobs[name]
+        job.polls += 1
+        if job.dest is None and job.polls >= self._models.profile.batch_polls:
+            responses = []
+            for contents in job.requests:
+                if self._models.rng.random() < self._models.profile.error_rate:
+                    responses.append(_FakeInlinedResponse(None, "INTERNAL (fake)"))
+                else:
+                    responses.append(
+                        _FakeInlinedResponse(self._models.response_for(contents), None)
+                    )
+            job.dest = _FakeBatchDest(responses)
+            job.state = _FakeJobState("JOB_STATE_SUCCEEDED")
+        elif job.dest is None:
+            job.state = _FakeJobState("JOB_STATE_RUNNING")
+        return job
+
+
+class _FakeAio:
+    def __init__(self, models: _FakeModels):
+        self.models = models
+        self.batches = _FakeBatches(models)
+
+
+class FakeGeminiClient:
+    """genai.Client の代替（client.aio.models と client.aio.batches のみ実装）"""
+
+    def __init__(
+        self,
+        profile: GeminiProfile,
+        seed: Optional[int] = None,
+        video_seconds: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Args:
+            profile: 応答設定
+            seed: 乱数シード
+            video_seconds: 動画URLから再生時間（秒）を返す関数
+                （ms_per_video_minute によるレイテンシの加算に使用）
+        """
+        self.aio = _FakeAio(_FakeModels(profile, random.Random(seed), video_seconds))
+
+    @property
+    def calls(self) -> Dict[str, int]:
+        """モデルごとの呼び出し回数"""
+        return self.aio.models.calls
+
+    @property
+    def batch_requests(self) -> int:
+        """バッチジョブで依頼されたリクエスト数"""
+        return self.aio.batches.requests
+
+
+class _FakeRequest:
+    """googleapiclient の HttpRequest を模したオブジェクト"""
+
+    def __init__(self, backend: "FakeYouTube", handler: Callable[[], Dict]):
+        self._backend = backend
+        self._handler = handler
+        self.headers: Dict[str, str] = {}
+
+    def execute(self) -> Dict:
+        """レイテンシを待ってから応答を返す（同期処理）"""
+        time.sleep(self._backend.latency.sample(self._backend.rng))
+        return self._handler()
+
+
+class _FakeBatch:
+    """BatchHttpRequest を模したオブジェクト"""
+
+    def __init__(self, backend: "FakeYouTube", callback: Callable):
+        self._backend = backend
+        self._callback = callback
+        self._requests: List = []
+
+    def add(self, request: _FakeRequest, request_id: str) -> None:
+        self._requests.append((request_id, request))
+
+    def execute(self) -> None:
+        time.sleep(self._backend.latency.sample(self._backend.rng))
+        for request_id, request in self._requests:
+            self._callback(request_id, request._handler(), None)
+
+
+class _FakePlaylistItems:
+    def __init__(self, backend: "FakeYouTube"):
+        self._backend = backend
+
+    def list(self, part: str, playlistId: str, maxResults: int, pageToken=None):
+        return _FakeRequest(
+            self._backend,
+            lambda: self._backend.playlist_page(playlistId, pageToken, maxResults),
+        )
+
+    def delete(self, id: str):
+        return _FakeRequest(self._backend, lambda: self._backend.delete_item(id))
+
+
+class _FakeVideos:
+    def __init__(self, backend: "FakeYouTube"):
+        self._backend = backend
+
+    def list(self, part: str, id: str):
+        return _FakeRequest(self._backend, lambda: self._backend.video_details(id))
+
+
+class FakeYouTube:
+    """
+    YouTube Data API のリソース（build("youtube", "v3") の戻り値）の代替
+
+    playlistItems().list / delete、videos().list、new_batch_http_request を実装する。
+    """
+
+    def __init__(
+        self,
+        playlists: Dict[str, int],
+        durations: List[int],
+        latency: LatencyProfile,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            playlists: 再生リストID -> 動画数
+            durations: 動画の再生時間（秒）のリスト（動画ごとに順に割り当てる）
+            latency: 1リクエストのレイテンシ
+            seed: 乱数シード
+        """
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.durations = durations or [600]
+        self.items: Dict[str, List[str]] = {
+            playlist_id: [f"{playlist_id}-{n:05d}" for n in range(count)]
+            for playlist_id, count in playlists.items()
+        }
+        self.deleted: List[str] = []
+
+    def playlistItems(self) -> _FakePlaylistItems:
+        return _FakePlaylistItems(self)
+
+    def videos(self) -> _FakeVideos:
+        return _FakeVideos(self)
+
+    def new_batch_http_request(self, callback: Callable) -> _FakeBatch:
+        return _FakeBatch(self, callback)
+
+    def playlist_page(
+        self, playlist_id: str, page_token: Optional[str], max_results: int
+    ) -> Dict:
+        """playlistItems.list の応答"""
+        items = self.items.get(playlist_id, [])
+        start = int(page_token or 0)
+        page = items[start : start + max_results]
+        response = {
+            "etag": f"{playlist_id}:{len(items)}:{start}",
+            "items": [
+                {
+                    "id": f"item-{video_id}",
+                    # 再生リストへの追加日時（後ろの項目ほど古い）
+                    "snippet": {
+                        "publishedAt": self.added_at(start + offset, len(items))
+                    },
+                    "contentDetails": {"videoId": video_id},
+                }
+                for offset, video_id in enumerate(page)
+            ],
+        }
+        if start + max_results < len(items):
+            response["nextPageToken"] = str(start + max_results)
+        return response
+
+    @staticmethod
+    def added_at(position: int, count: int) -> str:
+        """再生リストの position 番目の項目の追加日時（ISO 8601形式）"""
+        seconds = count - position
+        return f"2024-01-01T{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}Z"
+
+    def duration_of(self, video_id: str) -> int:
+        """動画の再生時間（秒）"""
+        return self.durations[int(video_id.rsplit("-", 1)[1]) % len(self.durations)]
+
+    def duration_of_url(self, url: str) -> int:
+        """動画URLの再生時間（秒）"""
+        return self.duration_of(url.rsplit("v=", 1)[-1])
+
+    def video_details(self, ids: str) -> Dict:
+        """videos.list の応答"""
+        items = []
+        for video_id in ids.split(","):
+            seconds = self.duration_of(video_id)
+            items.append(
+                {
+                    "id": video_id,
+                    "snippet": {
+                        "title": f"Benchmark {video_id}",
+                        "channelTitle": "Benchmark",
+                        "publishedAt": "2024-01-01T00:00:00Z",
+                    },
+                    "contentDetails": {"duration": f"PT{seconds}S"},
+                }
+            )
+        return {"items": items}
+
+    def delete_item(self, playlist_item_id: str) -> Dict:
+        """playlistItems.delete の応答"""
+        self.deleted.append(playlist_item_id)
+        return {}
+
+
+@dataclass
+class FakeCaptionTrack:
+    """字幕トラック（src.captions.CaptionTrack と同じ属性）"""
+
+    id: str
+    language: str
+    kind: str = "standard"
+    name: str = ""
+
+
+class FakeCaptionSource:
+    """
+    字幕の取得元（src.captions.YouTubeCaptionSource）の代替
+
+    caption_rate の割合の動画に字幕トラックを割り当て、その半数は手動の日本語字幕と
+    自動生成の英語字幕、残りは自動生成の日本語字幕のみとする。
+    """
+
+    def __init__(
+        self,
+        caption_rate: float,
+        video_seconds: Callable[[str], int],
+        latency: LatencyProfile,
+        seed: Optional[int] = None,
+        cue_seconds: int = 5,
+    ):
+        """
+        Args:
+            caption_rate: 字幕トラックがある動画の割合（0〜1）
+            video_seconds: 動画ID -> 再生時間（秒）
+            latency: 1リクエストのレイテンシ
+            seed: 乱数シード
+            cue_seconds: 字幕の1キューの長さ（秒）
+        """
+        self.caption_rate = caption_rate
+        self.video_seconds = video_seconds
+        self.latency = latency
+        self.seed = seed
+        self.cue_seconds = cue_seconds
+        self.rng = random.Random(seed)
+        self.downloads = 0
+
+    def _video_rng(self, video_id: str) -> random.Random:
+        """動画ごとに決まった乱数（実行順序に依存しない）"""
+        return random.Random(f"{self.seed}:{video_id}")
+
+    def list_tracks(self, video_id: str) -> List[FakeCaptionTrack]:
+        """captions.list の応答"""
+        time.sleep(self.latency.sample(self.rng))
+        rng = self._video_rng(video_id)
+        if rng.random() >= self.caption_rate:
+            return []
+        if rng.random() < 0.5:
+            return [
+                FakeCaptionTrack(f"{video_id}:en:asr", "en", "asr"),
+                FakeCaptionTrack(f"{video_id}:ja", "ja", "standard"),
+            ]
+        return [FakeCaptionTrack(f"{video_id}:ja:asr", "ja", "asr")]
+
+    def download(self, track: FakeCaptionTrack) -> str:
+        """captions.download の応答（SRT形式）"""
+        time.sleep(self.latency.sample(self.rng))
+        self.downloads += 1
+        video_id = track.id.split(":", 1)[0]
+        cues = []
+        for n, start in enumerate(
+            range(0, self.video_seconds(video_id), self.cue_seconds), 1
+        ):
+            end = start + self.cue_seconds
+            cues.append(
+                f"{n}\n{_srt_time(start)} --> {_srt_time(end)}\n"
+                f"<c>字幕 {track.language} {n}</c> あいうえおかきくけこ\n"
+            )
+        return "\n".join(cues)
+
+
+def _srt_time(seconds: int) -> str:
+    """SRT形式の時刻（HH:MM:SS,mmm）"""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d},000"
@@ -0,0 +1,66 @@
+"""
+起動時間計測スクリプト
+python -X importtime で main.py を読み込み、累積import時間の大きいモジュールを表示する
+
+使用方法:
+    uv run python scripts/importtime.py [表示件数]
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def measure_import_times() -> List[Tuple[int, int, str]]:
+    """
+    main.py のimport時間を計測
+
+    Returns:
+        (累積時間[us], 自身の時間[us], モジュール名) のリスト
+    """
+    env = dict(os.environ)
+    # main.py はAPIキー未設定時に終了するため、計測用のダミー値を設定
+    env.setdefault("GEMINI_API_KEY", "importtime")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    timings = []
+    for line in result.stderr.splitlines():
+        # 形式: "import time:       123 |        456 |   module.name"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # 区切り直後の空白1文字を除いた残りのインデントが入れ子の深さを表す
+        timings.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return timings
+
+
+def main() -> None:
+    """計測結果を表示"""
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    timings = measure_import_times()
+    if not timings:
+        print("import時間を取得できませんでした。")
+        return
+
+    # トップレベル（インデントなし）のモジュールの合計が起動時のimport時間
+    total_us = sum(
+        cumulative for cumulative, _, name in timings if not name.startswith(" ")
+    )
+    print(f"import時間の合計: {total_us / 1000:.1f} ms")
+    print(f"{'累積[ms]':>10} {'自身[ms]':>10}  モジュール")
+    for cumulative, self_us, name in sorted(timings, reverse=True)[:limit]:
+        print(f"{cumulative / 1000:>10.1f} {self_us / 1000:>10.1f}  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
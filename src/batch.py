@@ -0,0 +1,228 @@
+"""
+バッチモジュール
+大量の動画をまとめて処理する際に、文字起こし・記事生成を Gemini Batch API の
+ジョブとして一括で依頼し、結果を生成結果キャッシュに格納する。
+キャッシュ済みの動画はパイプラインでAPIを呼ばずに保存・削除まで進む
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple
+
+from . import config
+from .cache import ContentCache, content_hash
+from .gemini_api import (
+    ARTICLE_PROMPT,
+    BATCH_DONE_STATES,
+    article_cache_key,
+    article_models,
+    batch_job_responses,
+    batch_job_state,
+    create_batch_job,
+    get_batch_job,
+    is_long_video,
+    is_map_reduce_article,
+    transcript_cache_key,
+    transcript_contents,
+)
+from .metrics import METRICS
+from .state_store import StateStore
+from .youtube import video_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+# 生成内容 -> バッチジョブの表示名
+DISPLAY_NAMES = {
+    "transcript": "youtube-vault-archiver-transcript",
+    "article": "youtube-vault-archiver-article",
+}
+
+
+def _transcript_requests(
+    cache: ContentCache, videos: List[Dict[str, str]]
+) -> List[Tuple[str, Any]]:
+    """
+    文字起こしが未キャッシュの動画の (キャッシュキー, contents) のリストを作成
+
+    分割して文字起こしする長尺動画は対象外（パイプラインで通常どおり処理する）。
+    """
+    requests = []
+    for video in videos:
+        duration_seconds = video_duration_seconds(video)
+        if is_long_video(duration_seconds):
+            continue
+        key = transcript_cache_key(video["video_id"], duration_seconds)
+        if not cache.contains(key):
+            requests.append((key, transcript_contents(video["url"])))
+    return requests
+
+
+def _article_requests(
+    cache: ContentCache, videos: List[Dict[str, str]]
+) -> List[Tuple[str, Any]]:
+    """
+    文字起こしがキャッシュ済みで記事が未キャッシュの動画の (キャッシュキー, contents) のリストを作成
+
+    セクションごとの要約が必要な長い文字起こしは対象外（パイプラインで通常どおり処理する）。
+    """
+    requests = []
+    for video in videos:
+        transcript = cache.get(
+            transcript_cache_key(video["video_id"], video_duration_seconds(video))
+        )
+        if not transcript or is_map_reduce_article(len(transcript)):
+            continue
+        keys = [
+            article_cache_key(
+                video["video_id"], content_hash(transcript), len(transcript), model
+            )
+            for model in article_models()
+        ]
+        if not any(cache.contains(key) for key in keys):
+            requests.append((keys[0], ARTICLE_PROMPT.format(transcript=transcript)))
+    return requests
+
+
+async def _wait_for_job(name: str) -> Any:
+    """
+    バッチジョブが終了するまで間隔を延ばしながら状態を確認
+
+    Args:
+        name: ジョブ名
+
+    Returns:
+        終了したバッチジョブ
+    """
+    delay = config.BATCH_POLL_SECONDS
+    with METRICS.span("batch_job"):
+        while True:
+            job = await get_batch_job(config.GEMINI_API_KEY, name)
+            state = batch_job_state(job)
+            if state in BATCH_DONE_STATES:
+                return job
+            logger.debug(f"バッチジョブの完了を待機中: {name}（{state}）")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, config.BATCH_POLL_MAX_SECONDS)
+
+
+async def _collect_job(
+    state: StateStore, cache: ContentCache, record: Dict[str, Any]
+) -> None:
+    """バッチジョブの終了を待ち、成功したリクエストの結果をキャッシュに格納"""
+    name = record["name"]
+    try:
+        job = await _wait_for_job(name)
+    except Exception as e:
+        # 記録は残すため、次回の実行で再度確認する
+        logger.error(f"バッチジョブの状態を取得できません: {name} - {e}")
+        return
+
+    job_state = batch_job_state(job)
+    stored = 0
+    if job_state in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"):
+        for key, response in zip(record["keys"], batch_job_responses(job)):
+            if response is None:
+                continue
+            METRICS.record_usage(
+                record["model"], getattr(response, "usage_metadata", None)
+            )
+            if response.text:
+                cache.put(key, response.text)
+                stored += 1
+
+    METRICS.increment("batch_requests_succeeded", stored)
+    METRICS.increment("batch_requests_failed", len(record["keys"]) - stored)
+    state.finish_batch_job(name, job_state)
+    log = logger.info if stored == len(record["keys"]) else logger.warning
+    log(
+        "バッチジョブが終了しました: %s（%s, %d/%d 件）",
+        name,
+        job_state,
+        stored,
+        len(record["keys"]),
+    )
+
+
+async def _run_phase(
+    state: StateStore,
+    cache: ContentCache,
+    kind: str,
+    model: str,
+    requests: List[Tuple[str, Any]],
+) -> None:
+    """
+    未完了のバッチジョブの結果取得を再開し、新しいリクエストをジョブとして作成して完了を待つ
+
+    Args:
+        state: 処理状態ストア（ジョブ名の記録に使用）
+        cache: 生成結果キャッシュ
+        kind: 生成内容（transcript / article）
+        model: モデル名
+        requests: (キャッシュキー, contents) のリスト
+    """
+    pending = state.pending_batch_jobs(kind)
+    if pending:
+        logger.info(
+            f"前回の実行のバッチジョブの結果取得を再開します: {len(pending)} 件"
+        )
+
+    # 前回のジョブに含まれるリクエストと、同じ動画の重複は作成しない
+    requested = {key for record in pending for key in record["keys"]}
+    unique = []
+    for key, contents in requests:
+        if key not in requested:
+            requested.add(key)
+            unique.append((key, contents))
+
+    size = max(1, config.BATCH_MAX_REQUESTS)
+    for start in range(0, len(unique), size):
+        chunk = unique[start : start + size]
+        keys = [key for key, _ in chunk]
+        try:
+            name = await create_batch_job(
+                config.GEMINI_API_KEY,
+                model,
+                [contents for _, contents in chunk],
+                DISPLAY_NAMES[kind],
+            )
+        except Exception as e:
+            # 作成できなかったリクエストはパイプラインで通常どおり処理する
+            logger.error(f"バッチジョブの作成に失敗: {e}")
+            break
+        state.add_batch_job(name, kind, model, keys)
+        pending.append(
+            {"name": name, "kind": kind, "model": model, "keys": keys, "status": ""}
+        )
+        logger.info(f"バッチジョブを作成しました: {name}（{len(keys)} 件）")
+
+    await asyncio.gather(*(_collect_job(state, cache, record) for record in pending))
+
+
+async def run_batch(
+    state: StateStore, cache: ContentCache, videos: List[Dict[str, str]]
+) -> None:
+    """
+    文字起こし → 記事生成 の順にバッチジョブで生成し、結果をキャッシュに格納
+
+    失敗したリクエスト・対象外の動画は、その後のパイプラインで通常どおり生成される。
+
+    Args:
+        state: 処理状態ストア
+        cache: 生成結果キャッシュ
+        videos: 生成が必要な動画のリスト
+    """
+    logger.info(f"バッチモードで {len(videos)} 件の動画を処理します")
+    await _run_phase(
+        state,
+        cache,
+        "transcript",
+        config.TRANSCRIPT_MODEL,
+        _transcript_requests(cache, videos),
+    )
+    await _run_phase(
+        state,
+        cache,
+        "article",
+        config.ARTICLE_MODEL,
+        _article_requests(cache, videos),
+    )
@@ -0,0 +1,304 @@
+"""
+生成結果キャッシュモジュール
+文字起こし・記事の生成結果をコンテンツアドレス方式でディスクに保存し、
+サイズ上限を超えた場合は最も古く参照されたエントリから削除する（LRU）
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_EXTENSION = ".txt"
+# ストリーミング書き込み中（未完了）のエントリの拡張子
+PARTIAL_EXTENSION = ".part"
+# put で書き込み中の一時ファイルの拡張子
+TEMP_EXTENSION = ".tmp"
+# 起動時に削除する書き込み中ファイル・一時ファイル（更新されないまま経過した秒数）
+PARTIAL_MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+def content_hash(text: str) -> str:
+    """
+    文字列のハッシュ値を生成
+
+    Args:
+        text: ハッシュ化する文字列
+
+    Returns:
+        SHA-256の16進文字列
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def content_hash_file(path: str, chunk_size: int = 1024 * 1024) -> Tuple[str, int]:
+    """
+    UTF-8テキストファイルのハッシュ値と文字数を取得
+
+    ハッシュ値はファイル内容の文字列に対する content_hash と一致する。
+
+    Args:
+        path: 対象ファイルのパス
+        chunk_size: 一度に読み込む文字数
+
+    Returns:
+        (SHA-256の16進文字列, 文字数) のタプル
+    """
+    digest = hashlib.sha256()
+    chars = 0
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk.encode("utf-8"))
+            chars += len(chunk)
+    return digest.hexdigest(), chars
+
+
+def make_key(*parts: str) -> str:
+    """
+    キャッシュキーを生成
+
+    Args:
+        parts: キーを構成する要素（video_id、モデル名、プロンプトのハッシュ等）
+
+    Returns:
+        キャッシュキー
+    """
+    return content_hash("\0".join(parts))
+
+
+class ContentCache:
+    """サイズ上限付きのディスクキャッシュ（LRU削除）"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """
+        Args:
+            cache_dir: キャッシュディレクトリ
+            max_bytes: キャッシュ全体の最大サイズ（バイト）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # キー -> ファイルサイズ（参照順: 先頭が最も古い）
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        # 使用中のため削除対象から除外するキー -> 使用中の数
+        self._pinned: "Counter[str]" = Counter()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """
+        既存のキャッシュファイルを最終参照日時順に読み込む
+
+        PARTIAL_MAX_AGE_SECONDS 以上更新されていない書き込み中ファイル
+        （中断・失敗したストリーミングの出力と区間ファイル）と put の一時ファイルは削除する。
+        """
+        entries = []
+        stale_before = time.time() - PARTIAL_MAX_AGE_SECONDS
+        removed = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith(CACHE_EXTENSION):
+                    key = entry.name[: -len(CACHE_EXTENSION)]
+                    entries.append((stat.st_mtime, key, stat.st_size))
+                elif (
+                    PARTIAL_EXTENSION in entry.name
+                    or entry.name.endswith(TEMP_EXTENSION)
+                ) and stat.st_mtime < stale_before:
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+        if removed:
+            logger.info(
+                "古い書き込み中のキャッシュファイルを削除しました: %d 件", removed
+            )
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+        logger.debug(
+            "キャッシュを読み込みました: %d 件 (%d bytes)",
+            len(self._entries),
+            self._total_bytes,
+        )
+
+    def path_for(self, key: str) -> str:
+        """
+        キャッシュファイルのパスを取得
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            キャッシュファイルのパス
+        """
+        return os.path.join(self.cache_dir, f"{key}{CACHE_EXTENSION}")
+
+    def partial_path(self, key: str) -> str:
+        """
+        ストリーミング書き込み用の一時ファイルのパスを取得
+
+        書き込みが途中で失敗しても受信済みの内容はファイルに残る（長尺動画の文字起こしでは
+        完了した区間のファイルを再試行時に再利用する）。更新されないまま
+        PARTIAL_MAX_AGE_SECONDS が経過したファイルは次回の起動時に削除する。
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            一時ファイルのパス
+        """
+        return os.path.join(self.cache_dir, f"{key}{PARTIAL_EXTENSION}")
+
+    def contains(self, key: str) -> bool:
+        """
+        キャッシュにエントリが存在するかを判定（存在する場合は参照日時を更新）
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            存在する場合True
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+
+        try:
+            os.utime(self.path_for(key))
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            return False
+        return True
+
+    def pin(self, key: str) -> None:
+        """
+        エントリを削除対象から除外（ファイルパスを直接参照している間に使用）
+
+        同じキーを複数の処理が参照できるよう、unpin と同じ回数だけ呼ぶ。
+
+        Args:
+            key: キャッシュキー
+        """
+        with self._lock:
+            self._pinned[key] += 1
+
+    def unpin(self, key: str) -> None:
+        """
+        エントリの削除除外を解除（すべての参照が解除されるまでは削除しない）
+
+        Args:
+            key: キャッシュキー
+        """
+        with self._lock:
+            self._pinned[key] -= 1
+            if self._pinned[key] <= 0:
+                del self._pinned[key]
+            self._evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        キャッシュから値を取得
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            キャッシュされた文字列（存在しない場合はNone）
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+
+        path = self.path_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = f.read()
+            # 最終参照日時を更新（次回起動時のLRU順序に反映）
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            return None
+
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """
+        値をキャッシュに保存
+
+        Args:
+            key: キャッシュキー
+            value: 保存する文字列
+        """
+        path = self.path_for(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=TEMP_EXTENSION)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._register(key)
+
+    def commit_partial(self, key: str) -> str:
+        """
+        書き込みが完了した一時ファイルをキャッシュエントリとして確定
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            確定したキャッシュファイルのパス
+        """
+        path = self.path_for(key)
+        os.replace(self.partial_path(key), path)
+        self._register(key)
+        return path
+
+    def _register(self, key: str) -> None:
+        """保存済みのキャッシュファイルをインデックスに登録"""
+        size = os.path.getsize(self.path_for(key))
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _forget(self, key: str) -> None:
+        """インデックスからエントリを除外（ロック取得済みで呼ぶこと）"""
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self) -> None:
+        """サイズ上限を超えた分を古い順に削除（ロック取得済みで呼ぶこと）"""
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                break
+            if key in self._pinned:
+                continue
+            self._forget(key)
+            try:
+                os.remove(self.path_for(key))
+                logger.debug("キャッシュを削除しました: %s", key)
+            except FileNotFoundError:
+                pass
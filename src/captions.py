@@ -0,0 +1,257 @@
+"""
+字幕モジュール
+動画に字幕トラック（手動・自動生成）がある場合は字幕からタイムスタンプ付きの文字起こしを作成し、
+Geminiによる文字起こし（動画の解析）を省略する
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from googleapiclient.errors import HttpError
+
+from . import config
+from .cache import content_hash, make_key
+from .metrics import METRICS
+from .youtube import _youtube_lock, get_youtube_client
+
+logger = logging.getLogger(__name__)
+
+# 字幕トラックの種類（YouTube Data API の snippet.trackKind）
+KIND_MANUAL = "standard"
+KIND_ASR = "asr"
+
+# SRT・WebVTT のキューの時刻行（例: 00:01:02,345 --> 00:01:04,000）
+_CUE_TIME = re.compile(r"^(?:(\d+):)?(\d{1,2}):(\d{2})[,.]\d{3}\s+-->")
+_TAG = re.compile(r"<[^>]+>")
+
+
+@dataclass
+class CaptionTrack:
+    """
+    字幕トラック
+
+    Attributes:
+        id: トラックID
+        language: 言語コード（例: ja、en-US）
+        kind: 種類（standard: 手動、asr: 自動生成）
+        name: トラック名
+    """
+
+    id: str
+    language: str
+    kind: str = KIND_MANUAL
+    name: str = ""
+
+
+class YouTubeCaptionSource:
+    """
+    YouTube Data API の captions リソースによる字幕の取得
+
+    captions.download は動画の所有者（または字幕の編集を許可された）アカウントでのみ
+    利用できるため、それ以外の動画では取得に失敗しGeminiの文字起こしに切り替わる。
+    """
+
+    def list_tracks(self, video_id: str) -> List[CaptionTrack]:
+        """
+        動画の字幕トラック一覧を取得
+
+        Args:
+            video_id: 動画ID
+
+        Returns:
+            字幕トラックのリスト
+        """
+        youtube = get_youtube_client()
+        request = youtube.captions().list(part="snippet", videoId=video_id)
+        with _youtube_lock, METRICS.span("caption_list"):
+            response = request.execute()
+        return [
+            CaptionTrack(
+                id=item["id"],
+                language=item["snippet"].get("language", ""),
+                kind=item["snippet"].get("trackKind", KIND_MANUAL).lower(),
+                name=item["snippet"].get("name", ""),
+            )
+            for item in response.get("items", [])
+        ]
+
+    def download(self, track: CaptionTrack) -> str:
+        """
+        字幕トラックをSRT形式で取得
+
+        Args:
+            track: 字幕トラック
+
+        Returns:
+            SRT形式の字幕
+        """
+        youtube = get_youtube_client()
+        request = youtube.captions().download(id=track.id, tfmt="srt")
+        with _youtube_lock, METRICS.span("caption_download"):
+            content = request.execute()
+        if isinstance(content, bytes):
+            return content.decode("utf-8", errors="replace")
+        return content
+
+
+# 字幕の取得元（初回使用時に作成、ベンチマークでは疑似実装に置き換える）
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_caption_source():
+    """字幕の取得元を取得（初回呼び出し時に作成）"""
+    global _source
+    with _source_lock:
+        if _source is None:
+            _source = YouTubeCaptionSource()
+        return _source
+
+
+def caption_languages() -> List[str]:
+    """字幕の言語の優先順（CAPTION_LANGUAGES、空の場合はすべての言語）"""
+    return [
+        language.strip().lower()
+        for language in config.CAPTION_LANGUAGES.split(",")
+        if language.strip()
+    ]
+
+
+def select_track(
+    tracks: List[CaptionTrack], languages: List[str]
+) -> Optional[CaptionTrack]:
+    """
+    使用する字幕トラックを選択
+
+    手動の字幕を自動生成の字幕より優先し、同じ種類の中では languages の順に選ぶ。
+    言語は地域の違いを無視して比較する（ja と ja-JP は同じ言語として扱う）。
+
+    Args:
+        tracks: 字幕トラックのリスト
+        languages: 言語の優先順（空の場合はすべての言語を同じ優先度で扱う）
+
+    Returns:
+        字幕トラック（使用できるトラックがない場合はNone）
+    """
+    candidates = []
+    for track in tracks:
+        if track.kind == KIND_ASR and not config.CAPTION_ALLOW_AUTO:
+            continue
+        language = track.language.lower()
+        base_language = language.split("-")[0]
+        if languages:
+            if language in languages:
+                rank = languages.index(language)
+            elif base_language in languages:
+                rank = languages.index(base_language)
+            else:
+                continue
+        else:
+            rank = 0
+        candidates.append((track.kind == KIND_ASR, rank, track))
+
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: candidate[:2])[2]
+
+
+def _cue_seconds(match: "re.Match[str]") -> int:
+    """時刻行の開始時刻（秒）"""
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def captions_to_text(content: str) -> str:
+    """
+    SRT・WebVTT形式の字幕をタイムスタンプ付きのテキストに変換
+
+    キューごとに "[HH:MM:SS] 本文" の1行とし、タグを除去する。
+    自動生成の字幕で前のキューと同じ文が続く場合は省略する。
+
+    Args:
+        content: SRT・WebVTT形式の字幕
+
+    Returns:
+        タイムスタンプ付きのテキスト
+    """
+    from .gemini_api import format_timestamp
+
+    lines: List[str] = []
+    start: Optional[int] = None
+    texts: List[str] = []
+    previous = ""
+
+    def flush() -> None:
+        nonlocal previous
+        text = " ".join(texts).strip()
+        if start is not None and text and text != previous:
+            lines.append(f"[{format_timestamp(start)}] {text}")
+            previous = text
+
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        match = _CUE_TIME.match(line)
+        if match:
+            flush()
+            start = _cue_seconds(match)
+            texts = []
+        elif not line:
+            flush()
+            start, texts = None, []
+        elif start is not None:
+            texts.append(_TAG.sub("", line).strip())
+    flush()
+
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def caption_cache_key(video_id: str) -> str:
+    """
+    字幕から作成した文字起こしのキャッシュキーを生成
+
+    Args:
+        video_id: YouTube動画ID
+
+    Returns:
+        video_id・言語の優先順・自動生成字幕の使用可否から決まるキャッシュキー
+    """
+    return make_key(
+        "captions",
+        video_id,
+        content_hash(",".join(caption_languages())),
+        f"auto={config.CAPTION_ALLOW_AUTO}",
+    )
+
+
+def fetch_caption_transcript(video_id: str) -> str:
+    """
+    字幕トラックから文字起こしを作成（同期処理）
+
+    Args:
+        video_id: 動画ID
+
+    Returns:
+        タイムスタンプ付きの文字起こし（使用できる字幕がない場合は空文字）
+    """
+    source = get_caption_source()
+    try:
+        track = select_track(source.list_tracks(video_id), caption_languages())
+        if track is None:
+            logger.info(f"  → 使用できる字幕がありません: {video_id}")
+            return ""
+        text = captions_to_text(source.download(track))
+    except HttpError as e:
+        logger.info(f"  → 字幕を取得できません: {video_id} - {e}")
+        return ""
+
+    if len(text) < config.CAPTION_MIN_CHARS:
+        logger.info(f"  → 字幕が短いため使用しません: {video_id}（{len(text)} 文字）")
+        return ""
+    logger.info(
+        f"  → 字幕から文字起こしを作成しました: {video_id}"
+        f"（{track.language}, {'自動生成' if track.kind == KIND_ASR else '手動'}）"
+    )
+    return text
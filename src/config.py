@@ -1,14 +1,170 @@
 import dotenv
 import os
 import logging
+from typing import Dict, List, Tuple
 
 dotenv.load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+def _parse_rate_limits(value: str) -> Dict[str, Tuple[int, int]]:
+    """
+    モデルごとのレート制限設定をパース
+
+    Args:
+        value: "モデル名=RPM:TPM" をカンマ区切りで並べた文字列
+
+    Returns:
+        モデル名 -> (RPM, TPM) の辞書
+    """
+    limits = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            model, spec = entry.rsplit("=", 1)
+            rpm, tpm = spec.split(":")
+            limits[model.strip()] = (int(rpm), int(tpm))
+        except ValueError:
+            logger.warning("レート制限設定を解釈できません: %s", entry)
+    return limits
+
+
+def _parse_deadlines(value: str) -> Dict[str, float]:
+    """
+    生成内容ごとの応答期限の設定をパース
+
+    Args:
+        value: "生成内容=秒" をカンマ区切りで並べた文字列（0で期限なし）
+
+    Returns:
+        生成内容 -> 秒 の辞書
+    """
+    deadlines = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            stage, seconds = entry.split("=")
+            deadlines[stage.strip()] = float(seconds)
+        except ValueError:
+            logger.warning("応答期限の設定を解釈できません: %s", entry)
+    return deadlines
+
+
+def _parse_playlists(value: str, default_playlist_id: str) -> List[Tuple[str, str]]:
+    """
+    再生リストと保存先フォルダの対応設定を解析
+
+    Args:
+        value: "PLAYLIST_ID=フォルダ,PLAYLIST_ID=フォルダ" 形式の文字列
+            （フォルダはVault・output/からの相対パス。省略時は直下に保存）
+        default_playlist_id: 未設定の場合に使用する再生リストID（PLAYLIST_ID）
+
+    Returns:
+        (再生リストID, 保存先フォルダ) のリスト
+    """
+    playlists: List[Tuple[str, str]] = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        playlist_id, _, folder = entry.partition("=")
+        playlists.append((playlist_id.strip(), folder.strip().strip("/\\")))
+
+    if not playlists and default_playlist_id:
+        playlists.append((default_playlist_id, ""))
+    return playlists
+
+
 PLAYLIST_ID = os.getenv("PLAYLIST_ID") or ""
+PLAYLISTS = _parse_playlists(os.getenv("PLAYLISTS", ""), PLAYLIST_ID)
 DELETE_FROM_PLAYLIST = os.getenv("DELETE_FROM_PLAYLIST", "false").lower() == "true"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or ""
+# 負荷分散するAPIキーの一覧（GEMINI_API_KEY を先頭に含む）
+GEMINI_API_KEYS = list(
+    dict.fromkeys(
+        key.strip()
+        for key in [GEMINI_API_KEY, *os.getenv("GEMINI_API_KEYS", "").split(",")]
+        if key.strip()
+    )
+)
+GEMINI_API_KEY = GEMINI_API_KEY or next(iter(GEMINI_API_KEYS), "")
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 OBSIDIAN_VAULT_PATH = os.getenv("OBSIDIAN_VAULT_PATH") or ""
 MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "3"))
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY") or MAX_CONCURRENT)
+ARTICLE_CONCURRENCY = int(os.getenv("ARTICLE_CONCURRENCY") or MAX_CONCURRENT)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "10"))
+STATE_DB_PATH = os.getenv("STATE_DB_PATH") or "state.db"
+TRANSCRIPT_MODEL = os.getenv("TRANSCRIPT_MODEL") or "models/gemini-2.5-flash"
+ARTICLE_MODEL = os.getenv("ARTICLE_MODEL") or "models/gemini-2.5-pro"
+CACHE_DIR = os.getenv("CACHE_DIR") or "cache"
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "1024"))
+GEMINI_RATE_LIMITS = _parse_rate_limits(
+    os.getenv(
+        "GEMINI_RATE_LIMITS",
+        "models/gemini-2.5-flash=10:250000,models/gemini-2.5-pro=5:250000",
+    )
+)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "6"))
+GEMINI_DEADLINES = _parse_deadlines(
+    os.getenv(
+        "GEMINI_DEADLINES",
+        "transcript=1800,article=600,summary=300,single_pass=1800",
+    )
+)
+HEDGE_STAGES = [
+    stage.strip() for stage in os.getenv("HEDGE_STAGES", "").split(",") if stage.strip()
+]
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_SECONDS = float(os.getenv("HEDGE_MIN_SECONDS", "10"))
+GEMINI_KEY_COOLDOWN_SECONDS = float(os.getenv("GEMINI_KEY_COOLDOWN_SECONDS", "30"))
+GEMINI_KEY_COOLDOWN_MAX_SECONDS = float(
+    os.getenv("GEMINI_KEY_COOLDOWN_MAX_SECONDS", "3600")
+)
+TRANSCRIPT_ESTIMATED_TOKENS = int(os.getenv("TRANSCRIPT_ESTIMATED_TOKENS", "50000"))
+GEMINI_HTTP_MAX_CONNECTIONS = int(os.getenv("GEMINI_HTTP_MAX_CONNECTIONS", "32"))
+REMOVE_BATCH_SIZE = int(os.getenv("REMOVE_BATCH_SIZE", "50"))
+REMOVE_BATCH_WAIT_SECONDS = float(os.getenv("REMOVE_BATCH_WAIT_SECONDS", "2"))
+LONG_VIDEO_THRESHOLD_SECONDS = int(os.getenv("LONG_VIDEO_THRESHOLD_SECONDS", "3600"))
+SEGMENT_SECONDS = int(os.getenv("SEGMENT_SECONDS", "1200"))
+SEGMENT_MAX_RETRIES = int(os.getenv("SEGMENT_MAX_RETRIES", "3"))
+STREAMING_MODE = os.getenv("STREAMING_MODE", "false").lower() == "true"
+ARTICLE_SUMMARY_MODEL = os.getenv("ARTICLE_SUMMARY_MODEL") or "models/gemini-2.5-flash"
+ARTICLE_FALLBACK_MODEL = os.getenv("ARTICLE_FALLBACK_MODEL") or ""
+ARTICLE_MAP_REDUCE_THRESHOLD_CHARS = int(
+    os.getenv("ARTICLE_MAP_REDUCE_THRESHOLD_CHARS", "60000")
+)
+ARTICLE_CHUNK_CHARS = int(os.getenv("ARTICLE_CHUNK_CHARS", "20000"))
+VAULT_EXISTING_NOTE_POLICY = (os.getenv("VAULT_EXISTING_NOTE_POLICY") or "skip").lower()
+DIRECT_TO_VAULT = os.getenv("DIRECT_TO_VAULT", "false").lower() == "true"
+WATCH_INTERVAL_SECONDS = float(os.getenv("WATCH_INTERVAL_SECONDS", "300"))
+SINGLE_PASS_MODE = os.getenv("SINGLE_PASS_MODE", "false").lower() == "true"
+SINGLE_PASS_MODEL = os.getenv("SINGLE_PASS_MODEL") or ARTICLE_MODEL
+SINGLE_PASS_MAX_SECONDS = int(os.getenv("SINGLE_PASS_MAX_SECONDS", "1800"))
+CAPTIONS_ENABLED = os.getenv("CAPTIONS_ENABLED", "false").lower() == "true"
+CAPTION_LANGUAGES = os.getenv("CAPTION_LANGUAGES", "ja,en")
+CAPTION_ALLOW_AUTO = os.getenv("CAPTION_ALLOW_AUTO", "true").lower() == "true"
+CAPTION_MIN_CHARS = int(os.getenv("CAPTION_MIN_CHARS", "200"))
+SCHEDULE_ORDER = (os.getenv("SCHEDULE_ORDER") or "playlist").lower()
+RUN_TOKEN_BUDGET = int(os.getenv("RUN_TOKEN_BUDGET", "0"))
+VIDEO_TOKENS_PER_SECOND = int(os.getenv("VIDEO_TOKENS_PER_SECOND", "300"))
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "100"))
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "30"))
+BATCH_POLL_MAX_SECONDS = float(os.getenv("BATCH_POLL_MAX_SECONDS", "600"))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "3600"))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "604800"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_PERMANENT_MAX_ATTEMPTS = int(os.getenv("RETRY_PERMANENT_MAX_ATTEMPTS", "2"))
+WORK_QUEUE_PATH = os.getenv("WORK_QUEUE_PATH") or ""
+WORKER_ID = os.getenv("WORKER_ID") or ""
+WORK_LEASE_SECONDS = float(os.getenv("WORK_LEASE_SECONDS", "600"))
+WORK_QUEUE_WAL = os.getenv("WORK_QUEUE_WAL", "true").lower() == "true"
+RUN_REPORT_PATH = os.getenv("RUN_REPORT_PATH", "run_report.json")
+RUN_REPORT_PROMETHEUS_PATH = os.getenv("RUN_REPORT_PROMETHEUS_PATH", "")
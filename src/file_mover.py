@@ -6,8 +6,13 @@ transcriptsディレクトリ内のマークダウンファイルをObsidianVaul
 import logging
 import os
 import shutil
+import tempfile
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Optional
+
+from .md_writer import TEMP_PREFIX, TEMP_SUFFIX
+from .metrics import METRICS
+from .vault_index import VaultIndex, read_note_video_id
 
 logger = logging.getLogger(__name__)
 
@@ -34,13 +39,72 @@ def get_markdown_files(source_dir: str) -> List[str]:
     return markdown_files
 
 
-def move_files_to_vault(source_dir: str, vault_path: str) -> int:
+def same_filesystem(path_a: str, path_b: str) -> bool:
+    """
+    2つのパスが同じファイルシステム上にあるかを判定
+
+    Args:
+        path_a: 判定するパス（存在するファイルまたはディレクトリ）
+        path_b: 判定するパス（存在するファイルまたはディレクトリ）
+
+    Returns:
+        同じファイルシステムの場合True（判定できない場合はFalse）
+    """
+    try:
+        return os.stat(path_a).st_dev == os.stat(path_b).st_dev
+    except OSError:
+        return False
+
+
+def _copy_replace(source: str, destination: str) -> None:
+    """
+    別のファイルシステムへファイルを移動
+
+    移動先ディレクトリの一時ファイルへコピーして fsync してから os.replace で
+    置き換え、最後に移動元を削除する。
+
+    Args:
+        source: 移動元ファイルパス
+        destination: 移動先ファイルパス
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(destination) or ".",
+        prefix=TEMP_PREFIX,
+        suffix=TEMP_SUFFIX,
+    )
+    try:
+        with os.fdopen(fd, "wb") as dst, open(source, "rb") as src:
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        shutil.copymode(source, tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.remove(source)
+
+
+def move_files_to_vault(
+    source_dir: str,
+    vault_path: str,
+    on_moved: Optional[Callable[[str, str], None]] = None,
+    index: Optional[VaultIndex] = None,
+    update_existing: bool = False,
+    file_paths: Optional[List[str]] = None,
+) -> int:
     """
     transcriptsディレクトリ内のマークダウンファイルをObsidianVaultに移動
 
     Args:
         source_dir: 移動元ディレクトリ（transcripts）
         vault_path: 移動先ディレクトリ（ObsidianVault）
+        on_moved: 移動完了ごとに (移動元パス, 移動先パス) で呼ばれるコールバック
+        index: vault_path のノート索引（ファイル名の重複判定と同じ動画のノートの検出に使用、
+            省略時は vault_path を走査して作成）
+        update_existing: 同じ動画のノートがある場合に上書きする（Falseの場合は移動しない）
+        file_paths: 移動するファイル（省略時は source_dir 内の全マークダウンファイル）
 
     Returns:
         移動したファイル数
@@ -60,42 +124,97 @@ def move_files_to_vault(source_dir: str, vault_path: str) -> int:
         return 0
 
     # マークダウンファイル一覧を取得
-    markdown_files = get_markdown_files(source_dir)
+    if file_paths is None:
+        markdown_files = get_markdown_files(source_dir)
+    else:
+        markdown_files = [path for path in file_paths if os.path.isfile(path)]
     if not markdown_files:
         logger.info(f"移動対象のマークダウンファイルが見つかりません: {source_dir}")
         return 0
 
+    # 同じファイルシステムならリネーム、異なる場合はコピーして置き換え
+    rename = same_filesystem(source_dir, vault_path)
+    if not rename:
+        logger.info(
+            f"移動元と移動先のファイルシステムが異なるためコピーで移動します: {vault_path}"
+        )
+
+    if index is None:
+        index = VaultIndex(vault_path)
+
     moved_count = 0
     for file_path in markdown_files:
+        file_name = os.path.basename(file_path)
+        destination = None
         try:
-            file_name = os.path.basename(file_path)
-            destination = os.path.join(vault_path, file_name)
-
-            # 同名ファイルが存在する場合の処理
-            if os.path.exists(destination):
-                base_name, ext = os.path.splitext(file_name)
-                counter = 1
-                while True:
-                    new_name = f"{base_name}_{counter}{ext}"
-                    destination = os.path.join(vault_path, new_name)
-                    if not os.path.exists(destination):
-                        break
-                    counter += 1
-                logger.warning(
-                    f"同名ファイルが存在するため名前を変更: {file_name} -> {os.path.basename(destination)}"
-                )
-
-            # ファイル移動
-            shutil.move(file_path, destination)
+            # 索引から移動先を決定（ファイルシステムへの問い合わせなし）
+            video_id = read_note_video_id(file_path)
+            destination = _index_destination(
+                file_path, video_id, index, update_existing
+            )
+            if destination is None:
+                continue
+
+            # ファイル移動（既存ノートの更新も含め、置き換えは不可分に行う）
+            with METRICS.span("move", "rename" if rename else "copy"):
+                if rename:
+                    os.replace(file_path, destination)
+                else:
+                    _copy_replace(file_path, destination)
+            index.add(destination, video_id)
             logger.info(f"ファイルを移動しました: {file_name} -> {vault_path}")
             moved_count += 1
+            if on_moved:
+                on_moved(file_path, destination)
 
         except Exception as e:
             logger.error(f"ファイル移動に失敗: {file_path} - {e}")
+            # 予約したファイル名を解放（既存ノートの更新に失敗した場合はそのまま残す）
+            if destination and not os.path.exists(destination):
+                index.discard(destination)
 
     return moved_count
 
 
+def _index_destination(
+    file_path: str, video_id: str, index: VaultIndex, update_existing: bool
+) -> Optional[str]:
+    """
+    ノート索引から移動先パスを決定（新しいファイル名は索引に予約する）
+
+    移動に成功した後に呼び出し側で index.add により video_id を登録する。
+
+    Args:
+        file_path: 移動元ファイルパス
+        video_id: 移動するノートの動画ID
+        index: 移動先ディレクトリのノート索引
+        update_existing: 同じ動画のノートを上書きするか
+
+    Returns:
+        移動先パス（移動しない場合はNone）
+    """
+    file_name = os.path.basename(file_path)
+    existing = index.find_video(video_id) if video_id else None
+
+    if existing and not update_existing:
+        logger.warning(
+            f"同じ動画のノートが既に存在するため移動しません: {file_name} ({existing})"
+        )
+        return None
+
+    if existing:
+        logger.info(f"同じ動画の既存ノートを更新します: {existing}")
+        return existing
+
+    base_name, ext = os.path.splitext(file_name)
+    destination = index.reserve(base_name, ext, first_suffix=1)
+    if os.path.basename(destination) != file_name:
+        logger.warning(
+            f"同名ファイルが存在するため名前を変更: {file_name} -> {os.path.basename(destination)}"
+        )
+    return destination
+
+
 def cleanup_empty_directories(directory: str) -> None:
     """
     空のディレクトリを削除
@@ -1,48 +1,38 @@
 import asyncio
+import json
 import logging
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from google import genai
-from google.genai import types
+from tenacity import (
+    AsyncRetrying,
+    before_sleep_log,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
-logger = logging.getLogger(__name__)
-
-
-async def generate_transcript(API_KEY: str, video_url: str) -> str:
-    """非同期で動画の文字起こしを生成"""
-    client = genai.Client(api_key=API_KEY)
-
-    # 同期的なAPI呼び出しを非同期で実行
-    loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(
-        None,
-        lambda: client.models.generate_content(
-            model="models/gemini-2.5-flash",
-            contents=types.Content(
-                parts=[
-                    types.Part(file_data=types.FileData(file_uri=video_url)),
-                    types.Part(text="Transcribe this video."),
-                ]
-            ),
-        ),
-    )
+from . import config
+from .cache import content_hash, make_key
+from .metrics import METRICS
+from .key_pool import get_key_pool
+from .rate_limiter import is_rate_limit_error
 
-    if response.text:
-        logger.debug(f"Transcript: {response.text[:20]}...")
-        return response.text
-    else:
-        logger.error("Transcriptが生成されませんでした。")
-        return ""
+# google.genai は読み込みが重いため、最初のAPI呼び出し時に読み込む
+if TYPE_CHECKING:
+    from google import genai
 
+logger = logging.getLogger(__name__)
 
-async def generate_article(API_KEY: str, transcript: str) -> str:
-    """非同期で記事を生成"""
-    client = genai.Client(api_key=API_KEY)
+TRANSCRIPT_PROMPT = "Transcribe this video."
 
-    contents = f"""
+ARTICLE_PROMPT = """
     Please execute the following workflow:\n
     1. Create a summary article based on the transcript provided below.\n
     2. Extract keywords from the article and add them as hashtags at the bottom.\n\n
-    
+
     - Create the article in Japanese.\n
     - Create the article in markdown format.\n
     - Focus on key points and include as much information as possible.\n
@@ -51,23 +41,1128 @@ async def generate_article(API_KEY: str, transcript: str) -> str:
     - Please note that including "." after "#" will prevent recognition as hashtags.\n
     - Select main keywords for hashtags to summarize the content of the file.\n
     - Use company names, product names, service names, specific person names, and specific technical terms mentioned in the article as hashtags.\n\n
-    
+
     ====Transcript below====\n
     {transcript}
     """
 
-    # 同期的なAPI呼び出しを非同期で実行
-    loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(
-        None,
-        lambda: client.models.generate_content(
-            model="models/gemini-2.5-pro", contents=contents
+
+SECTION_SUMMARY_PROMPT = """
+    The text below is one section of a long video transcript.\n
+    Summarize this section in Japanese, keeping every key point, figure, example,
+    company name, product name, person name and technical term it mentions.\n
+    - Output only the summary. No additional explanatory text is needed.\n\n
+
+    ====Transcript section below====\n
+    {section}
+    """
+
+ARTICLE_REDUCE_PROMPT = """
+    Please execute the following workflow:\n
+    1. Create a summary article based on the section summaries of a video transcript provided below.\n
+    2. Extract keywords from the article and add them as hashtags at the bottom.\n\n
+
+    - Create the article in Japanese.\n
+    - Create the article in markdown format.\n
+    - Focus on key points and include as much information as possible.\n
+    - **Important**: Output only the article. No additional explanatory text is needed.\n
+    - Hashtags start with "#" and multiple hashtags can be specified separated by half-width spaces.\n
+    - Please note that including "." after "#" will prevent recognition as hashtags.\n
+    - Select main keywords for hashtags to summarize the content of the file.\n
+    - Use company names, product names, service names, specific person names, and specific technical terms mentioned in the article as hashtags.\n\n
+
+    ====Section summaries below (in order)====\n
+    {summaries}
+    """
+
+SINGLE_PASS_PROMPT = """
+    Please execute the following workflow for this video:\n
+    1. Transcribe the video.\n
+    2. Create a summary article based on the transcript.\n
+    3. Extract keywords from the article as hashtags.\n\n
+
+    - Put the full transcript in "transcript" in the spoken language of the video.\n
+    - Create the article in Japanese, in markdown format, and put it in "article" without hashtags.\n
+    - Focus on key points and include as much information as possible.\n
+    - Put the hashtags in "hashtags" without "#". Do not include "." or spaces in a hashtag.\n
+    - Use company names, product names, service names, specific person names, and specific technical terms mentioned in the article as hashtags.\n
+    """
+
+# 1回のリクエストで文字起こしと記事を返す応答の JSON スキーマ
+# （文字起こしを先に出力させるため propertyOrdering で順序を指定）
+SINGLE_PASS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "transcript": {"type": "STRING"},
+        "article": {"type": "STRING"},
+        "hashtags": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["transcript", "article", "hashtags"],
+    "propertyOrdering": ["transcript", "article", "hashtags"],
+}
+
+
+# APIキー -> 共有クライアント（接続プールを実行全体で再利用）
+_clients: Dict[str, "genai.Client"] = {}
+
+
+def get_client(api_key: str) -> "genai.Client":
+    """
+    APIキーごとの共有クライアントを取得（初回呼び出し時に作成）
+
+    非同期API（client.aio）はhttpxの接続プールを使うため、
+    同じクライアントを使い回すことでTLSハンドシェイクを省略できる。
+
+    Args:
+        api_key: Gemini APIキー
+
+    Returns:
+        Geminiクライアント
+    """
+    if api_key not in _clients:
+        import httpx
+        from google import genai
+        from google.genai import types
+
+        limits = httpx.Limits(
+            max_connections=config.GEMINI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.GEMINI_HTTP_MAX_CONNECTIONS,
+        )
+        _clients[api_key] = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(async_client_args={"limits": limits}),
+        )
+    return _clients[api_key]
+
+
+async def close_clients() -> None:
+    """
+    共有クライアントの接続プールを閉じて破棄
+
+    AsyncClient.aclose() がないSDKのバージョンでは、
+    クライアントが保持する httpx.AsyncClient を直接閉じる。
+    """
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        aclose = getattr(client.aio, "aclose", None)
+        if aclose is None:
+            http_client = getattr(
+                getattr(client, "_api_client", None), "_async_httpx_client", None
+            )
+            aclose = getattr(http_client, "aclose", None)
+        if aclose is None:
+            continue
+        try:
+            await aclose()
+        except Exception as e:
+            logger.warning(f"Geminiクライアントの接続を閉じる際にエラー: {e}")
+
+
+def _total_tokens(response: Any) -> Optional[int]:
+    """レスポンスのusage_metadataから合計トークン数を取得"""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage else None
+
+
+async def _call_with_rate_limit(
+    API_KEY: str,
+    model: str,
+    estimated_tokens: int,
+    request: Callable[["genai.Client"], Awaitable[Any]],
+    started: Optional[asyncio.Event] = None,
+) -> Any:
+    """
+    レート制限下でAPIを呼び出し、429の場合はジッター付き指数バックオフで再試行
+
+    試行ごとにAPIキープールから空き容量の最も多いキーを選び、そのキーのクライアントで呼び出す。
+    429を受けたキーは一時的に振り分け先から外し、使用できるキーが残っていればすぐに再試行する。
+    すべてのキーが外されている場合は、最も早く戻るキーの期限まで待ってから再試行する。
+    レートリミッターの待ち時間・リクエストの所要時間・トークン使用量を計測値に記録する。
+
+    Args:
+        API_KEY: Gemini APIキー（GEMINI_API_KEYS に含まれる場合は全キーに振り分け）
+        model: モデル名（レートリミッターの選択に使用）
+        estimated_tokens: 推定トークン数
+        request: クライアントを受け取りAPI呼び出しを行うコルーチン関数
+        started: 最初のリクエストの送信時にセットするイベント
+
+    Returns:
+        APIレスポンス
+    """
+    pool = get_key_pool(API_KEY)
+    backoff = wait_random_exponential(multiplier=2, max=60)
+    async for attempt in AsyncRetrying(
+        retry=retry_if_exception(is_rate_limit_error),
+        wait=lambda state: 0 if pool.available(model) else backoff(state),
+        stop=stop_after_attempt(config.GEMINI_MAX_RETRIES),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True,
+    ):
+        with attempt:
+            cooldown = pool.wait_time(model)
+            if cooldown > 0:
+                logger.warning(
+                    "すべてのAPIキーが429で一時停止中のため %.0f 秒待機します（%s）",
+                    cooldown,
+                    model,
+                )
+                await asyncio.sleep(cooldown)
+            key = pool.choose(model, estimated_tokens)
+            waiting_since = time.perf_counter()
+            try:
+                async with pool.limiter(key, model).slot(
+                    estimated_tokens
+                ) as reservation:
+                    METRICS.observe(
+                        "rate_limit_wait", time.perf_counter() - waiting_since, model
+                    )
+                    if started:
+                        started.set()
+                    with METRICS.span("gemini_request", model):
+                        response = await request(get_client(key))
+                    reservation.actual_tokens = _total_tokens(response)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    pool.record_throttle(key, model, e)
+                raise
+            pool.record_success(key, model, reservation.actual_tokens)
+            METRICS.record_usage(
+                model, getattr(response, "usage_metadata", None), pool.label(key)
+            )
+    return response
+
+
+def _hedge_delay(stage: str, model: str) -> Optional[float]:
+    """
+    ヘッジリクエストを送信するまでの秒数
+
+    Args:
+        stage: 生成内容（GEMINI_DEADLINES・HEDGE_STAGES のキー）
+        model: 最初のリクエストのモデル名
+
+    Returns:
+        秒数（ヘッジしない場合・応答時間の記録が足りない場合はNone）
+    """
+    if stage not in config.HEDGE_STAGES:
+        return None
+    threshold = METRICS.percentile(
+        "gemini_request", config.HEDGE_PERCENTILE, model, config.HEDGE_MIN_SAMPLES
+    )
+    if threshold is None:
+        return None
+    return max(threshold, config.HEDGE_MIN_SECONDS)
+
+
+async def _call_with_deadline(
+    API_KEY: str,
+    stage: str,
+    model: str,
+    estimated_tokens: int,
+    request: Callable[["genai.Client", str], Awaitable[Any]],
+    fallback_model: Optional[str] = None,
+) -> Tuple[Any, str]:
+    """
+    応答期限付きでAPIを呼び出し、応答が遅い場合はヘッジリクエストを追加で送信
+
+    最初のリクエストの送信からの経過時間がモデルの応答時間のパーセンタイル（_hedge_delay）を
+    超えた場合、同じ内容のリクエストを fallback_model（省略時は同じモデル）で送信し、
+    先に成功した結果を使用してもう一方は中止する。GEMINI_DEADLINES の期限を過ぎた場合は
+    すべてのリクエストを中止して TimeoutError を送出する（レートリミッターの待ち時間は含めない）。
+
+    Args:
+        API_KEY: Gemini APIキー
+        stage: 生成内容（transcript / article / summary / single_pass）
+        model: モデル名
+        estimated_tokens: 推定トークン数
+        request: クライアントとモデル名を受け取りAPI呼び出しを行うコルーチン関数
+        fallback_model: ヘッジリクエストのモデル名
+
+    Returns:
+        (APIレスポンス, 応答したモデル名) のタプル
+    """
+    deadline = config.GEMINI_DEADLINES.get(stage, 0)
+    started = asyncio.Event()
+    primary = asyncio.create_task(
+        _call_with_rate_limit(
+            API_KEY,
+            model,
+            estimated_tokens,
+            lambda client: request(client, model),
+            started,
+        )
+    )
+    tasks = {primary: model}
+    waiter = asyncio.create_task(started.wait())
+    try:
+        await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        async with asyncio.timeout(deadline or None):
+            hedge_delay = _hedge_delay(stage, model)
+            if hedge_delay is not None and not primary.done():
+                done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+                if not done:
+                    hedge_model = fallback_model or model
+                    METRICS.increment(f"gemini_hedged_{stage}")
+                    logger.info(
+                        "応答が %.0f 秒を超えたため %s にもリクエストします（%s）",
+                        hedge_delay,
+                        hedge_model,
+                        stage,
+                    )
+                    hedge = asyncio.create_task(
+                        _call_with_rate_limit(
+                            API_KEY,
+                            hedge_model,
+                            estimated_tokens,
+                            lambda client: request(client, hedge_model),
+                        )
+                    )
+                    tasks[hedge] = hedge_model
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    winner = primary if primary in succeeded else succeeded[0]
+                    break
+                if not pending:
+                    raise primary.exception()
+    except TimeoutError:
+        METRICS.increment(f"gemini_deadline_exceeded_{stage}")
+        logger.warning(
+            "応答期限（%.0f 秒）を過ぎたためリクエストを中止しました（%s、%s）",
+            deadline,
+            stage,
+            model,
+        )
+        raise
+    finally:
+        # 中止したリクエストのレートリミッターの枠・書き込み中のファイルを解放してから戻る
+        waiter.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(waiter, *tasks, return_exceptions=True)
+
+    if winner is not primary:
+        METRICS.increment(f"gemini_hedge_wins_{stage}")
+    return winner.result(), tasks[winner]
+
+
+def is_long_video(duration_seconds: int) -> bool:
+    """
+    分割文字起こしの対象となる長尺動画かを判定
+
+    Args:
+        duration_seconds: 動画の長さ（秒）
+
+    Returns:
+        長尺動画の場合True
+    """
+    return 0 < config.LONG_VIDEO_THRESHOLD_SECONDS <= duration_seconds
+
+
+def transcript_cache_key(video_id: str, duration_seconds: int = 0) -> str:
+    """
+    文字起こし結果のキャッシュキーを生成
+
+    Args:
+        video_id: YouTube動画ID
+        duration_seconds: 動画の長さ（秒、分割文字起こしの判定に使用）
+
+    Returns:
+        video_id・モデル・プロンプト（分割時は分割幅）から決まるキャッシュキー
+    """
+    parts = [
+        "transcript",
+        video_id,
+        config.TRANSCRIPT_MODEL,
+        content_hash(TRANSCRIPT_PROMPT),
+    ]
+    if is_long_video(duration_seconds):
+        parts.append(f"segment={config.SEGMENT_SECONDS}")
+    return make_key(*parts)
+
+
+def is_map_reduce_article(transcript_chars: int) -> bool:
+    """
+    記事を分割要約（map-reduce）で生成する長さの文字起こしかを判定
+
+    Args:
+        transcript_chars: 文字起こしの文字数
+
+    Returns:
+        分割要約の対象の場合True
+    """
+    return 0 < config.ARTICLE_MAP_REDUCE_THRESHOLD_CHARS < transcript_chars
+
+
+def article_models() -> List[str]:
+    """
+    記事を生成するモデル（ARTICLE_MODEL と、記事のヘッジで使用する ARTICLE_FALLBACK_MODEL）
+
+    Returns:
+        モデル名のリスト（優先する順）
+    """
+    models = [config.ARTICLE_MODEL]
+    if "article" in config.HEDGE_STAGES and config.ARTICLE_FALLBACK_MODEL:
+        models.append(config.ARTICLE_FALLBACK_MODEL)
+    return list(dict.fromkeys(models))
+
+
+def article_cache_key(
+    video_id: str,
+    transcript_hash: str,
+    transcript_chars: int = 0,
+    model: Optional[str] = None,
+) -> str:
+    """
+    記事のキャッシュキーを生成
+
+    文字起こし結果の内容も含めるため、記事のプロンプトやモデルを変更した場合は
+    文字起こしキャッシュを再利用したまま記事のみ再生成される。
+
+    Args:
+        video_id: YouTube動画ID
+        transcript_hash: 記事の元になる文字起こしテキストのハッシュ値
+        transcript_chars: 文字起こしの文字数（分割要約の判定に使用）
+        model: 記事を生成したモデル名（省略時は ARTICLE_MODEL）
+
+    Returns:
+        video_id・モデル・プロンプト・文字起こし内容から決まるキャッシュキー
+    """
+    parts = [
+        "article",
+        video_id,
+        model or config.ARTICLE_MODEL,
+        content_hash(ARTICLE_PROMPT),
+        transcript_hash,
+    ]
+    if is_map_reduce_article(transcript_chars):
+        parts += [
+            config.ARTICLE_SUMMARY_MODEL,
+            content_hash(SECTION_SUMMARY_PROMPT + ARTICLE_REDUCE_PROMPT),
+            f"chunk={config.ARTICLE_CHUNK_CHARS}",
+        ]
+    return make_key(*parts)
+
+
+def is_single_pass_video(duration_seconds: int) -> bool:
+    """
+    文字起こしと記事を1回のリクエストで生成する対象の動画かを判定
+
+    出力トークン数の上限に収まりやすい、長さが分かっている短い・中程度の動画のみ対象とする。
+
+    Args:
+        duration_seconds: 動画の長さ（秒）
+
+    Returns:
+        対象の場合True
+    """
+    return (
+        config.SINGLE_PASS_MODE
+        and not is_long_video(duration_seconds)
+        and 0 < duration_seconds <= config.SINGLE_PASS_MAX_SECONDS
+    )
+
+
+def single_pass_cache_key(video_id: str) -> str:
+    """
+    1回のリクエストで生成した文字起こし・記事のキャッシュキーを生成
+
+    Args:
+        video_id: YouTube動画ID
+
+    Returns:
+        video_id・モデル・プロンプト・スキーマから決まるキャッシュキー
+    """
+    return make_key(
+        "single_pass",
+        video_id,
+        config.SINGLE_PASS_MODEL,
+        content_hash(SINGLE_PASS_PROMPT + json.dumps(SINGLE_PASS_SCHEMA)),
+    )
+
+
+def format_timestamp(seconds: int) -> str:
+    """
+    秒数を HH:MM:SS 形式に変換
+
+    Args:
+        seconds: 秒数
+
+    Returns:
+        HH:MM:SS 形式の文字列
+    """
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def split_segments(
+    duration_seconds: int, segment_seconds: int
+) -> List[Tuple[int, int]]:
+    """
+    動画の長さを一定幅の時間区間に分割
+
+    Args:
+        duration_seconds: 動画の長さ（秒）
+        segment_seconds: 1区間の長さ（秒）
+
+    Returns:
+        (開始秒, 終了秒) のリスト
+    """
+    return [
+        (start, min(start + segment_seconds, duration_seconds))
+        for start in range(0, duration_seconds, segment_seconds)
+    ]
+
+
+def transcript_contents(
+    video_url: str,
+    start_seconds: Optional[int] = None,
+    end_seconds: Optional[int] = None,
+    prompt: str = TRANSCRIPT_PROMPT,
+) -> Any:
+    """
+    文字起こしリクエストの入力を作成
+
+    Args:
+        video_url: YouTube動画URL
+        start_seconds: 区間の開始秒（全体の場合はNone）
+        end_seconds: 区間の終了秒（全体の場合はNone）
+        prompt: 動画と一緒に送るプロンプト
+
+    Returns:
+        リクエストの contents
+    """
+    from google.genai import types
+
+    video_metadata = None
+    if start_seconds is not None and end_seconds is not None:
+        video_metadata = types.VideoMetadata(
+            start_offset=f"{start_seconds}s", end_offset=f"{end_seconds}s"
+        )
+
+    return types.Content(
+        parts=[
+            types.Part(
+                file_data=types.FileData(file_uri=video_url),
+                video_metadata=video_metadata,
+            ),
+            types.Part(text=prompt),
+        ]
+    )
+
+
+def _segment_retrying() -> AsyncRetrying:
+    """
+    区間単位の再試行設定を作成
+
+    レート制限エラーは _call_with_rate_limit 内で再試行済みのため対象外とする。
+
+    Returns:
+        tenacity の再試行オブジェクト
+    """
+    return AsyncRetrying(
+        retry=retry_if_exception(lambda e: not is_rate_limit_error(e)),
+        wait=wait_random_exponential(multiplier=2, max=30),
+        stop=stop_after_attempt(config.SEGMENT_MAX_RETRIES),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True,
+    )
+
+
+def _segment_heading(start: int, end: int) -> str:
+    """区間の見出しを作成"""
+    return f"### [{format_timestamp(start)} - {format_timestamp(end)}]"
+
+
+async def _transcribe_part(
+    API_KEY: str,
+    video_url: str,
+    start_seconds: Optional[int] = None,
+    end_seconds: Optional[int] = None,
+) -> str:
+    """
+    動画全体または指定区間の文字起こしを1回のリクエストで生成
+
+    Args:
+        API_KEY: Gemini APIキー
+        video_url: YouTube動画URL
+        start_seconds: 区間の開始秒（全体の場合はNone）
+        end_seconds: 区間の終了秒（全体の場合はNone）
+
+    Returns:
+        文字起こしテキスト（生成されなかった場合は空文字）
+    """
+    contents = transcript_contents(video_url, start_seconds, end_seconds)
+
+    response, _ = await _call_with_deadline(
+        API_KEY,
+        "transcript",
+        config.TRANSCRIPT_MODEL,
+        config.TRANSCRIPT_ESTIMATED_TOKENS,
+        lambda client, model: client.aio.models.generate_content(
+            model=model, contents=contents
+        ),
+    )
+    return response.text or ""
+
+
+async def _generate_segmented_transcript(
+    API_KEY: str, video_url: str, duration_seconds: int
+) -> str:
+    """
+    長尺動画を時間区間に分割して並行に文字起こしし、区間順に結合
+
+    各区間はレートリミッターの範囲内で並行実行され、
+    失敗した区間のみ SEGMENT_MAX_RETRIES 回まで再試行する。
+
+    Args:
+        API_KEY: Gemini APIキー
+        video_url: YouTube動画URL
+        duration_seconds: 動画の長さ（秒）
+
+    Returns:
+        タイムスタンプ見出し付きで結合した文字起こしテキスト
+    """
+    segments = split_segments(duration_seconds, config.SEGMENT_SECONDS)
+    logger.info(
+        "長尺動画のため %d 区間に分割して文字起こしします（%s）",
+        len(segments),
+        format_timestamp(duration_seconds),
+    )
+
+    async def transcribe_segment(start: int, end: int) -> str:
+        async for attempt in _segment_retrying():
+            with attempt:
+                text = await _transcribe_part(API_KEY, video_url, start, end)
+                if not text:
+                    raise ValueError(
+                        f"区間 {format_timestamp(start)}-{format_timestamp(end)} "
+                        "の文字起こしが空でした"
+                    )
+        return text
+
+    texts = await asyncio.gather(
+        *(transcribe_segment(start, end) for start, end in segments)
+    )
+
+    return "\n\n".join(
+        f"{_segment_heading(start, end)}\n\n{text.strip()}"
+        for (start, end), text in zip(segments, texts)
+    )
+
+
+async def generate_transcript(
+    API_KEY: str, video_url: str, duration_seconds: int = 0
+) -> str:
+    """
+    非同期で動画の文字起こしを生成
+
+    LONG_VIDEO_THRESHOLD_SECONDS 以上の動画は区間に分割して並行に文字起こしする。
+
+    Args:
+        API_KEY: Gemini APIキー
+        video_url: YouTube動画URL
+        duration_seconds: 動画の長さ（秒、不明な場合は0）
+
+    Returns:
+        文字起こしテキスト（生成されなかった場合は空文字）
+    """
+    if is_long_video(duration_seconds):
+        text = await _generate_segmented_transcript(
+            API_KEY, video_url, duration_seconds
+        )
+    else:
+        text = await _transcribe_part(API_KEY, video_url)
+
+    if text:
+        logger.debug(f"Transcript: {text[:20]}...")
+        return text
+    else:
+        logger.error("Transcriptが生成されませんでした。")
+        return ""
+
+
+def split_transcript(transcript: str, chunk_chars: int) -> List[str]:
+    """
+    文字起こしを行単位でおよそ指定文字数ごとのセクションに分割
+
+    Args:
+        transcript: 文字起こしテキスト
+        chunk_chars: 1セクションの目安の文字数
+
+    Returns:
+        セクションのリスト
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_chars = 0
+
+    for line in transcript.splitlines(keepends=True):
+        # 1行が上限を超える場合は行の途中で分割
+        while len(line) > chunk_chars:
+            if current:
+                chunks.append("".join(current))
+                current, current_chars = [], 0
+            chunks.append(line[:chunk_chars])
+            line = line[chunk_chars:]
+
+        if current_chars + len(line) > chunk_chars and current:
+            chunks.append("".join(current))
+            current, current_chars = [], 0
+        current.append(line)
+        current_chars += len(line)
+
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+async def _summarize_section(API_KEY: str, section: str) -> str:
+    """
+    文字起こしの1セクションを要約用モデルで要約
+
+    Args:
+        API_KEY: Gemini APIキー
+        section: 文字起こしのセクション
+
+    Returns:
+        セクションの要約
+    """
+    contents = SECTION_SUMMARY_PROMPT.format(section=section)
+
+    async for attempt in _segment_retrying():
+        with attempt:
+            response, _ = await _call_with_deadline(
+                API_KEY,
+                "summary",
+                config.ARTICLE_SUMMARY_MODEL,
+                len(contents) // 3,
+                lambda client, model: client.aio.models.generate_content(
+                    model=model, contents=contents
+                ),
+            )
+            if not response.text:
+                raise ValueError("セクションの要約が空でした")
+    return response.text
+
+
+async def _article_contents(API_KEY: str, transcript: str) -> str:
+    """
+    記事生成リクエストの入力を作成
+
+    長い文字起こしはセクションに分割して要約用モデルで並行に要約し（map）、
+    要約を結合した入力から記事を生成する（reduce）。
+
+    Args:
+        API_KEY: Gemini APIキー
+        transcript: 文字起こしテキスト
+
+    Returns:
+        記事生成リクエストの contents
+    """
+    if not is_map_reduce_article(len(transcript)):
+        return ARTICLE_PROMPT.format(transcript=transcript)
+
+    sections = split_transcript(transcript, config.ARTICLE_CHUNK_CHARS)
+    logger.info("文字起こしが長いため %d セクションに分けて要約します", len(sections))
+    summaries = await asyncio.gather(
+        *(_summarize_section(API_KEY, section) for section in sections)
+    )
+    return ARTICLE_REDUCE_PROMPT.format(
+        summaries="\n\n".join(
+            f"## Section {index}\n{summary.strip()}"
+            for index, summary in enumerate(summaries, 1)
+        )
+    )
+
+
+async def generate_article(API_KEY: str, transcript: str) -> Tuple[str, str]:
+    """
+    非同期で記事を生成
+
+    応答が遅い場合は ARTICLE_FALLBACK_MODEL へのヘッジリクエストの結果を使用することがある。
+
+    Args:
+        API_KEY: Gemini APIキー
+        transcript: 文字起こしテキスト
+
+    Returns:
+        (記事, 生成したモデル名) のタプル（生成されなかった場合の記事は空文字）
+    """
+    contents = await _article_contents(API_KEY, transcript)
+
+    # 入力トークン数はおよそ3文字で1トークンとして推定
+    response, model = await _call_with_deadline(
+        API_KEY,
+        "article",
+        config.ARTICLE_MODEL,
+        len(contents) // 3,
+        lambda client, model: client.aio.models.generate_content(
+            model=model, contents=contents
         ),
+        config.ARTICLE_FALLBACK_MODEL,
     )
 
     if response.text:
         logger.debug(f"Article: {response.text[:20]}...")
-        return response.text
+        return response.text, model
     else:
         logger.error("Articleが生成されませんでした。")
-        return ""
+        return "", model
+
+
+def _finish_reason(response: Any) -> str:
+    """レスポンスの最初の候補の終了理由（例: STOP、MAX_TOKENS）"""
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return getattr(reason, "name", None) or str(reason or "")
+
+
+async def generate_single_pass(
+    API_KEY: str, video_url: str
+) -> Optional[Dict[str, Any]]:
+    """
+    1回のリクエストで文字起こしと記事を構造化出力（JSON）として生成
+
+    出力トークン数の上限で打ち切られた場合や、JSONとして解釈できない場合は
+    Noneを返す（呼び出し側で文字起こし・記事生成の2回のリクエストに切り替える）。
+
+    Args:
+        API_KEY: Gemini APIキー
+        video_url: YouTube動画URL
+
+    Returns:
+        transcript・article・hashtags を含む辞書（生成できなかった場合はNone）
+    """
+    from google.genai import types
+
+    contents = transcript_contents(video_url, prompt=SINGLE_PASS_PROMPT)
+    generation_config = types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=SINGLE_PASS_SCHEMA,
+    )
+
+    response, _ = await _call_with_deadline(
+        API_KEY,
+        "single_pass",
+        config.SINGLE_PASS_MODEL,
+        config.TRANSCRIPT_ESTIMATED_TOKENS,
+        lambda client, model: client.aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=generation_config,
+        ),
+    )
+
+    finish_reason = _finish_reason(response)
+    if finish_reason == "MAX_TOKENS":
+        logger.warning("出力トークン数の上限に達したため、2回のリクエストで生成します")
+        return None
+    try:
+        result = json.loads(response.text or "")
+    except ValueError:
+        logger.warning(
+            f"構造化出力を解釈できないため、2回のリクエストで生成します（{finish_reason}）"
+        )
+        return None
+    if not (
+        isinstance(result, dict) and result.get("transcript") and result.get("article")
+    ):
+        logger.warning("構造化出力が空のため、2回のリクエストで生成します")
+        return None
+    return result
+
+
+async def _stream_to_file(
+    API_KEY: str,
+    stage: str,
+    model: str,
+    estimated_tokens: int,
+    contents: Any,
+    path: str,
+    fallback_model: Optional[str] = None,
+) -> Optional[str]:
+    """
+    generate_content_stream の出力を受信したチャンクごとにファイルへ追記
+
+    リクエスト（ヘッジリクエスト・再試行を含む）ごとに別のファイルへ書き込み、
+    使用した結果のファイルを path に置き換える（それ以外のファイルは削除する）。
+    すべてのリクエストが失敗した場合は、最後に書き込んだファイルの受信済みの内容を path に残す。
+
+    Args:
+        API_KEY: Gemini APIキー
+        stage: 生成内容（_call_with_deadline を参照）
+        model: モデル名
+        estimated_tokens: 推定トークン数
+        contents: リクエストの contents
+        path: 書き込み先ファイルパス
+        fallback_model: ヘッジリクエストのモデル名
+
+    Returns:
+        1文字以上書き込めた場合は生成したモデル名（書き込めなかった場合はNone）
+    """
+    attempt_paths: List[str] = []
+    # (最終チャンク, 書き込んだファイル)（使用した結果のファイルの特定に使用）
+    finished: List[Tuple[Any, str]] = []
+
+    async def request(client: "genai.Client", model: str) -> Any:
+        attempt_path = f"{path}.{len(attempt_paths)}"
+        attempt_paths.append(attempt_path)
+        last_chunk = None
+        stream = await client.aio.models.generate_content_stream(
+            model=model, contents=contents
+        )
+        with open(attempt_path, "w", encoding="utf-8", newline="") as f:
+            async for chunk in stream:
+                if chunk.text:
+                    f.write(chunk.text)
+                    f.flush()
+                last_chunk = chunk
+        finished.append((last_chunk, attempt_path))
+        # 最終チャンクの usage_metadata でトークン使用量を補正する
+        return last_chunk
+
+    try:
+        last_chunk, model = await _call_with_deadline(
+            API_KEY, stage, model, estimated_tokens, request, fallback_model
+        )
+    except BaseException:
+        for attempt_path in reversed(attempt_paths):
+            if os.path.exists(attempt_path):
+                os.replace(attempt_path, path)
+                break
+        raise
+    else:
+        for chunk, attempt_path in finished:
+            if chunk is last_chunk:
+                os.replace(attempt_path, path)
+                break
+    finally:
+        for attempt_path in attempt_paths:
+            if os.path.exists(attempt_path):
+                os.remove(attempt_path)
+    return model if os.path.exists(path) and os.path.getsize(path) > 0 else None
+
+
+async def _stream_segmented_transcript(
+    API_KEY: str, video_url: str, path: str, duration_seconds: int
+) -> bool:
+    """
+    長尺動画の各区間をストリーミングで文字起こしし、区間順にファイルへ結合
+
+    完了した区間は "<path>.segNNN" として保存し、再試行・再実行時は再利用する。
+
+    Args:
+        API_KEY: Gemini APIキー
+        video_url: YouTube動画URL
+        path: 結合結果の書き込み先ファイルパス
+        duration_seconds: 動画の長さ（秒）
+
+    Returns:
+        成功した場合True
+    """
+    segments = split_segments(duration_seconds, config.SEGMENT_SECONDS)
+    logger.info(
+        "長尺動画のため %d 区間に分割して文字起こしします（%s）",
+        len(segments),
+        format_timestamp(duration_seconds),
+    )
+
+    async def stream_segment(index: int, start: int, end: int) -> str:
+        segment_path = f"{path}.seg{index:03d}"
+        if os.path.exists(segment_path):
+            logger.info("完了済みの区間を再利用: %s", _segment_heading(start, end))
+            return segment_path
+
+        tmp_path = f"{segment_path}.tmp"
+        async for attempt in _segment_retrying():
+            with attempt:
+                contents = transcript_contents(video_url, start, end)
+                if not await _stream_to_file(
+                    API_KEY,
+                    "transcript",
+                    config.TRANSCRIPT_MODEL,
+                    config.TRANSCRIPT_ESTIMATED_TOKENS,
+                    contents,
+                    tmp_path,
+                ):
+                    raise ValueError(
+                        f"区間 {format_timestamp(start)}-{format_timestamp(end)} "
+                        "の文字起こしが空でした"
+                    )
+        os.replace(tmp_path, segment_path)
+        return segment_path
+
+    segment_paths = await asyncio.gather(
+        *(
+            stream_segment(index, start, end)
+            for index, (start, end) in enumerate(segments)
+        )
+    )
+
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        for index, ((start, end), segment_path) in enumerate(
+            zip(segments, segment_paths)
+        ):
+            if index:
+                out.write("\n\n")
+            out.write(f"{_segment_heading(start, end)}\n\n")
+            with open(segment_path, "r", encoding="utf-8", newline="") as f:
+                shutil.copyfileobj(f, out)
+
+    for segment_path in segment_paths:
+        os.remove(segment_path)
+    return True
+
+
+async def stream_transcript_to_file(
+    API_KEY: str, video_url: str, path: str, duration_seconds: int = 0
+) -> bool:
+    """
+    動画の文字起こしをストリーミングで生成し、ファイルへ逐次書き込む
+
+    Args:
+        API_KEY: Gemini APIキー
+        video_url: YouTube動画URL
+        path: 書き込み先ファイルパス
+        duration_seconds: 動画の長さ（秒、不明な場合は0）
+
+    Returns:
+        成功した場合True
+    """
+    if is_long_video(duration_seconds):
+        ok = await _stream_segmented_transcript(
+            API_KEY, video_url, path, duration_seconds
+        )
+    else:
+        ok = bool(
+            await _stream_to_file(
+                API_KEY,
+                "transcript",
+                config.TRANSCRIPT_MODEL,
+                config.TRANSCRIPT_ESTIMATED_TOKENS,
+                transcript_contents(video_url),
+                path,
+            )
+        )
+
+    if not ok:
+        logger.error("Transcriptが生成されませんでした。")
+    return ok
+
+
+async def stream_article_to_file(
+    API_KEY: str, transcript_path: str, path: str
+) -> Optional[str]:
+    """
+    文字起こしファイルから記事をストリーミングで生成し、ファイルへ逐次書き込む
+
+    Args:
+        API_KEY: Gemini APIキー
+        transcript_path: 文字起こしファイルのパス
+        path: 書き込み先ファイルパス
+
+    Returns:
+        成功した場合は生成したモデル名（失敗した場合はNone）
+    """
+    with open(transcript_path, "r", encoding="utf-8", newline="") as f:
+        contents = await _article_contents(API_KEY, f.read())
+
+    model = await _stream_to_file(
+        API_KEY,
+        "article",
+        config.ARTICLE_MODEL,
+        len(contents) // 3,
+        contents,
+        path,
+        config.ARTICLE_FALLBACK_MODEL,
+    )
+    if not model:
+        logger.error("Articleが生成されませんでした。")
+    return model
+
+
+# バッチジョブの終了状態（JobState の名前）
+BATCH_DONE_STATES = frozenset(
+    {
+        "JOB_STATE_SUCCEEDED",
+        "JOB_STATE_PARTIALLY_SUCCEEDED",
+        "JOB_STATE_FAILED",
+        "JOB_STATE_CANCELLED",
+        "JOB_STATE_EXPIRED",
+    }
+)
+
+
+async def create_batch_job(
+    API_KEY: str, model: str, contents: List[Any], display_name: str
+) -> str:
+    """
+    インラインリクエストのバッチジョブを作成
+
+    Args:
+        API_KEY: Gemini APIキー
+        model: モデル名
+        contents: リクエストごとの contents のリスト（結果は同じ順で返る）
+        display_name: ジョブの表示名
+
+    Returns:
+        ジョブ名（batches/...）
+    """
+    from google.genai import types
+
+    client = get_client(API_KEY)
+    job = await client.aio.batches.create(
+        model=model,
+        src=[types.InlinedRequest(contents=request) for request in contents],
+        config=types.CreateBatchJobConfig(display_name=display_name),
+    )
+    return job.name
+
+
+async def get_batch_job(API_KEY: str, name: str) -> Any:
+    """
+    バッチジョブの状態を取得
+
+    Args:
+        API_KEY: Gemini APIキー
+        name: ジョブ名
+
+    Returns:
+        バッチジョブ
+    """
+    client = get_client(API_KEY)
+    return await client.aio.batches.get(name=name)
+
+
+def batch_job_state(job: Any) -> str:
+    """バッチジョブの状態名（例: JOB_STATE_SUCCEEDED）"""
+    state = getattr(job, "state", None)
+    return getattr(state, "name", None) or str(state)
+
+
+def batch_job_responses(job: Any) -> List[Optional[Any]]:
+    """
+    終了したバッチジョブのリクエストごとのレスポンスを取得
+
+    Args:
+        job: バッチジョブ
+
+    Returns:
+        リクエストと同じ順のレスポンスのリスト（失敗したリクエストはNone）
+    """
+    dest = getattr(job, "dest", None)
+    responses = []
+    for inlined in getattr(dest, "inlined_responses", None) or []:
+        if getattr(inlined, "error", None):
+            logger.warning(f"バッチリクエストが失敗しました: {inlined.error}")
+            responses.append(None)
+        else:
+            responses.append(inlined.response)
+    return responses
@@ -0,0 +1,230 @@
+"""
+APIキープールモジュール
+複数のGemini APIキーにリクエストを振り分ける。
+キー×モデルごとのレートリミッターの空き容量とトークン使用量から振り分け先を選び、
+429を受けたキーは一定時間（連続するたびに倍）振り分け先から外す
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+from . import config
+from .metrics import METRICS
+from .rate_limiter import AdaptiveRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# 1日あたりの利用枠を使い切った場合のエラーメッセージに含まれる文字列
+_DAILY_QUOTA_MARKERS = ("PerDay", "per day")
+
+
+def is_daily_quota_error(error: BaseException) -> bool:
+    """
+    例外が1日あたりの利用枠の超過によるものかを判定
+
+    Args:
+        error: 判定する例外
+
+    Returns:
+        1日あたりの利用枠の超過の場合True
+    """
+    message = str(error)
+    return any(marker in message for marker in _DAILY_QUOTA_MARKERS)
+
+
+@dataclass
+class _KeyState:
+    """APIキー×モデルの状態"""
+
+    limiter: AdaptiveRateLimiter
+    # 成功したリクエストの合計トークン数
+    tokens: int = 0
+    # 連続した429の回数
+    throttles: int = 0
+    # 振り分け先から外す期限（time.monotonic）
+    sidelined_until: float = 0.0
+
+
+class ApiKeyPool:
+    """
+    複数のAPIキーへのリクエストの振り分け
+
+    レート制限（GEMINI_RATE_LIMITS・GEMINI_MAX_CONCURRENCY）はキーごとに適用されるため、
+    キーを追加するとその分だけ全体のスループットが増える。
+    """
+
+    def __init__(self, keys: Sequence[str]):
+        """
+        Args:
+            keys: APIキーのリスト（ログ・レポートでは key1, key2, ... と表記）
+        """
+        self.keys = list(keys)
+        self._labels = {key: f"key{n}" for n, key in enumerate(self.keys, 1)}
+        # (APIキー, モデル名) -> 状態
+        self._states: Dict[Tuple[str, str], _KeyState] = {}
+
+    def label(self, key: str) -> str:
+        """ログ・レポート用のキーの表記"""
+        return self._labels.get(key, "key")
+
+    def _state(self, key: str, model: str) -> _KeyState:
+        """キー×モデルの状態を取得（初回呼び出し時に作成）"""
+        state = self._states.get((key, model))
+        if state is None:
+            rpm, tpm = config.GEMINI_RATE_LIMITS.get(model, (0, 0))
+            name = model if len(self.keys) == 1 else f"{model} {self.label(key)}"
+            state = self._states[(key, model)] = _KeyState(
+                AdaptiveRateLimiter(
+                    name,
+                    rpm=rpm,
+                    tpm=tpm,
+                    max_concurrency=config.GEMINI_MAX_CONCURRENCY,
+                )
+            )
+        return state
+
+    def limiter(self, key: str, model: str) -> AdaptiveRateLimiter:
+        """
+        キー×モデルのレートリミッターを取得
+
+        Args:
+            key: APIキー
+            model: モデル名
+
+        Returns:
+            レートリミッター
+        """
+        return self._state(key, model).limiter
+
+    def available(self, model: str) -> bool:
+        """
+        振り分け先から外されていないキーがあるか
+
+        Args:
+            model: モデル名
+
+        Returns:
+            使用できるキーがある場合True
+        """
+        now = time.monotonic()
+        return any(self._state(key, model).sidelined_until <= now for key in self.keys)
+
+    def wait_time(self, model: str) -> float:
+        """
+        いずれかのキーが振り分け先に戻るまでの秒数
+
+        Args:
+            model: モデル名
+
+        Returns:
+            待機秒数（使用できるキーがある場合は0）
+        """
+        now = time.monotonic()
+        return max(
+            0.0,
+            min(self._state(key, model).sidelined_until for key in self.keys) - now,
+        )
+
+    def choose(self, model: str, estimated_tokens: int = 0) -> str:
+        """
+        リクエストを振り分けるキーを選択
+
+        振り分け先から外されていないキーのうち、レートリミッターの空き容量が最も多いキー
+        （同じ場合はトークン使用量が少ないキー）を選ぶ。すべてのキーが外されている場合は
+        最も早く期限を迎えるキーを選ぶ（呼び出し側で wait_time の秒数だけ待ってから使用すること）。
+
+        Args:
+            model: モデル名
+            estimated_tokens: 推定トークン数
+
+        Returns:
+            APIキー
+        """
+        now = time.monotonic()
+        states = [(key, self._state(key, model)) for key in self.keys]
+        ready = [(key, state) for key, state in states if state.sidelined_until <= now]
+        if not ready:
+            return min(states, key=lambda item: item[1].sidelined_until)[0]
+        return max(
+            ready,
+            key=lambda item: (
+                item[1].limiter.headroom(estimated_tokens),
+                -item[1].tokens,
+            ),
+        )[0]
+
+    def record_success(self, key: str, model: str, total_tokens: Optional[int]) -> None:
+        """
+        成功したリクエストを記録し、キーの連続429回数をリセット
+
+        Args:
+            key: APIキー
+            model: モデル名
+            total_tokens: レスポンスの合計トークン数
+        """
+        state = self._state(key, model)
+        state.tokens += total_tokens or 0
+        state.throttles = 0
+        state.sidelined_until = 0.0
+
+    def record_throttle(self, key: str, model: str, error: BaseException) -> None:
+        """
+        429を受けたキーを一定時間振り分け先から外す
+
+        Args:
+            key: APIキー
+            model: モデル名
+            error: レート制限エラー
+        """
+        state = self._state(key, model)
+        now = time.monotonic()
+        if state.sidelined_until > now and not is_daily_quota_error(error):
+            # 外す前に送信済みだったリクエストの429は連続回数に数えない
+            return
+        state.throttles += 1
+        if is_daily_quota_error(error):
+            cooldown = config.GEMINI_KEY_COOLDOWN_MAX_SECONDS
+        else:
+            cooldown = min(
+                config.GEMINI_KEY_COOLDOWN_SECONDS * 2 ** (state.throttles - 1),
+                config.GEMINI_KEY_COOLDOWN_MAX_SECONDS,
+            )
+        state.sidelined_until = now + cooldown
+        METRICS.increment(f"gemini_key_throttles_{self.label(key)}")
+        if len(self.keys) > 1:
+            logger.warning(
+                "APIキー %s を %.0f 秒間使用しません（%s、連続 %d 回）",
+                self.label(key),
+                cooldown,
+                model,
+                state.throttles,
+            )
+
+
+# 使用するAPIキーの組 -> プール
+_pools: Dict[Tuple[str, ...], ApiKeyPool] = {}
+
+
+def get_key_pool(api_key: str) -> ApiKeyPool:
+    """
+    APIキーに対応するプールを取得（初回呼び出し時に作成）
+
+    GEMINI_API_KEYS に含まれるキーの場合は全キーで共有するプール、
+    それ以外のキーの場合はそのキーのみのプールを返す。
+
+    Args:
+        api_key: Gemini APIキー
+
+    Returns:
+        APIキープール
+    """
+    keys = (
+        tuple(config.GEMINI_API_KEYS)
+        if api_key in config.GEMINI_API_KEYS
+        else (api_key,)
+    )
+    if keys not in _pools:
+        _pools[keys] = ApiKeyPool(keys)
+    return _pools[keys]
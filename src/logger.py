@@ -1,8 +1,10 @@
 from logging import getLogger, StreamHandler, Formatter, DEBUG, INFO, ERROR
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from datetime import datetime
-import pytz
+from datetime import datetime, timedelta, timezone
+
+# 日本標準時（夏時間がないため固定オフセットで表現し、pytzの読み込みを省く）
+JST = timezone(timedelta(hours=9), "JST")
 
 
 def configure_logging(app_path: Path, DEBUG_MODE: bool) -> None:
@@ -19,7 +21,6 @@ def configure_logging(app_path: Path, DEBUG_MODE: bool) -> None:
     log_dir.mkdir(exist_ok=True)
 
     # タイムスタンプ付きファイル名の生成
-    JST = pytz.timezone("Asia/Tokyo")
     timestamp = datetime.now(JST).strftime("%Y%m%d_%H%M%S")
 
     # 古いログファイルを削除（最新3件のみ保持）
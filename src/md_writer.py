@@ -3,15 +3,119 @@
 文字起こし結果をマークダウンファイルとして保存する
 """
 
+import json
 import os
 import re
-from typing import Dict
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 from datetime import datetime
 
 import logging
 
+if TYPE_CHECKING:
+    from .vault_index import VaultIndex
+
 logger = logging.getLogger(__name__)
 
+# 書き込み途中のノートの一時ファイル（ドットで始まるためObsidianには表示されない）
+TEMP_PREFIX = ".writing-"
+TEMP_SUFFIX = ".tmp"
+
+# 一時ファイルに設定するパーミッション（初回の書き込み時にumaskから決定）
+_file_mode: Optional[int] = None
+_file_mode_lock = threading.Lock()
+
+
+def _new_file_mode() -> int:
+    """通常のファイルと同じパーミッション（0o666 からumaskを除いたもの）を取得"""
+    global _file_mode
+    with _file_mode_lock:
+        if _file_mode is None:
+            # umaskは設定せずに読めないため、一度だけ読み取ってすぐ元に戻す
+            umask = os.umask(0)
+            os.umask(umask)
+            _file_mode = 0o666 & ~umask
+        return _file_mode
+
+
+@contextmanager
+def atomic_write(file_path: str) -> Iterator[TextIO]:
+    """
+    ファイルを不可分に書き込むコンテキストマネージャ
+
+    同じディレクトリの一時ファイルに書き込み、fsync してから os.replace で
+    置き換える。一時ファイルは保存先と同じファイルシステム上にあるため、
+    置き換えは常にリネームになり、途中の状態のファイルが見えることはない。
+
+    Args:
+        file_path: 保存先ファイルパス
+
+    Yields:
+        書き込み用のファイルオブジェクト
+    """
+    directory = os.path.dirname(file_path) or "."
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=TEMP_PREFIX, suffix=TEMP_SUFFIX
+    )
+    try:
+        os.chmod(tmp_path, _new_file_mode())
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory: str) -> None:
+    """リネームを永続化するためディレクトリをfsync（非対応の環境では何もしない）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def video_id_from_url(url: str) -> str:
+    """
+    YouTubeのURLからvideo_idを抽出
+
+    Args:
+        url: 動画のURL
+
+    Returns:
+        video_id（抽出できない場合は空文字）
+    """
+    if "watch?v=" in url:
+        return url.split("watch?v=")[1].split("&")[0]
+    elif "youtu.be/" in url:
+        return url.split("youtu.be/")[1].split("?")[0]
+    return ""
+
 
 def sanitize_filename(filename: str, max_length: int = 200) -> str:
     """
@@ -44,18 +148,30 @@ def sanitize_filename(filename: str, max_length: int = 200) -> str:
     return filename
 
 
-def get_unique_filename(base_path: str, filename: str, extension: str = ".md") -> str:
+def get_unique_filename(
+    base_path: str,
+    filename: str,
+    extension: str = ".md",
+    index: Optional["VaultIndex"] = None,
+) -> str:
     """
     重複しないファイル名を生成
 
+    索引を渡した場合は VaultIndex.reserve で番号を決めて索引に登録し、
+    渡さない場合はファイルの存在を確認して番号を決める（ディレクトリ全体は走査しない）。
+
     Args:
         base_path: 保存先ディレクトリパス
         filename: 基本となるファイル名
         extension: ファイル拡張子
+        index: 保存先ディレクトリのノート索引（連続して保存する場合に指定）
 
     Returns:
         重複しないファイルパス
     """
+    if index:
+        return index.reserve(filename, extension)
+
     # ファイル名をサニタイズ
     safe_filename = sanitize_filename(filename)
 
@@ -76,19 +192,37 @@ def get_unique_filename(base_path: str, filename: str, extension: str = ".md") -
         counter += 1
 
 
+def _reserve_filename(
+    base_path: str,
+    filename: str,
+    index: Optional["VaultIndex"],
+    overwrite_path: Optional[str] = None,
+) -> str:
+    """索引があれば索引で、なければファイルシステムを確認して重複しないパスを決定"""
+    if overwrite_path:
+        return overwrite_path
+    return get_unique_filename(base_path, filename, index=index)
+
+
 def save_transcript_to_markdown(
     video_info: Dict[str, str],
-    transcript: str,
+    transcript: Union[str, Mapping[str, Any]],
     article: str,
     output_dir: str = "output",
+    index: Optional["VaultIndex"] = None,
+    overwrite_path: Optional[str] = None,
 ) -> str:
     """
     文字起こし結果をマークダウンファイルとして保存
 
     Args:
         video_info: 動画情報（title, channel, published_at, url等を含む辞書）
-        transcript: 文字起こしテキスト
+        transcript: 文字起こしテキスト、または1回のリクエストで生成した構造化出力
+            （create_markdown_content を参照）
+        article: 記事（構造化出力の場合は使用しない）
         output_dir: 出力ディレクトリ
+        index: output_dir のノート索引（指定時はファイル名の重複判定に使用）
+        overwrite_path: 既存のノートを上書きする場合のパス
 
     Returns:
         保存したファイルパス
@@ -98,32 +232,84 @@ def save_transcript_to_markdown(
 
     # ファイル名を動画タイトルから生成
     title = video_info.get("title", "untitled")
-    file_path = get_unique_filename(output_dir, title)
+    file_path = _reserve_filename(output_dir, title, index, overwrite_path)
 
     # マークダウンコンテンツを作成
     content = create_markdown_content(video_info, transcript, article)
 
-    # ファイルに書き込み
-    with open(file_path, "w", encoding="utf-8") as f:
+    # ファイルに書き込み（一時ファイル経由で置き換え）
+    with atomic_write(file_path) as f:
         f.write(content)
 
+    if index:
+        index.add(file_path, video_info.get("video_id", ""))
     logger.info("  → マークダウンファイルを保存: %s", file_path)
     return file_path
 
 
+def format_hashtags(hashtags: Iterable[str]) -> str:
+    """
+    キーワードのリストをハッシュタグの行に変換
+
+    Obsidianでハッシュタグとして認識されない空白・"."は "_" に置き換える。
+
+    Args:
+        hashtags: キーワードのリスト（先頭の "#" の有無は問わない）
+
+    Returns:
+        半角スペース区切りのハッシュタグ
+    """
+    tags = []
+    for tag in hashtags:
+        tag = re.sub(r"[\s.]+", "_", str(tag).strip().lstrip("#")).strip("_")
+        if tag:
+            tags.append(f"#{tag}")
+    return " ".join(tags)
+
+
 def create_markdown_content(
-    video_info: Dict[str, str], transcript: str, article: str
+    video_info: Dict[str, str],
+    transcript: Union[str, Mapping[str, Any]],
+    article: str = "",
 ) -> str:
     """
     マークダウンコンテンツを生成
 
     Args:
         video_info: 動画情報
-        transcript: 文字起こしテキスト
+        transcript: 文字起こしテキスト、または1回のリクエストで生成した構造化出力
+            （transcript・article・hashtags を含む辞書）
+        article: 記事（構造化出力の場合は使用しない）
 
     Returns:
         マークダウン形式の文字列
     """
+    if isinstance(transcript, Mapping):
+        hashtags = format_hashtags(transcript.get("hashtags") or [])
+        article = str(transcript.get("article", "")).rstrip()
+        if hashtags:
+            article = f"{article}\n\n{hashtags}\n"
+        transcript = str(transcript.get("transcript", ""))
+
+    header, transcript_heading, footer = create_markdown_frame(video_info)
+    return f"{header}{article}{transcript_heading}{transcript}{footer}"
+
+
+def _yaml_scalar(value: str) -> str:
+    """フロントマターの値を二重引用符で囲んだYAMLの文字列に変換"""
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+def create_markdown_frame(video_info: Dict[str, str]) -> Tuple[str, str, str]:
+    """
+    記事・文字起こし本文の前後に置くマークダウンの枠部分を生成
+
+    Args:
+        video_info: 動画情報
+
+    Returns:
+        (記事の前, 記事と文字起こしの間, 文字起こしの後) のタプル
+    """
     # タイトル
     title = video_info.get("title", "Untitled")
 
@@ -149,10 +335,7 @@ def create_markdown_content(
     video_id = video_info.get("video_id", "")
     if not video_id and url:
         # URLからvideo_idを抽出
-        if "watch?v=" in url:
-            video_id = url.split("watch?v=")[1].split("&")[0]
-        elif "youtu.be/" in url:
-            video_id = url.split("youtu.be/")[1].split("?")[0]
+        video_id = video_id_from_url(url)
 
     # YouTube埋め込みiframeを生成
     embed_html = ""
@@ -161,25 +344,87 @@ def create_markdown_content(
 src="https://www.youtube.com/embed/{video_id}?autoplay=0&mute=1" 
 frameborder="0" allowfullscreen style="width: 100%; aspect-ratio: 16/9;"></iframe>"""
 
+    # YAMLフロントマター（": " や "#" を含むタイトルでも解釈できるよう値は引用符で囲む）
+    fields = {
+        "title": title,
+        "channel": channel,
+        "source": url,
+        "uploaded": published_date,
+        # 記事を生成したモデル（不明な場合は記録しない）
+        "article_model": video_info.get("article_model", ""),
+    }
+    frontmatter = "".join(
+        f"{name}: {_yaml_scalar(value)}\n"
+        for name, value in fields.items()
+        if value or name != "article_model"
+    )
+
     # YAMLフロントマターとマークダウンコンテンツを構築
-    markdown = f"""---
-title: {title}
-channel: {channel}
-source: {url}
-uploaded: {published_date}
----
+    header = f"""---
+{frontmatter}---
 
 # {title}
 
 {embed_html}
 
-{article}
+"""
+    transcript_heading = """
 
 ## 文字起こし結果
-{transcript}
 """
+    footer = "\n"
+
+    return header, transcript_heading, footer
 
-    return markdown
+
+def save_markdown_from_files(
+    video_info: Dict[str, str],
+    transcript_path: str,
+    article_path: str,
+    output_dir: str = "output",
+    index: Optional["VaultIndex"] = None,
+    overwrite_path: Optional[str] = None,
+) -> str:
+    """
+    ファイルに書き出し済みの文字起こし・記事からマークダウンファイルを作成
+
+    本文はファイルから順次コピーするため、文字起こしの長さに関わらず
+    メモリ使用量は一定に保たれる。
+
+    Args:
+        video_info: 動画情報
+        transcript_path: 文字起こしファイルのパス
+        article_path: 記事ファイルのパス
+        output_dir: 出力ディレクトリ
+        index: output_dir のノート索引（指定時はファイル名の重複判定に使用）
+        overwrite_path: 既存のノートを上書きする場合のパス
+
+    Returns:
+        保存したファイルパス
+    """
+    # 出力ディレクトリを作成
+    os.makedirs(output_dir, exist_ok=True)
+
+    # ファイル名を動画タイトルから生成
+    title = video_info.get("title", "untitled")
+    file_path = _reserve_filename(output_dir, title, index, overwrite_path)
+
+    header, transcript_heading, footer = create_markdown_frame(video_info)
+
+    # 枠部分と本文ファイルを順に書き込み（一時ファイル経由で置き換え）
+    with atomic_write(file_path) as f:
+        f.write(header)
+        with open(article_path, "r", encoding="utf-8", newline="") as article:
+            shutil.copyfileobj(article, f)
+        f.write(transcript_heading)
+        with open(transcript_path, "r", encoding="utf-8", newline="") as transcript:
+            shutil.copyfileobj(transcript, f)
+        f.write(footer)
+
+    if index:
+        index.add(file_path, video_info.get("video_id", ""))
+    logger.info("  → マークダウンファイルを保存: %s", file_path)
+    return file_path
 
 
 def append_processing_note(file_path: str, note: str) -> None:
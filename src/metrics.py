@@ -0,0 +1,412 @@
+"""
+計測モジュール
+処理段階ごとの所要時間とGeminiのトークン使用量を記録し、
+実行終了時にJSON・Prometheusテキスト形式のレポートとして出力する
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .md_writer import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Prometheusのメトリクス名の接頭辞
+METRIC_PREFIX = "youtube_vault_archiver"
+
+# ヒストグラムのバケット上限（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# パーセンタイル算出に使う直近の観測値の数（監視モードでもメモリ使用量が増え続けない）
+PERCENTILE_WINDOW = 1024
+
+# 処理中の動画ID（トークン使用量を動画ごとに集計するために使用）
+current_video: ContextVar[str] = ContextVar("current_video", default="")
+
+TOKEN_KINDS = ("prompt", "output", "total")
+
+
+class Histogram:
+    """
+    累積バケット付きのヒストグラム
+
+    件数・合計・最大値・バケットは全観測値で集計し、パーセンタイルは
+    直近 PERCENTILE_WINDOW 件の観測値から算出する。並べ替えた観測値は、
+    その後の観測値が全体の1/16を超えるまで再利用する（リクエストごとに並べ替えない）。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.values: "deque[float]" = deque(maxlen=PERCENTILE_WINDOW)
+        self._sorted: List[float] = []
+        # _sorted を作成した時点の count
+        self._sorted_count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        観測値を記録
+
+        Args:
+            value: 観測値（秒）
+        """
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.values.append(value)
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.bucket_counts[i] += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        直近の観測値のパーセンタイル値を取得（最近傍法）
+
+        Args:
+            q: パーセンタイル（0〜100）
+
+        Returns:
+            パーセンタイル値（観測値がない場合は0）
+        """
+        if not self.values:
+            return 0.0
+        if self.count - self._sorted_count > len(self._sorted) // 16:
+            self._sorted = sorted(self.values)
+            self._sorted_count = self.count
+        ordered = self._sorted
+        rank = max(1, math.ceil(q / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def summary(self) -> Dict[str, Any]:
+        """JSONレポート用の集計値"""
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 6),
+            "p50_seconds": round(self.percentile(50), 6),
+            "p95_seconds": round(self.percentile(95), 6),
+            "p99_seconds": round(self.percentile(99), 6),
+            "max_seconds": round(self.max, 6),
+            "buckets": {
+                str(upper): count
+                for upper, count in zip(self.buckets, self.bucket_counts)
+            },
+        }
+
+
+class RunMetrics:
+    """
+    1回の実行分の計測値
+
+    ワーカースレッド（asyncio.to_thread）からも記録されるためロックで保護する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """計測値を初期化"""
+        with self._lock:
+            self.started_at = time.time()
+            # (段階, ラベル) -> ヒストグラム
+            self._histograms: Dict[Tuple[str, str], Histogram] = {}
+            # モデル名 -> 種類 -> トークン数（requests はリクエスト数）
+            self._model_tokens: Dict[str, Dict[str, int]] = {}
+            # 動画ID -> 種類 -> トークン数
+            self._video_tokens: Dict[str, Dict[str, int]] = {}
+            # APIキーの表記（key1, key2, ...） -> 種類 -> トークン数
+            self._key_tokens: Dict[str, Dict[str, int]] = {}
+            self._counters: Dict[str, int] = {}
+            # 動画ID -> 項目名 -> 値（文字起こしの取得経路等）
+            self._video_attributes: Dict[str, Dict[str, str]] = {}
+            # イベント名 -> 実行開始から最初に発生するまでの秒数
+            self._milestones: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float, label: str = "") -> None:
+        """
+        段階の所要時間を記録
+
+        Args:
+            stage: 段階名
+            seconds: 所要時間（秒）
+            label: 補助ラベル（モデル名等）
+        """
+        with self._lock:
+            histogram = self._histograms.get((stage, label))
+            if histogram is None:
+                histogram = self._histograms[(stage, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def percentile(
+        self, stage: str, q: float, label: str = "", min_count: int = 1
+    ) -> Optional[float]:
+        """
+        段階の所要時間のパーセンタイル値を取得
+
+        Args:
+            stage: 段階名
+            q: パーセンタイル（0〜100）
+            label: 補助ラベル（モデル名等）
+            min_count: 必要な観測値の数
+
+        Returns:
+            パーセンタイル値（秒、観測値が min_count 件未満の場合はNone）
+        """
+        with self._lock:
+            histogram = self._histograms.get((stage, label))
+            if histogram is None or histogram.count < max(1, min_count):
+                return None
+            return histogram.percentile(q)
+
+    @contextmanager
+    def span(self, stage: str, label: str = "") -> Iterator[None]:
+        """
+        ブロックの所要時間を段階の所要時間として記録するコンテキストマネージャ
+
+        Args:
+            stage: 段階名
+            label: 補助ラベル（モデル名等）
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, label)
+
+    def record_usage(self, model: str, usage: Any, key: str = "") -> None:
+        """
+        Geminiレスポンスの usage_metadata を記録
+
+        処理中の動画（current_video）が設定されている場合は動画ごとにも集計する。
+
+        Args:
+            model: モデル名
+            usage: レスポンスの usage_metadata（Noneの場合はリクエスト数のみ記録）
+            key: APIキーの表記（指定した場合はキーごとにも集計）
+        """
+        tokens = {
+            "prompt": getattr(usage, "prompt_token_count", None) or 0,
+            "output": getattr(usage, "candidates_token_count", None) or 0,
+            "total": getattr(usage, "total_token_count", None) or 0,
+        }
+        video_id = current_video.get()
+        with self._lock:
+            targets = [self._model_tokens.setdefault(model, {})]
+            if video_id:
+                targets.append(self._video_tokens.setdefault(video_id, {}))
+            if key:
+                targets.append(self._key_tokens.setdefault(key, {}))
+            for target in targets:
+                target["requests"] = target.get("requests", 0) + 1
+                for kind, count in tokens.items():
+                    target[kind] = target.get(kind, 0) + count
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        カウンターを加算
+
+        Args:
+            name: カウンター名
+            amount: 加算する値
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def annotate_video(self, name: str, value: str) -> None:
+        """
+        処理中の動画（current_video）の属性を記録し、値ごとの件数をカウンターに加算
+
+        Args:
+            name: 項目名（例: transcript_source）
+            value: 値（例: captions）
+        """
+        video_id = current_video.get()
+        with self._lock:
+            if video_id:
+                self._video_attributes.setdefault(video_id, {})[name] = value
+            counter = f"{name}_{value}"
+            self._counters[counter] = self._counters.get(counter, 0) + 1
+
+    def milestone(self, name: str) -> None:
+        """
+        イベントの最初の発生時刻を実行開始からの秒数として記録（2回目以降は無視）
+
+        Args:
+            name: イベント名
+        """
+        with self._lock:
+            self._milestones.setdefault(name, time.time() - self.started_at)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        JSONレポートの内容を作成
+
+        Returns:
+            レポートの辞書
+        """
+        finished_at = time.time()
+        with self._lock:
+            stages: Dict[str, Dict[str, Any]] = {}
+            for (stage, label), histogram in sorted(self._histograms.items()):
+                stages.setdefault(stage, {})[label or "all"] = histogram.summary()
+
+            total = {kind: 0 for kind in ("requests", *TOKEN_KINDS)}
+            for usage in self._model_tokens.values():
+                for kind in total:
+                    total[kind] += usage.get(kind, 0)
+
+            return {
+                "started_at": _isoformat(self.started_at),
+                "finished_at": _isoformat(finished_at),
+                "duration_seconds": round(finished_at - self.started_at, 3),
+                "counters": dict(self._counters),
+                "milestones_seconds": {
+                    name: round(seconds, 3)
+                    for name, seconds in self._milestones.items()
+                },
+                "stages": stages,
+                "videos": {
+                    video_id: dict(attributes)
+                    for video_id, attributes in self._video_attributes.items()
+                },
+                "tokens": {
+                    "total": total,
+                    "by_model": {
+                        model: dict(usage)
+                        for model, usage in self._model_tokens.items()
+                    },
+                    "by_video": {
+                        video_id: dict(usage)
+                        for video_id, usage in self._video_tokens.items()
+                    },
+                    "by_key": {
+                        key: dict(usage) for key, usage in self._key_tokens.items()
+                    },
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheusテキスト形式（node_exporter の textfile collector 用）で出力
+
+        Returns:
+            メトリクスの文字列
+        """
+        name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of each processing stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for (stage, label), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{_escape(stage)}",label="{_escape(label)}"'
+                for upper, count in zip(histogram.buckets, histogram.bucket_counts):
+                    lines.append(f'{name}_bucket{{{labels},le="{upper}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            name = f"{METRIC_PREFIX}_gemini_tokens_total"
+            lines += [
+                f"# HELP {name} Gemini token usage by model.",
+                f"# TYPE {name} counter",
+            ]
+            for model, usage in sorted(self._model_tokens.items()):
+                for kind in TOKEN_KINDS:
+                    lines.append(
+                        f'{name}{{model="{_escape(model)}",kind="{kind}"}}'
+                        f" {usage.get(kind, 0)}"
+                    )
+
+            name = f"{METRIC_PREFIX}_gemini_requests_total"
+            lines += [
+                f"# HELP {name} Gemini requests by model.",
+                f"# TYPE {name} counter",
+            ]
+            for model, usage in sorted(self._model_tokens.items()):
+                lines.append(
+                    f'{name}{{model="{_escape(model)}"}} {usage.get("requests", 0)}'
+                )
+
+            name = f"{METRIC_PREFIX}_gemini_key_tokens_total"
+            lines += [
+                f"# HELP {name} Gemini total token usage by API key.",
+                f"# TYPE {name} counter",
+            ]
+            for key, usage in sorted(self._key_tokens.items()):
+                lines.append(f'{name}{{key="{_escape(key)}"}} {usage.get("total", 0)}')
+
+            name = f"{METRIC_PREFIX}_events_total"
+            lines += [f"# HELP {name} Run event counters.", f"# TYPE {name} counter"]
+            for counter, value in sorted(self._counters.items()):
+                lines.append(f'{name}{{event="{_escape(counter)}"}} {value}')
+
+            name = f"{METRIC_PREFIX}_milestone_seconds"
+            lines += [
+                f"# HELP {name} Seconds from run start to the first occurrence of an event.",
+                f"# TYPE {name} gauge",
+            ]
+            for milestone, seconds in sorted(self._milestones.items()):
+                lines.append(f'{name}{{event="{_escape(milestone)}"}} {seconds:.3f}')
+
+            name = f"{METRIC_PREFIX}_run_duration_seconds"
+            lines += [
+                f"# HELP {name} Duration of the last run.",
+                f"# TYPE {name} gauge",
+                f"{name} {time.time() - self.started_at:.3f}",
+            ]
+            name = f"{METRIC_PREFIX}_last_run_timestamp_seconds"
+            lines += [
+                f"# HELP {name} Unix time when the last run finished.",
+                f"# TYPE {name} gauge",
+                f"{name} {time.time():.0f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _isoformat(timestamp: float) -> str:
+    """Unix時刻をISO 8601形式（UTC）に変換"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+def _escape(value: str) -> str:
+    """Prometheusのラベル値をエスケープ"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 実行中に共有する計測値
+METRICS = RunMetrics()
+
+
+def write_run_report(
+    json_path: Optional[str], prometheus_path: Optional[str] = None
+) -> None:
+    """
+    計測値をレポートファイルに書き出す（パスが空の場合はその形式を出力しない）
+
+    Args:
+        json_path: JSONレポートの出力先
+        prometheus_path: Prometheusテキスト形式の出力先
+    """
+    try:
+        if json_path:
+            with atomic_write(json_path) as f:
+                json.dump(METRICS.snapshot(), f, ensure_ascii=False, indent=2)
+            logger.info(f"実行レポートを出力しました: {json_path}")
+        if prometheus_path:
+            with atomic_write(prometheus_path) as f:
+                f.write(METRICS.to_prometheus())
+            logger.info(f"メトリクスを出力しました: {prometheus_path}")
+    except OSError as e:
+        logger.error(f"実行レポートの出力に失敗: {e}")
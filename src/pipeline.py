@@ -0,0 +1,798 @@
+"""
+処理パイプラインモジュール
+文字起こし → 記事生成 → 保存 → 再生リスト削除 の各段階をキューで接続し、
+段階ごとに独立した同時実行数で動画を処理する
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from . import config
+from .cache import ContentCache, content_hash, content_hash_file
+from .captions import caption_cache_key, fetch_caption_transcript
+from .gemini_api import (
+    article_cache_key,
+    article_models,
+    generate_article,
+    generate_single_pass,
+    generate_transcript,
+    is_single_pass_video,
+    single_pass_cache_key,
+    stream_article_to_file,
+    stream_transcript_to_file,
+    transcript_cache_key,
+)
+from .md_writer import save_markdown_from_files, save_transcript_to_markdown
+from .metrics import METRICS, current_video
+from .retry_policy import (
+    ERROR_EMPTY,
+    ERROR_TRANSIENT,
+    ERROR_UNKNOWN,
+    classify_error,
+)
+from .state_store import StateStore
+from .vault_index import VaultIndex
+from .work_queue import WorkQueue
+from .youtube import remove_from_playlist_batch, video_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VideoJob:
+    """パイプラインを流れる1動画分の処理単位"""
+
+    video: Dict[str, str]
+    index: int
+    total: int = 0
+    transcript: str = ""
+    article: str = ""
+    # 1回のリクエストで生成した文字起こし・記事（transcript・article・hashtags）
+    structured: Dict[str, Any] = field(default_factory=dict)
+    # ストリーミングモードでは本文をメモリに保持せず、キャッシュファイルのパスで受け渡す
+    transcript_path: str = ""
+    article_path: str = ""
+    # 記事を生成したモデル（ノートのフロントマターに記録）
+    article_model: str = ""
+    pinned_keys: List[str] = field(default_factory=list)
+    saved_path: str = ""
+    skipped: bool = False
+    success: bool = False
+    # 作業キューのリースを保持しているか
+    leased: bool = False
+    # 処理中にリースが期限切れとなり、他のワーカーに引き継がれたか
+    lease_lost: bool = False
+    # 失敗の原因となった例外（例外なしに失敗した場合はNone）
+    error: Optional[BaseException] = None
+    # 失敗の分類（retry_policy.ERROR_*）と内容（失敗した時点で設定）
+    failure_reason: str = ""
+    failure_message: str = ""
+    # パイプラインへの投入時刻（time.perf_counter、動画全体の所要時間の計測に使用）
+    submitted_at: float = 0.0
+
+    @property
+    def label(self) -> str:
+        """ログ出力用のプレフィックス（総数が未確定の場合は番号のみ）"""
+        if self.total:
+            return f"[{self.index}/{self.total}]"
+        return f"[{self.index}]"
+
+    @property
+    def title(self) -> str:
+        """動画タイトル"""
+        return self.video.get("title", "")
+
+
+class VideoPipeline:
+    """
+    段階ごとのワーカーとキューで構成される動画処理パイプライン
+
+    各段階は固定数のワーカーが上流キューから動画を取り出して処理し、
+    成功した動画のみ下流キューへ渡す。キューには上限があるため、
+    下流が詰まると上流は待機する（バックプレッシャー）。
+    """
+
+    def __init__(
+        self,
+        state: StateStore,
+        cache: ContentCache,
+        vault_indexes: Optional[Dict[str, VaultIndex]] = None,
+        output_dir: str = "output",
+        work_queue: Optional[WorkQueue] = None,
+    ):
+        """
+        Args:
+            state: 処理状態ストア
+            cache: 生成結果キャッシュ
+            vault_indexes: 保存先フォルダ -> Vault内のフォルダのノート索引
+                （同じ動画のノートの検出に使用）
+            output_dir: マークダウンファイルの出力ディレクトリ
+                （DIRECT_TO_VAULT 有効時はVaultに直接保存するため使用しない）
+            work_queue: 複数のワーカーで分担する場合の作業キュー
+                （リースを取得できた動画のみ処理する）
+        """
+        self.state = state
+        self.cache = cache
+        self.work_queue = work_queue
+        self.vault_indexes = vault_indexes or {}
+        self.output_dir = output_dir
+        # 再生リストID -> 保存先フォルダ（Vault・output_dirからの相対パス）
+        self.folders: Dict[str, str] = dict(config.PLAYLISTS)
+        # Vaultへ直接保存する場合は、保存先の索引としてVaultの索引を共有
+        self.direct_to_vault = config.DIRECT_TO_VAULT and bool(self.vault_indexes)
+        # 出力ディレクトリ -> ノート索引（保存時に作成）
+        self._output_indexes: Dict[str, VaultIndex] = {}
+        # 生成中のキャッシュキー -> (ロック, 待機数)
+        self._key_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self.completed: List[VideoJob] = []
+
+        queue_size = config.PIPELINE_QUEUE_SIZE
+        self._transcribe_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._article_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._save_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._remove_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """各段階のワーカーを起動"""
+        stages = [
+            (
+                "transcribe",
+                self._transcribe_queue,
+                self._transcribe,
+                self._article_queue,
+                config.TRANSCRIBE_CONCURRENCY,
+            ),
+            (
+                "article",
+                self._article_queue,
+                self._generate_article,
+                self._save_queue,
+                config.ARTICLE_CONCURRENCY,
+            ),
+            ("save", self._save_queue, self._save, self._remove_queue, 1),
+        ]
+        for name, queue, handler, next_queue, concurrency in stages:
+            for i in range(max(1, concurrency)):
+                self._workers.append(
+                    asyncio.create_task(
+                        self._worker(name, queue, handler, next_queue),
+                        name=f"{name}-{i}",
+                    )
+                )
+        # 再生リスト削除はバッチリクエストにまとめるため専用ワーカーで処理
+        self._workers.append(
+            asyncio.create_task(self._remove_worker(), name="remove-0")
+        )
+        if self.work_queue:
+            self._workers.append(
+                asyncio.create_task(self._heartbeat_worker(), name="heartbeat-0")
+            )
+        logger.info(
+            "パイプラインを開始します（文字起こし: %d, 記事生成: %d）",
+            config.TRANSCRIBE_CONCURRENCY,
+            config.ARTICLE_CONCURRENCY,
+        )
+
+    async def submit(self, job: VideoJob) -> bool:
+        """
+        動画をパイプラインに投入
+
+        保存済みの動画、およびVaultに同じ動画のノートがある動画
+        （VAULT_EXISTING_NOTE_POLICY=skip の場合）はAPIを呼ばずに削除段階へ直接渡す。
+
+        Args:
+            job: 処理対象の動画
+
+        Returns:
+            文字起こし段階へ投入した（APIを呼び出す）場合True
+        """
+        job.submitted_at = time.perf_counter()
+        if self.state.is_archived(job.video):
+            logger.info(f"{job.label} 処理済みのためスキップ: {job.title}")
+            job.skipped = True
+            await self._remove_queue.put(job)
+            return False
+
+        existing = self._existing_note(job)
+        if existing and config.VAULT_EXISTING_NOTE_POLICY != "update":
+            logger.info(f"{job.label} Vaultにノートがあるためスキップ: {existing}")
+            self.state.mark(job.video, "saved", saved_path=existing)
+            job.skipped = True
+            await self._remove_queue.put(job)
+            return False
+
+        if not await self.acquire(job.video):
+            logger.info(f"{job.label} 他のワーカーが担当のためスキップ: {job.title}")
+            METRICS.increment("videos_leased_elsewhere")
+            job.skipped = True
+            await self._finish(job)
+            return False
+        job.leased = self.work_queue is not None
+
+        await self._transcribe_queue.put(job)
+        return True
+
+    async def acquire(self, video: Dict[str, str]) -> bool:
+        """
+        作業キューで動画のリースを取得（作業キューを使用しない場合は常にTrue）
+
+        Args:
+            video: 動画情報
+
+        Returns:
+            このワーカーが処理する場合True
+        """
+        if not self.work_queue:
+            return True
+        return await asyncio.to_thread(
+            self.work_queue.acquire, video["playlist_item_id"], video["video_id"]
+        )
+
+    async def _owns(self, job: VideoJob) -> bool:
+        """
+        動画のリースを延長し、保持し続けているかを確認（作業キューを使用しない場合は常にTrue）
+
+        保存・再生リスト削除の直前に呼び、他のワーカーに引き継がれた動画の重複処理を防ぐ。
+        """
+        if not job.leased:
+            return True
+        return await asyncio.to_thread(
+            self.work_queue.renew, job.video["playlist_item_id"]
+        )
+
+    def _lease_lost(self, job: VideoJob, action: str) -> None:
+        """
+        他のワーカーに引き継がれた動画の処理を中止（リースを解放せず、スキップとして記録）
+
+        停止していた間にリースが期限切れとなり、他のワーカーが引き継いだ場合に呼ぶ。
+        """
+        logger.warning(
+            f"{job.label} 他のワーカーに引き継がれたため{action}を中止: {job.title}"
+        )
+        job.leased = False
+        job.lease_lost = True
+        job.skipped = True
+
+    def should_generate(self, video: Dict[str, str]) -> bool:
+        """
+        文字起こし・記事生成が必要な動画かを判定（submit でスキップされる動画はFalse）
+
+        Args:
+            video: 動画情報
+
+        Returns:
+            生成が必要な場合True
+        """
+        if self.state.is_archived(video):
+            return False
+        return not (
+            self._existing_note(VideoJob(video, 0))
+            and config.VAULT_EXISTING_NOTE_POLICY != "update"
+        )
+
+    def folder_for(self, job: VideoJob) -> str:
+        """動画の再生リストに対応する保存先フォルダを取得"""
+        return self.folders.get(job.video.get("playlist_id", ""), "")
+
+    def _existing_note(self, job: VideoJob) -> Optional[str]:
+        """同じ動画のノートのパスを取得（Vault未設定または存在しない場合はNone）"""
+        vault_index = self.vault_indexes.get(self.folder_for(job))
+        if not vault_index:
+            return None
+        return vault_index.find_video(job.video["video_id"])
+
+    def _output_target(self, job: VideoJob) -> Tuple[str, VaultIndex]:
+        """動画の保存先ディレクトリとそのノート索引を取得"""
+        folder = self.folder_for(job)
+        if self.direct_to_vault and folder in self.vault_indexes:
+            vault_index = self.vault_indexes[folder]
+            return vault_index.directory, vault_index
+
+        directory = os.path.join(self.output_dir, folder) if folder else self.output_dir
+        index = self._output_indexes.get(directory)
+        if index is None:
+            index = self._output_indexes[directory] = VaultIndex(directory)
+        return directory, index
+
+    def forget_output(self, path: str) -> None:
+        """
+        Vaultへ移動したファイルを出力ディレクトリの索引から除外
+
+        Args:
+            path: 移動元ファイルパス
+        """
+        index = self._output_indexes.get(os.path.dirname(path))
+        if index:
+            index.discard(path)
+
+    @asynccontextmanager
+    async def _exclusive(self, key: str) -> AsyncIterator[None]:
+        """
+        同じキャッシュキーの生成を直列化するコンテキストマネージャ
+
+        複数の再生リストに同じ動画がある場合、後から来た動画は先の生成完了を待ち、
+        キャッシュを再利用する（APIを1回だけ呼ぶ）。
+        """
+        lock, waiters = self._key_locks.get(key) or (asyncio.Lock(), 0)
+        self._key_locks[key] = (lock, waiters + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, waiters = self._key_locks[key]
+            if waiters <= 1:
+                del self._key_locks[key]
+            else:
+                self._key_locks[key] = (lock, waiters - 1)
+
+    async def join(self) -> List[VideoJob]:
+        """
+        投入済みの動画がすべて処理されるまで待機し、ワーカーを停止
+
+        Returns:
+            処理が終了した動画のリスト
+        """
+        # 動画は上流から下流へのみ流れるため、上流から順に待てば全段階が空になる
+        for queue in (
+            self._transcribe_queue,
+            self._article_queue,
+            self._save_queue,
+            self._remove_queue,
+        ):
+            await queue.join()
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        return self.completed
+
+    def take_completed(self) -> List[VideoJob]:
+        """
+        処理が終了した動画を取り出す（監視モードで定期的に呼ぶ）
+
+        Returns:
+            前回の呼び出し以降に処理が終了した動画のリスト
+        """
+        completed, self.completed = self.completed, []
+        return completed
+
+    async def _worker(
+        self,
+        stage: str,
+        queue: asyncio.Queue,
+        handler: Callable[[VideoJob], Awaitable[bool]],
+        next_queue: Optional[asyncio.Queue],
+    ) -> None:
+        """
+        キューから動画を取り出して処理し、成功したら次段階へ渡す
+
+        Args:
+            stage: 段階名（所要時間の計測に使用）
+            queue: 入力キュー
+            handler: 段階の処理関数（成功時True）
+            next_queue: 出力キュー（最終段階はNone）
+        """
+        while True:
+            job = await queue.get()
+            # Gemini のトークン使用量を動画ごとに集計するため処理中の動画を設定
+            current_video.set(job.video["video_id"])
+            try:
+                try:
+                    with METRICS.span(stage):
+                        ok = await handler(job)
+                except Exception as e:
+                    logger.error(f"{job.label} エラー発生: {job.title} - {e}")
+                    job.error = e
+                    job.failure_reason = classify_error(e)
+                    job.failure_message = str(e)
+                    ok = False
+
+                if not ok:
+                    await self._finish(job)
+                elif next_queue is not None:
+                    await next_queue.put(job)
+                else:
+                    job.success = True
+                    await self._finish(job)
+            finally:
+                queue.task_done()
+
+    async def _finish(self, job: VideoJob) -> None:
+        """動画の処理終了を記録し、参照中のキャッシュエントリとリースを解放"""
+        if job.skipped:
+            METRICS.increment("videos_skipped")
+        else:
+            METRICS.increment("videos_succeeded" if job.success else "videos_failed")
+            METRICS.observe("video", time.perf_counter() - job.submitted_at)
+        # 作業キュー・処理状態ストアへの書き込みは、ロック待ちでイベントループを止めないよう別スレッドで行う
+        await asyncio.to_thread(self._record_outcome, job)
+        for key in job.pinned_keys:
+            self.cache.unpin(key)
+        job.pinned_keys.clear()
+        self.completed.append(job)
+
+    def _record_outcome(self, job: VideoJob) -> None:
+        """リースを完了・解放し、処理結果（失敗の記録またはその消去）を処理状態ストアに記録"""
+        if job.leased:
+            if job.success:
+                self.work_queue.complete(job.video["playlist_item_id"])
+            else:
+                self.work_queue.release(job.video["playlist_item_id"])
+            job.leased = False
+        if job.skipped:
+            return
+        if job.success:
+            self.state.clear_failure(job.video)
+        else:
+            self._record_failure(job)
+
+    def _record_failure(self, job: VideoJob) -> None:
+        """失敗を記録し、次に処理できる日時（または再試行の打ち切り）をログに出力"""
+        error_class = job.failure_reason or ERROR_UNKNOWN
+        METRICS.annotate_video("failure", error_class)
+        failure = self.state.record_failure(job.video, error_class, job.failure_message)
+        if failure["next_eligible_at"]:
+            logger.warning(
+                f"{job.label} {failure['attempts']} 回目の失敗（{error_class}）: "
+                f"{failure['next_eligible_at']} 以降に再試行します"
+            )
+        else:
+            METRICS.increment("videos_dead_lettered")
+            logger.error(
+                f"{job.label} {failure['attempts']} 回失敗したため再試行を打ち切ります"
+                f"（{error_class}）: {job.title}"
+            )
+
+    def _fail(self, job: VideoJob, error_class: str, message: str) -> bool:
+        """
+        例外なしに失敗した動画の失敗の分類と内容を記録
+
+        Args:
+            job: 失敗した動画
+            error_class: エラーの分類（retry_policy.ERROR_* のいずれか）
+            message: 失敗の内容
+
+        Returns:
+            常にFalse（段階の処理関数の戻り値として返す）
+        """
+        logger.warning(f"{job.label} {message}: {job.title}")
+        job.failure_reason = error_class
+        job.failure_message = message
+        return False
+
+    def _use_cache_file(self, job: VideoJob, key: str) -> str:
+        """キャッシュエントリを処理終了まで削除対象から除外し、パスを返す"""
+        self.cache.pin(key)
+        job.pinned_keys.append(key)
+        return self.cache.path_for(key)
+
+    async def _transcribe(self, job: VideoJob) -> bool:
+        """文字起こし段階（キャッシュがあれば再利用）"""
+        logger.info(f"{job.label} 処理中: {job.title}")
+
+        duration_seconds = video_duration_seconds(job.video)
+        transcript_key = transcript_cache_key(job.video["video_id"], duration_seconds)
+        if (
+            config.CAPTIONS_ENABLED
+            and not self.cache.contains(transcript_key)
+            and await self._captions(job)
+        ):
+            return True
+
+        if config.STREAMING_MODE:
+            return await self._transcribe_streaming(
+                job, transcript_key, duration_seconds
+            )
+
+        if is_single_pass_video(duration_seconds) and await self._single_pass(job):
+            return True
+
+        METRICS.annotate_video("transcript_source", "gemini")
+        async with self._exclusive(transcript_key):
+            transcript = self.cache.get(transcript_key)
+            if transcript:
+                logger.info(f"{job.label} 文字起こしキャッシュを使用")
+            else:
+                transcript = await generate_transcript(
+                    config.GEMINI_API_KEY, job.video["url"], duration_seconds
+                )
+                if not transcript:
+                    return self._fail(job, ERROR_EMPTY, "文字起こしに失敗（応答が空）")
+                self.cache.put(transcript_key, transcript)
+
+        job.transcript = transcript
+        self.state.mark(job.video, "transcribed")
+        return True
+
+    async def _captions(self, job: VideoJob) -> bool:
+        """
+        字幕トラックから文字起こしを作成（キャッシュがあれば再利用）
+
+        使用できる字幕がない場合はFalseを返し、Geminiで文字起こしする。
+        """
+        key = caption_cache_key(job.video["video_id"])
+        async with self._exclusive(key):
+            transcript = self.cache.get(key)
+            if transcript:
+                logger.info(f"{job.label} 字幕キャッシュを使用")
+            else:
+                transcript = await asyncio.to_thread(
+                    fetch_caption_transcript, job.video["video_id"]
+                )
+                if not transcript:
+                    return False
+                self.cache.put(key, transcript)
+
+        METRICS.annotate_video("transcript_source", "captions")
+        if config.STREAMING_MODE:
+            job.transcript_path = self._use_cache_file(job, key)
+        else:
+            job.transcript = transcript
+        self.state.mark(job.video, "transcribed")
+        return True
+
+    async def _single_pass(self, job: VideoJob) -> bool:
+        """
+        文字起こしと記事を1回のリクエストで生成（キャッシュがあれば再利用）
+
+        出力の上限に達した場合などはFalseを返し、通常の2回のリクエストで生成する。
+        """
+        key = single_pass_cache_key(job.video["video_id"])
+        async with self._exclusive(key):
+            cached = self.cache.get(key)
+            if cached:
+                logger.info(f"{job.label} 文字起こし・記事キャッシュを使用")
+                result = json.loads(cached)
+            else:
+                result = await generate_single_pass(
+                    config.GEMINI_API_KEY, job.video["url"]
+                )
+                if result is None:
+                    METRICS.increment("single_pass_fallbacks")
+                    return False
+                self.cache.put(key, json.dumps(result, ensure_ascii=False))
+
+        METRICS.annotate_video("transcript_source", "single_pass")
+        job.structured = result
+        self.state.mark(job.video, "transcribed")
+        return True
+
+    async def _transcribe_streaming(
+        self, job: VideoJob, transcript_key: str, duration_seconds: int
+    ) -> bool:
+        """文字起こし段階（ストリーミングでキャッシュファイルへ直接書き込む）"""
+        METRICS.annotate_video("transcript_source", "gemini")
+        async with self._exclusive(transcript_key):
+            if self.cache.contains(transcript_key):
+                logger.info(f"{job.label} 文字起こしキャッシュを使用")
+            else:
+                ok = await stream_transcript_to_file(
+                    config.GEMINI_API_KEY,
+                    job.video["url"],
+                    self.cache.partial_path(transcript_key),
+                    duration_seconds,
+                )
+                if not ok:
+                    # ストリームが途中で途切れた場合も例外なしに空で終わるため、一時的な失敗として扱う
+                    return self._fail(
+                        job, ERROR_TRANSIENT, "文字起こしに失敗（ストリームの出力が空）"
+                    )
+                self.cache.commit_partial(transcript_key)
+
+        job.transcript_path = self._use_cache_file(job, transcript_key)
+        self.state.mark(job.video, "transcribed")
+        return True
+
+    async def _generate_article(self, job: VideoJob) -> bool:
+        """記事生成段階（キャッシュがあれば再利用）"""
+        if job.structured:
+            # 文字起こしと同じリクエストで生成済み
+            self._set_article_model(job, config.SINGLE_PASS_MODEL)
+            self.state.mark(job.video, "article_generated")
+            return True
+        if config.STREAMING_MODE:
+            return await self._generate_article_streaming(job)
+
+        article_keys = self._article_keys(
+            job, content_hash(job.transcript), len(job.transcript)
+        )
+        async with self._exclusive(article_keys[config.ARTICLE_MODEL]):
+            for model, key in article_keys.items():
+                article = self.cache.get(key)
+                if article:
+                    logger.info(f"{job.label} 記事キャッシュを使用")
+                    break
+            else:
+                article, model = await generate_article(
+                    config.GEMINI_API_KEY, job.transcript
+                )
+                if not article:
+                    return self._fail(job, ERROR_EMPTY, "記事生成に失敗（応答が空）")
+                self.cache.put(article_keys[model], article)
+
+        job.article = article
+        self._set_article_model(job, model)
+        self.state.mark(job.video, "article_generated")
+        return True
+
+    def _article_keys(
+        self, job: VideoJob, transcript_hash: str, transcript_chars: int
+    ) -> Dict[str, str]:
+        """記事を生成するモデルごとのキャッシュキー（ARTICLE_MODEL を優先）"""
+        return {
+            model: article_cache_key(
+                job.video["video_id"], transcript_hash, transcript_chars, model
+            )
+            for model in article_models()
+        }
+
+    def _set_article_model(self, job: VideoJob, model: str) -> None:
+        """記事を生成したモデルを記録"""
+        job.article_model = model
+        METRICS.annotate_video("article_model", model)
+
+    async def _generate_article_streaming(self, job: VideoJob) -> bool:
+        """記事生成段階（ストリーミングでキャッシュファイルへ直接書き込む）"""
+        transcript_hash, transcript_chars = await asyncio.to_thread(
+            content_hash_file, job.transcript_path
+        )
+        article_keys = self._article_keys(job, transcript_hash, transcript_chars)
+        async with self._exclusive(article_keys[config.ARTICLE_MODEL]):
+            for model, key in article_keys.items():
+                if self.cache.contains(key):
+                    logger.info(f"{job.label} 記事キャッシュを使用")
+                    break
+            else:
+                # 応答したモデルが決まるまでは ARTICLE_MODEL のキーの書き込み中ファイルに書き込む
+                partial_key = article_keys[config.ARTICLE_MODEL]
+                model = await stream_article_to_file(
+                    config.GEMINI_API_KEY,
+                    job.transcript_path,
+                    self.cache.partial_path(partial_key),
+                )
+                if not model:
+                    return self._fail(
+                        job, ERROR_TRANSIENT, "記事生成に失敗（ストリームの出力が空）"
+                    )
+                key = article_keys[model]
+                if key != partial_key:
+                    os.replace(
+                        self.cache.partial_path(partial_key),
+                        self.cache.partial_path(key),
+                    )
+                self.cache.commit_partial(key)
+
+        job.article_path = self._use_cache_file(job, key)
+        self._set_article_model(job, model)
+        self.state.mark(job.video, "article_generated")
+        return True
+
+    async def _save(self, job: VideoJob) -> bool:
+        """マークダウン保存段階（DIRECT_TO_VAULT 有効時はVaultへ直接保存）"""
+        if not await self._owns(job):
+            self._lease_lost(job, "保存")
+            return False
+
+        # Vaultへ直接保存する場合、同じ動画の既存ノートはその場で置き換える
+        overwrite_path = None
+        if self.direct_to_vault and config.VAULT_EXISTING_NOTE_POLICY == "update":
+            overwrite_path = self._existing_note(job)
+
+        output_dir, output_index = self._output_target(job)
+        video_info = {**job.video, "article_model": job.article_model}
+        if config.STREAMING_MODE:
+            job.saved_path = await asyncio.to_thread(
+                save_markdown_from_files,
+                video_info,
+                job.transcript_path,
+                job.article_path,
+                output_dir,
+                output_index,
+                overwrite_path,
+            )
+        else:
+            job.saved_path = await asyncio.to_thread(
+                save_transcript_to_markdown,
+                video_info,
+                job.structured or job.transcript,
+                job.article,
+                output_dir,
+                output_index,
+                overwrite_path,
+            )
+        self.state.mark(job.video, "saved", saved_path=job.saved_path)
+        if self.direct_to_vault:
+            self.state.mark(job.video, "moved", saved_path=job.saved_path)
+        logger.info(f"{job.label} 保存完了: {job.saved_path}")
+        METRICS.milestone("first_note_saved")
+
+        # 保存後は本文を保持する必要がないため解放
+        job.transcript = ""
+        job.article = ""
+        job.structured = {}
+        return True
+
+    async def _remove_worker(self) -> None:
+        """
+        削除キューから動画をまとめて取り出し、バッチリクエストで再生リストから削除
+
+        最初の1件を受け取ってから REMOVE_BATCH_WAIT_SECONDS 秒の間に届いた動画を
+        REMOVE_BATCH_SIZE 件まで1回のバッチにまとめる。
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self._remove_queue.get()]
+            deadline = loop.time() + config.REMOVE_BATCH_WAIT_SECONDS
+            while len(jobs) < config.REMOVE_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    jobs.append(
+                        await asyncio.wait_for(self._remove_queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                with METRICS.span("remove"):
+                    await self._remove_batch(jobs)
+            except Exception as e:
+                logger.error(f"再生リストからの削除でエラー発生: {e}")
+            finally:
+                # 削除の成否は処理結果に影響しない（リースを失った動画は成功として扱わない）
+                for job in jobs:
+                    job.success = not job.lease_lost
+                    try:
+                        await self._finish(job)
+                    finally:
+                        self._remove_queue.task_done()
+
+    async def _heartbeat_worker(self) -> None:
+        """作業キューのリースの有効期間の1/3ごとに、保持しているリースを延長"""
+        interval = self.work_queue.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.work_queue.heartbeat)
+            except Exception as e:
+                # 次回の延長で回復しない場合はリースが失効し、保存・削除の前に検出される
+                logger.error(f"リースの延長に失敗: {e}")
+
+    async def _remove_batch(self, jobs: List[VideoJob]) -> None:
+        """未削除の動画をまとめて再生リストから削除し、結果を記録"""
+        pending = []
+        for job in jobs:
+            if self.state.has_stage(job.video, "removed"):
+                continue
+            if await self._owns(job):
+                pending.append(job)
+            else:
+                self._lease_lost(job, "再生リストからの削除")
+        if not pending:
+            return
+
+        results = await asyncio.to_thread(
+            remove_from_playlist_batch,
+            [job.video["playlist_item_id"] for job in pending],
+        )
+        for job in pending:
+            if results.get(job.video["playlist_item_id"]):
+                self.state.mark(job.video, "removed")
@@ -0,0 +1,260 @@
+"""
+レート制限モジュール
+モデルごとにリクエスト数/分・トークン数/分のトークンバケットと、
+AIMD方式（成功時に加算的に増加、429発生時に乗算的に減少）で調整する同時実行数上限を管理する
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    例外がレート制限（429 / RESOURCE_EXHAUSTED）によるものかを判定
+
+    google.genai の APIError の code・status と、googleapiclient の HttpError の
+    resp.status で判定する（メッセージは他のエラーの説明や動画ID等にも一致しうるため使用しない）。
+
+    Args:
+        error: 判定する例外
+
+    Returns:
+        レート制限エラーの場合True
+    """
+    if getattr(error, "code", None) == 429:
+        return True
+    if getattr(error, "status", None) == "RESOURCE_EXHAUSTED":
+        return True
+    return str(getattr(getattr(error, "resp", None), "status", "")) == "429"
+
+
+class TokenBucket:
+    """1分あたりの上限量で補充されるトークンバケット"""
+
+    def __init__(self, per_minute: int):
+        """
+        Args:
+            per_minute: 1分あたりの上限量
+        """
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """経過時間分のトークンを補充"""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        指定量を消費できるまでの待機秒数を取得
+
+        Args:
+            amount: 消費量（バケット容量を超える場合は容量として扱う）
+
+        Returns:
+            待機秒数（即時消費可能な場合は0）
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def available_ratio(self, amount: float = 0) -> float:
+        """
+        指定量を消費した後に残るトークンの割合を取得
+
+        Args:
+            amount: 消費量
+
+        Returns:
+            残量の割合（0〜1、不足する場合は0）
+        """
+        self._refill()
+        remaining = self.tokens - min(amount, self.capacity)
+        return max(0.0, remaining / self.capacity) if self.capacity else 0.0
+
+    def consume(self, amount: float) -> None:
+        """
+        トークンを消費（実績値との差分補正のため負の値も許容）
+
+        Args:
+            amount: 消費量
+        """
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Reservation:
+    """実行枠の予約情報（実際のトークン使用量を記録する）"""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
+
+
+class AdaptiveRateLimiter:
+    """
+    RPM/TPMのトークンバケットとAIMDによる同時実行数制御を組み合わせたレートリミッター
+
+    成功するたびに同時実行数上限を約1/上限ずつ増やし（1ラウンドで+1）、
+    429を受けた場合は上限を半分にする。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+    ):
+        """
+        Args:
+            name: ログ出力用の名前（モデル名）
+            rpm: 1分あたりのリクエスト数上限（0で無制限）
+            tpm: 1分あたりのトークン数上限（0で無制限）
+            max_concurrency: 同時実行数の上限
+            min_concurrency: 同時実行数の下限
+        """
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self._limit = float(max(self.min_concurrency, self.max_concurrency // 2))
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def concurrency(self) -> int:
+        """現在の同時実行数上限"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """実行中のリクエスト数"""
+        return self._in_flight
+
+    def headroom(self, estimated_tokens: int = 0) -> float:
+        """
+        空き容量の割合を取得（同時実行枠・RPM・TPMのうち最も少ないもの）
+
+        Args:
+            estimated_tokens: 推定トークン数
+
+        Returns:
+            空き容量の割合（0〜1）
+        """
+        ratios = [max(0, self.concurrency - self._in_flight) / self.concurrency]
+        if self._requests:
+            ratios.append(self._requests.available_ratio(1))
+        if self._tokens:
+            ratios.append(self._tokens.available_ratio(estimated_tokens))
+        return min(ratios)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0) -> AsyncIterator[_Reservation]:
+        """
+        実行枠を確保するコンテキストマネージャ
+
+        ブロック内で発生した例外がレート制限エラーの場合は同時実行数を減らし、
+        正常終了した場合は同時実行数を増やす。
+
+        Args:
+            estimated_tokens: 推定トークン数（TPM制御に使用）
+
+        Yields:
+            予約情報（actual_tokens に実際の使用量を設定すると補正される）
+        """
+        reservation = _Reservation(estimated_tokens)
+        await self._acquire(estimated_tokens)
+        try:
+            yield reservation
+        except BaseException as e:
+            if isinstance(e, Exception) and is_rate_limit_error(e):
+                self.record_throttle()
+            raise
+        else:
+            self.record_success(reservation)
+        finally:
+            self._release()
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        """同時実行枠とトークンバケットの両方を確保"""
+        while self._in_flight >= self.concurrency:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_flight += 1
+
+        try:
+            while True:
+                wait = max(
+                    self._requests.wait_time(1) if self._requests else 0.0,
+                    self._tokens.wait_time(estimated_tokens) if self._tokens else 0.0,
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self._requests:
+                self._requests.consume(1)
+            if self._tokens:
+                self._tokens.consume(estimated_tokens)
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self) -> None:
+        """同時実行枠を解放し、待機中のリクエストを起こす"""
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        """空き枠の数だけ待機中のリクエストを起こす"""
+        free = self.concurrency - self._in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def record_success(self, reservation: Optional[_Reservation] = None) -> None:
+        """
+        成功を記録し、同時実行数上限を加算的に増やす
+
+        Args:
+            reservation: 予約情報（実際のトークン使用量でTPMバケットを補正）
+        """
+        if reservation and self._tokens and reservation.actual_tokens is not None:
+            self._tokens.consume(
+                reservation.actual_tokens - reservation.estimated_tokens
+            )
+
+        self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+        self._wake_waiters()
+
+    def record_throttle(self) -> None:
+        """レート制限を記録し、同時実行数上限を半分にする"""
+        self._limit = max(float(self.min_concurrency), self._limit / 2.0)
+        logger.warning(
+            "レート制限を検知しました（%s）: 同時実行数上限を %d に縮小",
+            self.name,
+            self.concurrency,
+        )
@@ -0,0 +1,103 @@
+"""
+再試行ポリシーモジュール
+処理に失敗した動画のエラーを分類し、次に処理できる日時（指数バックオフ）と
+再試行を打ち切る（デッドレター）までの試行回数を決める
+"""
+
+import asyncio
+from typing import Optional
+
+from . import config
+from .rate_limiter import is_rate_limit_error
+
+# エラーの分類
+ERROR_PERMANENT = "permanent"  # 非公開・削除済み・地域制限・不正な動画等（400/403/404）
+ERROR_EMPTY = "empty_response"  # 応答は完了したが生成結果が空（音声がない等）
+ERROR_RATE_LIMIT = "rate_limit"  # 再試行してもレート制限が解消しなかった
+ERROR_TRANSIENT = "transient"  # サーバーエラー・タイムアウト・通信エラー
+ERROR_UNKNOWN = "unknown"
+
+# 再試行しても成功する見込みが低いエラー
+PERMANENT_ERRORS = (ERROR_PERMANENT, ERROR_EMPTY)
+
+# 恒久的なエラーのメッセージに含まれる文字列
+_PERMANENT_MARKERS = (
+    "private",
+    "unavailable",
+    "not available",
+    "not found",
+    "INVALID_ARGUMENT",
+    "PERMISSION_DENIED",
+)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """例外のHTTPステータスコード（google.genai・googleapiclient の例外に対応）"""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    status = getattr(getattr(error, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    失敗の原因となった例外を分類
+
+    例外なしに失敗した場合の分類は、失敗した時点で呼び出し側が決める。
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        エラーの分類（ERROR_* のいずれか）
+    """
+    if is_rate_limit_error(error):
+        return ERROR_RATE_LIMIT
+
+    code = _status_code(error)
+    if code in (400, 403, 404):
+        return ERROR_PERMANENT
+    if (code is not None and code >= 500) or isinstance(
+        error, (asyncio.TimeoutError, TimeoutError, ConnectionError)
+    ):
+        return ERROR_TRANSIENT
+
+    message = str(error)
+    if any(marker in message for marker in _PERMANENT_MARKERS):
+        return ERROR_PERMANENT
+    return ERROR_UNKNOWN
+
+
+def max_attempts(error_class: str) -> int:
+    """
+    デッドレターとするまでの試行回数
+
+    Args:
+        error_class: エラーの分類
+
+    Returns:
+        試行回数の上限
+    """
+    if error_class in PERMANENT_ERRORS:
+        return config.RETRY_PERMANENT_MAX_ATTEMPTS
+    return config.RETRY_MAX_ATTEMPTS
+
+
+def backoff_seconds(attempts: int) -> float:
+    """
+    次に処理できるまでの待機秒数（RETRY_BASE_SECONDS から倍々、RETRY_MAX_SECONDS まで）
+
+    Args:
+        attempts: これまでの試行回数（1以上）
+
+    Returns:
+        待機秒数
+    """
+    return min(
+        config.RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1),
+        config.RETRY_MAX_SECONDS,
+    )
@@ -0,0 +1,166 @@
+"""
+投入順序制御モジュール
+再生リストから取得した動画を優先度付きキューに入れ、
+短い動画から・古い動画からの順でパイプラインに投入する。
+実行ごとの推定トークン数の上限に達した時点で新しい動画の投入を止める。
+失敗して再試行待ち・デッドレターとなっている動画はキューに入れない
+"""
+
+import heapq
+import itertools
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config
+from .state_store import RETRY_DEAD, StateStore
+from .youtube import video_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+# 投入順序
+ORDER_PLAYLIST = "playlist"  # 再生リストの順（取得した順に投入）
+ORDER_SHORTEST = "shortest"  # 再生時間の短い順
+ORDER_OLDEST = "oldest"  # 再生リストへの追加日時の古い順
+ORDERS = (ORDER_PLAYLIST, ORDER_SHORTEST, ORDER_OLDEST)
+
+
+def estimate_video_tokens(video: Dict[str, str]) -> int:
+    """
+    動画1件の処理に必要な推定トークン数を取得
+
+    再生時間 × VIDEO_TOKENS_PER_SECOND で見積もり、
+    再生時間が不明な場合は TRANSCRIPT_ESTIMATED_TOKENS を使用する。
+
+    Args:
+        video: 動画情報
+
+    Returns:
+        推定トークン数
+    """
+    duration_seconds = video_duration_seconds(video)
+    if duration_seconds <= 0:
+        return config.TRANSCRIPT_ESTIMATED_TOKENS
+    return duration_seconds * config.VIDEO_TOKENS_PER_SECOND
+
+
+class VideoScheduler:
+    """
+    動画の投入順序とトークン予算を管理する優先度付きキュー
+
+    再生リストの順（playlist）では取得した動画をすぐに投入できるが、
+    それ以外の順序では全件を取得してから並べ替える必要がある（streaming が False）。
+    """
+
+    def __init__(
+        self,
+        order: Optional[str] = None,
+        token_budget: int = 0,
+        state: Optional[StateStore] = None,
+    ):
+        """
+        Args:
+            order: 投入順序（playlist / shortest / oldest、省略時は SCHEDULE_ORDER）
+            token_budget: 1回の実行で投入する動画の推定トークン数の上限（0で無制限）
+            state: 処理状態ストア（失敗の記録から再試行できない動画を除外、省略時は除外しない）
+        """
+        order = order or config.SCHEDULE_ORDER
+        if order not in ORDERS:
+            logger.warning(f"不明な投入順序のため再生リストの順で処理します: {order}")
+            order = ORDER_PLAYLIST
+        self.order = order
+        self.token_budget = max(0, token_budget)
+        # 投入済みの動画の推定トークン数の合計
+        self.spent_tokens = 0
+        self.budget_exhausted = False
+        self.state = state
+        # 再試行待ち・デッドレターのためキューに入れなかった動画の数
+        self.retry_waiting = 0
+        self.dead_lettered = 0
+        self._heap: List[Tuple[Any, int, Dict[str, str]]] = []
+        # 同じ優先度の動画は取得順に取り出す
+        self._sequence = itertools.count()
+
+    @property
+    def streaming(self) -> bool:
+        """取得した動画をすぐに投入できるか（再生リストの順の場合True）"""
+        return self.order == ORDER_PLAYLIST
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _priority(self, video: Dict[str, str]) -> Any:
+        """動画の優先度（小さいほど先に投入）"""
+        if self.order == ORDER_SHORTEST:
+            # 再生時間が不明な動画は最後に回す
+            return video_duration_seconds(video) or float("inf")
+        if self.order == ORDER_OLDEST:
+            # ISO 8601形式の日時は文字列順で比較できる（不明な場合は最後）
+            return video.get("added_at") or video.get("published_at") or "~"
+        return 0
+
+    def push(self, video: Dict[str, str]) -> bool:
+        """
+        動画をキューに追加
+
+        Args:
+            video: 動画情報
+
+        Returns:
+            追加した場合True（再試行待ち・デッドレターの動画はFalse）
+        """
+        failure = self.state.retry_block(video) if self.state else None
+        if failure:
+            if failure["status"] == RETRY_DEAD:
+                self.dead_lettered += 1
+                logger.debug(
+                    f"再試行を打ち切った動画のためスキップ: {video.get('title', '')}"
+                    f"（{failure['error_class']}、{failure['attempts']} 回失敗）"
+                )
+            else:
+                self.retry_waiting += 1
+                logger.debug(
+                    f"再試行待ちのためスキップ: {video.get('title', '')}"
+                    f"（{failure['next_eligible_at']} 以降）"
+                )
+            return False
+
+        heapq.heappush(self._heap, (self._priority(video), next(self._sequence), video))
+        return True
+
+    def pop(self) -> Optional[Dict[str, str]]:
+        """
+        次に投入する動画を取り出す
+
+        投入済みの動画の推定トークン数が予算に達している場合は取り出さない
+        （予算を超えるのは最後に投入した1件分まで）。
+
+        Returns:
+            動画情報（キューが空、または予算に達した場合はNone）
+        """
+        if not self._heap:
+            return None
+
+        if self.token_budget and self.spent_tokens >= self.token_budget:
+            if not self.budget_exhausted:
+                self.budget_exhausted = True
+                logger.warning(
+                    "推定トークン数が上限に達したため、新しい動画の投入を停止します"
+                    "（投入済み: %d / 上限: %d トークン、未投入: %d 件）",
+                    self.spent_tokens,
+                    self.token_budget,
+                    len(self._heap),
+                )
+            return None
+
+        return heapq.heappop(self._heap)[2]
+
+    def charge(self, video: Dict[str, str]) -> None:
+        """
+        APIを呼び出す動画として投入した動画の推定トークン数を予算に計上
+
+        処理済み・Vaultにノートがある動画はAPIを呼ばないため計上しない。
+
+        Args:
+            video: 動画情報
+        """
+        self.spent_tokens += estimate_video_tokens(video)
@@ -0,0 +1,366 @@
+"""
+処理状態管理モジュール
+動画ごとの処理状況をSQLiteに記録し、再実行時に処理済み動画のAPI呼び出しを省略する
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from .retry_policy import backoff_seconds, max_attempts
+
+logger = logging.getLogger(__name__)
+
+# 記録する処理段階（各段階の完了日時を "<段階>_at" カラムに保存）
+STAGES = ("transcribed", "article_generated", "saved", "moved", "removed")
+
+# 失敗した動画の状態
+RETRY_WAITING = "retry"  # next_eligible_at 以降に再試行
+RETRY_DEAD = "dead"  # 試行回数の上限に達したため再試行しない（デッドレター）
+
+
+def _now(delay_seconds: float = 0) -> str:
+    """現在日時（delay_seconds 秒後、UTC, ISO 8601形式）を返す"""
+    moment = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+    return moment.isoformat(timespec="seconds")
+
+
+class StateStore:
+    """
+    動画の処理状態を保持するSQLiteストア
+
+    再生リスト項目（playlist_item_id）ごとに1行を持ち、
+    video_id と各処理段階の完了日時を記録する。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLiteデータベースファイルのパス
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        """テーブルが存在しない場合は作成"""
+        stage_columns = ",\n".join(f"    {stage}_at TEXT" for stage in STAGES)
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS videos (
+                    playlist_item_id TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    playlist_id TEXT,
+                    title TEXT,
+                    saved_path TEXT,
+                {stage_columns},
+                    updated_at TEXT
+                )
+                """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_videos_video_id ON videos (video_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_videos_saved_path ON videos (saved_path)"
+            )
+            # Gemini バッチジョブ（中断した実行を再開した際に結果の取得を続けるため記録）
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_jobs (
+                    name TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    keys TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at TEXT,
+                    updated_at TEXT
+                )
+                """)
+            # 処理に失敗した動画（実行をまたいで再試行の時期を管理するため記録）
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS failures (
+                    video_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    error_class TEXT NOT NULL,
+                    message TEXT,
+                    attempts INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    next_eligible_at TEXT,
+                    first_failed_at TEXT,
+                    updated_at TEXT
+                )
+                """)
+
+    def get(self, video: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        動画の処理状態を取得
+
+        Args:
+            video: 動画情報（playlist_item_id を含む辞書）
+
+        Returns:
+            処理状態の辞書（未記録の場合はNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM videos WHERE playlist_item_id = ?",
+                (video["playlist_item_id"],),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def has_stage(self, video: Dict[str, str], stage: str) -> bool:
+        """
+        指定した処理段階が完了しているかを判定
+
+        Args:
+            video: 動画情報
+            stage: 処理段階（STAGES のいずれか）
+
+        Returns:
+            完了済みの場合True
+        """
+        record = self.get(video)
+        return bool(record and record.get(f"{stage}_at"))
+
+    def is_archived(self, video: Dict[str, str]) -> bool:
+        """
+        動画が既にマークダウンとして保存済みかを判定
+
+        同じ再生リストに同じ動画が再追加された場合（playlist_item_idが異なる場合）も
+        保存済みとして扱う。
+
+        Args:
+            video: 動画情報
+
+        Returns:
+            保存済みの場合True
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT 1 FROM videos
+                WHERE saved_at IS NOT NULL
+                  AND (playlist_item_id = ?
+                       OR (video_id = ? AND IFNULL(playlist_id, '') = ?))
+                LIMIT 1
+                """,
+                (
+                    video["playlist_item_id"],
+                    video["video_id"],
+                    video.get("playlist_id", ""),
+                ),
+            ).fetchone()
+        return row is not None
+
+    def mark(
+        self, video: Dict[str, str], stage: str, saved_path: Optional[str] = None
+    ) -> None:
+        """
+        処理段階の完了を記録
+
+        Args:
+            video: 動画情報
+            stage: 完了した処理段階（STAGES のいずれか）
+            saved_path: 保存先ファイルパス（保存・移動段階で指定）
+        """
+        if stage not in STAGES:
+            raise ValueError(f"不明な処理段階です: {stage}")
+
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"""
+                INSERT INTO videos (
+                    playlist_item_id, video_id, playlist_id, title, saved_path,
+                    {stage}_at, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (playlist_item_id) DO UPDATE SET
+                    {stage}_at = excluded.{stage}_at,
+                    saved_path = IFNULL(excluded.saved_path, videos.saved_path),
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    video["playlist_item_id"],
+                    video["video_id"],
+                    video.get("playlist_id", ""),
+                    video.get("title", ""),
+                    saved_path,
+                    now,
+                    now,
+                ),
+            )
+
+    def mark_moved(self, source_path: str, destination: str) -> None:
+        """
+        ファイル移動の完了を記録（保存パスから対象動画を特定）
+
+        Args:
+            source_path: 移動元ファイルパス
+            destination: 移動先ファイルパス
+        """
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE videos
+                SET moved_at = ?, saved_path = ?, updated_at = ?
+                WHERE saved_path = ?
+                """,
+                (now, destination, now, source_path),
+            )
+
+    def add_batch_job(self, name: str, kind: str, model: str, keys: List[str]) -> None:
+        """
+        作成したバッチジョブを記録
+
+        Args:
+            name: ジョブ名
+            kind: 生成内容（transcript / article）
+            model: モデル名
+            keys: リクエストと同じ順のキャッシュキーのリスト
+        """
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO batch_jobs
+                    (name, kind, model, keys, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 'pending', ?, ?)
+                """,
+                (name, kind, model, json.dumps(keys), now, now),
+            )
+
+    def pending_batch_jobs(self, kind: str) -> List[Dict[str, Any]]:
+        """
+        結果を取得していないバッチジョブを取得
+
+        Args:
+            kind: 生成内容（transcript / article）
+
+        Returns:
+            ジョブの辞書のリスト（keys はキャッシュキーのリスト）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT * FROM batch_jobs
+                WHERE kind = ? AND status = 'pending'
+                ORDER BY created_at
+                """,
+                (kind,),
+            ).fetchall()
+        return [dict(row, keys=json.loads(row["keys"])) for row in rows]
+
+    def finish_batch_job(self, name: str, status: str) -> None:
+        """
+        バッチジョブの結果取得の完了を記録
+
+        Args:
+            name: ジョブ名
+            status: ジョブの終了状態
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE batch_jobs SET status = ?, updated_at = ? WHERE name = ?",
+                (status, _now(), name),
+            )
+
+    def record_failure(
+        self, video: Dict[str, str], error_class: str, message: str
+    ) -> Dict[str, Any]:
+        """
+        動画の処理失敗を記録し、次に処理できる日時を決める
+
+        試行回数に応じて指数バックオフで次の日時を延ばし、エラーの分類ごとの
+        試行回数の上限に達した場合はデッドレターとする。
+
+        Args:
+            video: 動画情報
+            error_class: エラーの分類（retry_policy.ERROR_* のいずれか）
+            message: エラーメッセージ
+
+        Returns:
+            記録した失敗の辞書（attempts・status・next_eligible_at 等）
+        """
+        now = _now()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT attempts, first_failed_at FROM failures WHERE video_id = ?",
+                (video["video_id"],),
+            ).fetchone()
+            attempts = (row["attempts"] if row else 0) + 1
+            dead = attempts >= max_attempts(error_class)
+            record = {
+                "video_id": video["video_id"],
+                "title": video.get("title", ""),
+                "error_class": error_class,
+                "message": message[:1000],
+                "attempts": attempts,
+                "status": RETRY_DEAD if dead else RETRY_WAITING,
+                "next_eligible_at": None if dead else _now(backoff_seconds(attempts)),
+                "first_failed_at": row["first_failed_at"] if row else now,
+                "updated_at": now,
+            }
+            self._conn.execute(
+                f"""
+                INSERT OR REPLACE INTO failures ({", ".join(record)})
+                VALUES ({", ".join("?" * len(record))})
+                """,
+                tuple(record.values()),
+            )
+        return record
+
+    def clear_failure(self, video: Dict[str, str]) -> None:
+        """
+        処理に成功した動画の失敗の記録を削除
+
+        Args:
+            video: 動画情報
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM failures WHERE video_id = ?", (video["video_id"],)
+            )
+
+    def retry_block(self, video: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        再試行待ち・デッドレターのため処理しない動画の失敗の記録を取得
+
+        Args:
+            video: 動画情報
+
+        Returns:
+            失敗の辞書（処理できる動画の場合はNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT * FROM failures
+                WHERE video_id = ?
+                  AND (status = ? OR next_eligible_at > ?)
+                """,
+                (video["video_id"], RETRY_DEAD, _now()),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def clear_failures(self) -> int:
+        """
+        すべての失敗の記録を削除（デッドレターの動画も再試行する）
+
+        Returns:
+            削除した記録の数
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM failures")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
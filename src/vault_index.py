@@ -0,0 +1,188 @@
+"""
+ノート索引モジュール
+保存先ディレクトリのマークダウンファイル名とフロントマターのvideo_idを
+1回のディレクトリ走査でメモリに読み込み、ファイル名の重複判定と
+同じ動画のノートの検出をファイルシステムに問い合わせずに行う
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Optional, Set
+
+from .md_writer import sanitize_filename, video_id_from_url
+
+logger = logging.getLogger(__name__)
+
+NOTE_EXTENSION = ".md"
+# フロントマター読み込み時に先頭から読む最大バイト数
+FRONTMATTER_MAX_BYTES = 8192
+_FRONTMATTER_FIELD = re.compile(r"^(\w+):\s*(.*?)\s*$")
+
+
+def _unquote(value: str) -> str:
+    """引用符で囲まれたフロントマターの値（YAMLの文字列）から引用符を外す"""
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        try:
+            return str(json.loads(value))
+        except ValueError:
+            return value[1:-1]
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    return value
+
+
+def read_note_video_id(path: str) -> str:
+    """
+    ノートのフロントマターからvideo_idを取得
+
+    video_id フィールドがあればその値を、なければ source のURLから抽出する。
+
+    Args:
+        path: マークダウンファイルのパス
+
+    Returns:
+        video_id（取得できない場合は空文字）
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        head = f.read(FRONTMATTER_MAX_BYTES)
+
+    lines = head.splitlines()
+    if not lines or lines[0].strip() != "---":
+        return ""
+
+    fields: Dict[str, str] = {}
+    for line in lines[1:]:
+        if line.strip() == "---":
+            break
+        match = _FRONTMATTER_FIELD.match(line)
+        if match:
+            fields[match.group(1)] = _unquote(match.group(2))
+
+    return fields.get("video_id") or video_id_from_url(fields.get("source", ""))
+
+
+class VaultIndex:
+    """
+    ディレクトリ内のノートのファイル名とvideo_idの索引
+
+    生成時に1回だけディレクトリを走査し、以降は書き込み・移動のたびに
+    reserve / add で索引を更新する。save段階（スレッド）とファイル移動から
+    呼ばれるためロックで保護する。
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: 索引を作成するディレクトリ（存在しない場合は空の索引）
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        # 大文字小文字を区別しないファイルシステムでも衝突しないよう casefold で保持
+        self._names: Set[str] = set()
+        # ファイル名（拡張子なし） -> 次に試す連番
+        self._next_suffix: Dict[str, int] = {}
+        # video_id -> ノートのパス
+        self._videos: Dict[str, str] = {}
+        # ノートのパス -> video_id
+        self._paths: Dict[str, str] = {}
+        self._scan()
+
+    def _scan(self) -> None:
+        """ディレクトリを走査して索引を作成"""
+        if not os.path.isdir(self.directory):
+            return
+
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(NOTE_EXTENSION):
+                    continue
+                self._names.add(entry.name.casefold())
+                try:
+                    video_id = read_note_video_id(entry.path)
+                except OSError as e:
+                    logger.warning(f"ノートを読み込めません: {entry.path} - {e}")
+                    continue
+                if video_id and video_id not in self._videos:
+                    self._videos[video_id] = entry.path
+                    self._paths[entry.path] = video_id
+
+        logger.debug(
+            "ノート索引を作成しました: %s（%d 件, 動画 %d 件）",
+            self.directory,
+            len(self._names),
+            len(self._videos),
+        )
+
+    def find_video(self, video_id: str) -> Optional[str]:
+        """
+        同じ動画のノートのパスを取得
+
+        Args:
+            video_id: 動画ID
+
+        Returns:
+            ノートのパス（存在しない場合はNone）
+        """
+        with self._lock:
+            return self._videos.get(video_id)
+
+    def reserve(
+        self, filename: str, extension: str = NOTE_EXTENSION, first_suffix: int = 2
+    ) -> str:
+        """
+        重複しないファイルパスを決定して索引に登録
+
+        同名のファイルがある場合は first_suffix から順に番号を付与する。
+        試行済みの番号は記録しておき、同じ名前が続いても先頭から探し直さない。
+
+        Args:
+            filename: 基本となるファイル名（サニタイズ前）
+            extension: ファイル拡張子
+            first_suffix: 最初に付与する番号
+
+        Returns:
+            重複しないファイルパス
+        """
+        safe_filename = sanitize_filename(filename)
+        with self._lock:
+            name = f"{safe_filename}{extension}"
+            if name.casefold() in self._names:
+                counter = self._next_suffix.get(safe_filename.casefold(), first_suffix)
+                name = f"{safe_filename}_{counter}{extension}"
+                while name.casefold() in self._names:
+                    counter += 1
+                    name = f"{safe_filename}_{counter}{extension}"
+                self._next_suffix[safe_filename.casefold()] = counter + 1
+
+            self._names.add(name.casefold())
+        return os.path.join(self.directory, name)
+
+    def add(self, path: str, video_id: str = "") -> None:
+        """
+        書き込み・移動したノートを索引に登録
+
+        Args:
+            path: ノートのパス
+            video_id: 動画ID（分かる場合）
+        """
+        with self._lock:
+            self._names.add(os.path.basename(path).casefold())
+            if video_id:
+                self._videos[video_id] = path
+                self._paths[path] = video_id
+
+    def discard(self, path: str) -> None:
+        """
+        移動・削除したノートを索引から除外
+
+        Args:
+            path: ノートのパス
+        """
+        with self._lock:
+            self._names.discard(os.path.basename(path).casefold())
+            video_id = self._paths.pop(path, None)
+            if video_id and self._videos.get(video_id) == path:
+                del self._videos[video_id]
@@ -0,0 +1,240 @@
+"""
+分散作業キューモジュール
+複数のプロセス・ホストで同じ再生リストを処理する際に、再生リスト項目ごとの
+期限付きリース（SQLite）で担当を決め、同じ動画を重複して処理しないようにする。
+処理中はハートビートでリースを延長し、期限切れのリース（停止したワーカーの担当分）は他のワーカーが引き継ぐ
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from . import config
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# リースの状態
+STATUS_LEASED = "leased"  # ワーカーが処理中（expires_at まで有効）
+STATUS_DONE = "done"  # 処理完了（どのワーカーも処理しない）
+STATUS_RELEASED = "released"  # 処理に失敗して解放（次に取得したワーカーが処理）
+
+
+def default_worker_id() -> str:
+    """ワーカーID（WORKER_ID、未設定の場合は ホスト名-プロセスID）"""
+    return config.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    再生リスト項目ごとのリースを管理するSQLiteの作業キュー
+
+    複数のワーカーが同じデータベースファイルを共有する。リースの期限はUnix時刻で比較するため、
+    ホスト間で時刻を同期しておくこと（NTP等）。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        worker_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            db_path: SQLiteデータベースファイルのパス（全ワーカーで共有）
+            worker_id: ワーカーID（省略時は default_worker_id()）
+            lease_seconds: リースの有効期間（秒、省略時は WORK_LEASE_SECONDS）
+        """
+        self.db_path = db_path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds or config.WORK_LEASE_SECONDS
+        self._lock = threading.Lock()
+        # 取得・引き継ぎの判定と更新を1つの書き込みトランザクションで行うため自動コミットを無効化し、
+        # BEGIN IMMEDIATE で明示的に開始する
+        self._conn = sqlite3.connect(
+            db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        # WALでは書き込み中も他のワーカーが読み込める（共有メモリを使うため、
+        # 複数ホストからネットワークストレージ上のファイルを共有する場合は WORK_QUEUE_WAL=false）
+        if config.WORK_QUEUE_WAL:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        """テーブルが存在しない場合は作成"""
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    playlist_item_id TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    worker_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+                """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_leases_worker ON leases (worker_id, status)"
+            )
+
+    def acquire(self, playlist_item_id: str, video_id: str) -> bool:
+        """
+        再生リスト項目のリースを取得
+
+        未登録・解放済み・期限切れの項目、および自分が保持しているリースは取得できる。
+        他のワーカーが有効なリースを保持している項目と、処理完了の項目は取得できない。
+
+        Args:
+            playlist_item_id: 再生リスト項目ID
+            video_id: 動画ID
+
+        Returns:
+            取得できた場合True
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT worker_id, status, expires_at FROM leases"
+                    " WHERE playlist_item_id = ?",
+                    (playlist_item_id,),
+                ).fetchone()
+                if row and (
+                    row["status"] == STATUS_DONE
+                    or (
+                        row["status"] == STATUS_LEASED
+                        and row["worker_id"] != self.worker_id
+                        and row["expires_at"] > now
+                    )
+                ):
+                    self._conn.execute("COMMIT")
+                    return False
+
+                self._conn.execute(
+                    """
+                    INSERT INTO leases (
+                        playlist_item_id, video_id, worker_id, status,
+                        expires_at, attempts, updated_at
+                    )
+                    VALUES (?, ?, ?, ?, ?, 1, ?)
+                    ON CONFLICT (playlist_item_id) DO UPDATE SET
+                        worker_id = excluded.worker_id,
+                        status = excluded.status,
+                        expires_at = excluded.expires_at,
+                        attempts = leases.attempts
+                            + (leases.worker_id != excluded.worker_id
+                               OR leases.status != excluded.status),
+                        updated_at = excluded.updated_at
+                    """,
+                    (
+                        playlist_item_id,
+                        video_id,
+                        self.worker_id,
+                        STATUS_LEASED,
+                        now + self.lease_seconds,
+                        now,
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if (
+            row
+            and row["status"] == STATUS_LEASED
+            and row["worker_id"] != self.worker_id
+        ):
+            METRICS.increment("leases_reclaimed")
+            logger.warning(
+                f"期限切れのリースを引き継ぎました: {video_id}（{row['worker_id']}）"
+            )
+        return True
+
+    def heartbeat(self) -> int:
+        """
+        保持しているすべてのリースの期限を延長
+
+        Returns:
+            延長したリースの数
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE leases SET expires_at = ?, updated_at = ?
+                WHERE worker_id = ? AND status = ?
+                """,
+                (now + self.lease_seconds, now, self.worker_id, STATUS_LEASED),
+            )
+        return cursor.rowcount
+
+    def renew(self, playlist_item_id: str) -> bool:
+        """
+        再生リスト項目のリースを延長し、保持し続けているかを確認
+
+        期限切れでも他のワーカーに引き継がれていなければ延長できる。
+
+        Args:
+            playlist_item_id: 再生リスト項目ID
+
+        Returns:
+            保持している場合True（他のワーカーに引き継がれた場合False）
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE leases SET expires_at = ?, updated_at = ?
+                WHERE playlist_item_id = ? AND worker_id = ? AND status = ?
+                """,
+                (
+                    now + self.lease_seconds,
+                    now,
+                    playlist_item_id,
+                    self.worker_id,
+                    STATUS_LEASED,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def _finish(self, playlist_item_id: str, status: str) -> None:
+        """保持しているリースの状態を更新"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE leases SET status = ?, updated_at = ?
+                WHERE playlist_item_id = ? AND worker_id = ? AND status = ?
+                """,
+                (status, time.time(), playlist_item_id, self.worker_id, STATUS_LEASED),
+            )
+
+    def complete(self, playlist_item_id: str) -> None:
+        """
+        処理完了を記録（以降はどのワーカーも処理しない）
+
+        Args:
+            playlist_item_id: 再生リスト項目ID
+        """
+        self._finish(playlist_item_id, STATUS_DONE)
+
+    def release(self, playlist_item_id: str) -> None:
+        """
+        リースを解放（処理に失敗した項目を他のワーカー・次回の実行で再処理できるようにする）
+
+        Args:
+            playlist_item_id: 再生リスト項目ID
+        """
+        self._finish(playlist_item_id, STATUS_RELEASED)
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
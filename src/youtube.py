@@ -4,24 +4,36 @@ YouTube再生リストから動画URL一覧を取得し、
 処理後に再生リストから削除するスクリプト
 """
 
+import asyncio
 import logging
 import os
+import re
+import threading
 from pathlib import Path
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+# 認証・API クライアント生成用のSDKは読み込みが重いため、使用時に読み込む
 from googleapiclient.errors import HttpError
 
 from . import config
+from .metrics import METRICS
 
 logger = logging.getLogger(__name__)
 
 # スコープの定義（再生リスト操作に必要な権限）
 SCOPES = ["https://www.googleapis.com/auth/youtube"]
 
+# YouTube Data API のバッチリクエスト1回あたりの最大件数
+BATCH_SIZE = 50
+
+# ISO 8601形式の再生時間（YouTube Data API の contentDetails.duration）
+_DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?")
+
+# 実行中に使い回す認証済みクライアント
+_youtube = None
+# httplib2 はスレッドセーフではないため、クライアントの作成とAPI呼び出しを直列化する
+_youtube_lock = threading.RLock()
+
 
 def authenticate():
     """
@@ -30,6 +42,9 @@ def authenticate():
     Returns:
         認証済みのYouTube APIクライアント
     """
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
     project_root = Path(__file__).parent.parent
     creds = None
 
@@ -45,6 +60,8 @@ def authenticate():
     # 認証情報が無効な場合は再認証
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
+
             try:
                 creds.refresh(Request())
             except Exception as e:
@@ -59,6 +76,8 @@ def authenticate():
                     "Google Cloud Console から OAuth 2.0 クライアントIDをダウンロードしてください。"
                 )
 
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
             flow = InstalledAppFlow.from_client_secrets_file(
                 project_root / "client_secret.json", SCOPES
             )
@@ -69,73 +88,261 @@ def authenticate():
             token.write(creds.to_json())
 
     # YouTube API クライアントを作成
-    youtube = build("youtube", "v3", credentials=creds)
+    # ライブラリ同梱のディスカバリードキュメントを使用し、ネットワーク取得を行わない
+    youtube = build(
+        "youtube",
+        "v3",
+        credentials=creds,
+        static_discovery=True,
+        cache_discovery=False,
+    )
     logger.info("YouTube API 認証成功")
     return youtube
 
 
-def get_playlist_video_infos() -> List[Dict[str, str]]:
+def parse_duration(duration: str) -> int:
+    """
+    ISO 8601形式の再生時間を秒数に変換
+
+    Args:
+        duration: 再生時間（例: PT1H2M3S、P1DT2H）
+
+    Returns:
+        秒数（解釈できない場合は0）
+    """
+    match = _DURATION_PATTERN.fullmatch(duration or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(value or 0) for value in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def video_duration_seconds(video: Dict[str, str]) -> int:
+    """
+    動画情報から再生時間（秒）を取得
+
+    Args:
+        video: 動画情報
+
+    Returns:
+        再生時間（秒、不明な場合は0）
+    """
+    return parse_duration(video.get("duration", ""))
+
+
+def get_youtube_client():
+    """
+    認証済みのYouTube APIクライアントを取得（初回呼び出し時のみ認証）
+
+    Returns:
+        認証済みのYouTube APIクライアント
+    """
+    global _youtube
+    with _youtube_lock:
+        if _youtube is None:
+            _youtube = authenticate()
+        return _youtube
+
+
+def _list_playlist_items(
+    youtube,
+    playlist_id: str,
+    page_token: Optional[str],
+    etag: Optional[str] = None,
+) -> Optional[Dict]:
+    """
+    再生リストの1ページ分の項目を取得（同期処理）
+
+    Args:
+        youtube: 認証済みのYouTube APIクライアント
+        playlist_id: 再生リストID
+        page_token: 取得するページのトークン（先頭ページはNone）
+        etag: 前回取得時のETag（指定時は If-None-Match で条件付きリクエスト）
+
+    Returns:
+        APIレスポンス（ETagが一致し変更がない場合はNone）
+    """
+    request = youtube.playlistItems().list(
+        part="snippet,contentDetails",
+        playlistId=playlist_id,
+        maxResults=50,
+        pageToken=page_token,
+    )
+    if etag:
+        request.headers["If-None-Match"] = etag
+
+    try:
+        with _youtube_lock, METRICS.span("playlist_list"):
+            return request.execute()
+    except HttpError as e:
+        if etag and e.resp.status == 304:
+            return None
+        raise
+
+
+def _video_infos(youtube, playlist_id: str, response: Dict) -> List[Dict[str, str]]:
+    """
+    再生リスト項目のレスポンスに動画の詳細情報を結合（同期処理）
+
+    Args:
+        youtube: 認証済みのYouTube APIクライアント
+        playlist_id: 再生リストID
+        response: playlistItems.list のレスポンス
+
+    Returns:
+        動画情報のリスト
+    """
+    # 動画IDを収集
+    video_ids = []
+    playlist_items = {}
+
+    for item in response.get("items", []):
+        video_id = item["contentDetails"]["videoId"]
+        video_ids.append(video_id)
+        playlist_items[video_id] = item
+
+    # 動画の詳細情報を取得（公開日時・再生時間を含む）
+    videos = []
+    if video_ids:
+        video_request = youtube.videos().list(
+            part="snippet,contentDetails", id=",".join(video_ids)
+        )
+        with _youtube_lock, METRICS.span("video_details"):
+            video_response = video_request.execute()
+
+        # 動画情報を結合
+        for video in video_response.get("items", []):
+            video_id = video["id"]
+            playlist_item = playlist_items[video_id]
+
+            video_info = {
+                "playlist_item_id": playlist_item["id"],  # 再生リストからの削除に必要
+                "video_id": video_id,
+                "playlist_id": playlist_id,
+                "title": video["snippet"]["title"],
+                "channel": video["snippet"].get("channelTitle", "Unknown"),
+                "published_at": video["snippet"].get(
+                    "publishedAt", ""
+                ),  # 動画の公開日時
+                "added_at": playlist_item.get("snippet", {}).get(
+                    "publishedAt", ""
+                ),  # 再生リストへの追加日時
+                "url": f"https://www.youtube.com/watch?v={video_id}",
+                "duration": video.get("contentDetails", {}).get(
+                    "duration", ""
+                ),  # ISO 8601形式の再生時間（例: PT1H2M3S）
+            }
+            videos.append(video_info)
+
+    return videos
+
+
+def _fetch_playlist_page(
+    youtube, page_token: Optional[str], playlist_id: str = ""
+) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """
+    再生リストの1ページ分の動画情報を取得（同期処理）
+
+    Args:
+        youtube: 認証済みのYouTube APIクライアント
+        page_token: 取得するページのトークン（先頭ページはNone）
+        playlist_id: 再生リストID（省略時は PLAYLIST_ID）
+
+    Returns:
+        (動画情報のリスト, 次ページのトークン) のタプル
+    """
+    playlist_id = playlist_id or config.PLAYLIST_ID
+    response = _list_playlist_items(youtube, playlist_id, page_token)
+    videos = _video_infos(youtube, playlist_id, response)
+    return videos, response.get("nextPageToken")
+
+
+class PlaylistPoller:
+    """
+    再生リストを定期的に取得するためのポーラー
+
+    ページごとにETagと動画情報を保持し、次回の取得では If-None-Match を付けた
+    条件付きリクエストを送る。変更のないページ（304）は保持している動画情報を
+    再利用し、動画の詳細情報（videos.list）も取得しない。
+    """
+
+    def __init__(self, playlist_id: str = ""):
+        """
+        Args:
+            playlist_id: 再生リストID（省略時は PLAYLIST_ID）
+        """
+        self.playlist_id = playlist_id or config.PLAYLIST_ID
+        # ページトークン（先頭ページは空文字） -> (ETag, 動画情報, 次ページのトークン)
+        self._pages: Dict[str, Tuple[str, List[Dict[str, str]], Optional[str]]] = {}
+
+    def poll(self) -> List[Dict[str, str]]:
+        """
+        再生リストの現在の動画情報一覧を取得（同期処理）
+
+        Returns:
+            動画情報のリスト
+        """
+        youtube = get_youtube_client()
+        pages = {}
+        videos: List[Dict[str, str]] = []
+        changed = 0
+        page_token = None
+
+        while True:
+            key = page_token or ""
+            cached = self._pages.get(key)
+            response = _list_playlist_items(
+                youtube, self.playlist_id, page_token, cached[0] if cached else None
+            )
+            if response is None:
+                # 前回から変更なし
+                etag, page, next_page_token = cached
+            else:
+                changed += 1
+                etag = response.get("etag", "")
+                page = _video_infos(youtube, self.playlist_id, response)
+                next_page_token = response.get("nextPageToken")
+
+            pages[key] = (etag, page, next_page_token)
+            videos.extend(page)
+            if not next_page_token:
+                break
+            page_token = next_page_token
+
+        self._pages = pages
+        if changed:
+            logger.info(
+                "再生リストの変更を検出しました: %d 件（更新ページ: %d）",
+                len(videos),
+                changed,
+            )
+        else:
+            logger.debug("再生リストに変更はありません")
+        return videos
+
+
+def get_playlist_video_infos(playlist_id: str = "") -> List[Dict[str, str]]:
     """
     再生リストから動画情報一覧を取得
 
     Args:
-        playlist_id: YouTube再生リストID
+        playlist_id: 再生リストID（省略時は PLAYLIST_ID）
 
     Returns:
         動画情報のリスト（URL、タイトル、playlist_item_id等を含む辞書のリスト）
     """
-    youtube = authenticate()
+    youtube = get_youtube_client()
     videos = []
     next_page_token = None
 
     try:
         while True:
-            # 再生リストの動画を取得
-            request = youtube.playlistItems().list(
-                part="snippet,contentDetails",
-                playlistId=config.PLAYLIST_ID,
-                maxResults=50,
-                pageToken=next_page_token,
+            page, next_page_token = _fetch_playlist_page(
+                youtube, next_page_token, playlist_id
             )
-            response = request.execute()
-
-            # 動画IDを収集
-            video_ids = []
-            playlist_items = {}
-
-            for item in response.get("items", []):
-                video_id = item["contentDetails"]["videoId"]
-                video_ids.append(video_id)
-                playlist_items[video_id] = item
-
-            # 動画の詳細情報を取得（公開日時を含む）
-            if video_ids:
-                video_request = youtube.videos().list(
-                    part="snippet", id=",".join(video_ids)
-                )
-                video_response = video_request.execute()
-
-                # 動画情報を結合
-                for video in video_response.get("items", []):
-                    video_id = video["id"]
-                    playlist_item = playlist_items[video_id]
-
-                    video_info = {
-                        "playlist_item_id": playlist_item[
-                            "id"
-                        ],  # 再生リストからの削除に必要
-                        "video_id": video_id,
-                        "title": video["snippet"]["title"],
-                        "channel": video["snippet"].get("channelTitle", "Unknown"),
-                        "published_at": video["snippet"].get(
-                            "publishedAt", ""
-                        ),  # 動画の公開日時
-                        "url": f"https://www.youtube.com/watch?v={video_id}",
-                    }
-                    videos.append(video_info)
+            videos.extend(page)
 
             # 次のページがあるか確認
-            next_page_token = response.get("nextPageToken")
             if not next_page_token:
                 break
 
@@ -147,6 +354,69 @@ def get_playlist_video_infos() -> List[Dict[str, str]]:
         return []
 
 
+async def iter_playlist_video_infos(
+    playlist_id: str = "",
+) -> AsyncIterator[Dict[str, str]]:
+    """
+    再生リストの動画情報をページ単位で取得しながら順次返す
+
+    ページ取得（同期処理）はワーカースレッドで実行するため、
+    呼び出し側は1ページ目の取得直後から処理を開始できる。
+
+    Args:
+        playlist_id: 再生リストID（省略時は PLAYLIST_ID）
+
+    Yields:
+        動画情報（URL、タイトル、playlist_item_id等を含む辞書）
+    """
+    try:
+        youtube = await asyncio.to_thread(get_youtube_client)
+        count = 0
+        next_page_token = None
+
+        while True:
+            page, next_page_token = await asyncio.to_thread(
+                _fetch_playlist_page, youtube, next_page_token, playlist_id
+            )
+            for video_info in page:
+                count += 1
+                yield video_info
+
+            # 次のページがあるか確認
+            if not next_page_token:
+                break
+
+        logger.info("再生リストから %d 件の動画を取得しました", count)
+
+    except HttpError as e:
+        logger.error("動画リストの取得に失敗: %s", e)
+
+
+async def iter_playlists_video_infos(
+    playlist_ids: List[str],
+) -> AsyncIterator[Dict[str, str]]:
+    """
+    複数の再生リストの動画情報を1件ずつ交互に返す（ラウンドロビン）
+
+    パイプラインへの投入順が再生リスト間で偏らないよう、
+    各再生リストから1件ずつ順番に取り出す。
+
+    Args:
+        playlist_ids: 再生リストIDのリスト
+
+    Yields:
+        動画情報
+    """
+    iterators = [iter_playlist_video_infos(playlist_id) for playlist_id in playlist_ids]
+    while iterators:
+        for iterator in list(iterators):
+            video_info = await anext(iterator, None)
+            if video_info is None:
+                iterators.remove(iterator)
+            else:
+                yield video_info
+
+
 def remove_from_playlist(playlist_item_id: str) -> bool:
     """
     再生リストから動画を削除
@@ -163,11 +433,64 @@ def remove_from_playlist(playlist_item_id: str) -> bool:
         return False
 
     try:
-        youtube = authenticate()
+        youtube = get_youtube_client()
         request = youtube.playlistItems().delete(id=playlist_item_id)
-        request.execute()
+        with _youtube_lock, METRICS.span("playlist_delete"):
+            request.execute()
         logger.info("  → 再生リストから削除しました")
         return True
     except HttpError as e:
         logger.error("  → 再生リストからの削除に失敗: %s", e)
         return False
+
+
+def remove_from_playlist_batch(playlist_item_ids: List[str]) -> Dict[str, bool]:
+    """
+    再生リストから複数の動画をバッチリクエストで削除
+
+    Args:
+        playlist_item_ids: 再生リスト内の動画IDのリスト
+
+    Returns:
+        playlist_item_id -> 削除成功の可否 の辞書
+    """
+    results = {playlist_item_id: False for playlist_item_id in playlist_item_ids}
+
+    # 環境変数から削除設定を確認
+    if not config.DELETE_FROM_PLAYLIST:
+        logger.info(
+            "  → 再生リストからの削除はスキップ（設定により無効）: %d 件",
+            len(playlist_item_ids),
+        )
+        return results
+
+    def on_response(
+        request_id: str, response: object, exception: Optional[HttpError]
+    ) -> None:
+        if exception is not None:
+            logger.error(
+                "  → 再生リストからの削除に失敗: %s - %s", request_id, exception
+            )
+            return
+        results[request_id] = True
+
+    try:
+        youtube = get_youtube_client()
+        for start in range(0, len(playlist_item_ids), BATCH_SIZE):
+            batch = youtube.new_batch_http_request(callback=on_response)
+            for playlist_item_id in playlist_item_ids[start : start + BATCH_SIZE]:
+                batch.add(
+                    youtube.playlistItems().delete(id=playlist_item_id),
+                    request_id=playlist_item_id,
+                )
+            with _youtube_lock, METRICS.span("playlist_delete"):
+                batch.execute()
+    except HttpError as e:
+        logger.error("  → 再生リストからの一括削除に失敗: %s", e)
+
+    logger.info(
+        "  → 再生リストから削除しました: %d/%d 件",
+        sum(results.values()),
+        len(playlist_item_ids),
+    )
+    return results
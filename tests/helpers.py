@@ -0,0 +1,123 @@
+"""
+テスト用の共通処理
+疑似Gemini API（scripts/fake_backends.py）を共有クライアントとして登録し、
+一時ディレクトリ内で完結する設定で処理状態ストア・キャッシュ・パイプラインを使う
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+from fake_backends import FakeGeminiClient, GeminiProfile, LatencyProfile  # noqa: E402
+
+from src import config, gemini_api, key_pool  # noqa: E402
+from src.cache import ContentCache  # noqa: E402
+from src.pipeline import VideoJob, VideoPipeline  # noqa: E402
+from src.state_store import StateStore  # noqa: E402
+
+TEST_API_KEY = "test"
+TEST_PLAYLIST_ID = "TEST"
+
+
+def make_video(n: int, duration: str = "PT5M") -> Dict[str, str]:
+    """
+    再生リストの動画情報（youtube.get_playlist_videos と同じ形式）を作成
+
+    Args:
+        n: 動画の番号
+        duration: 再生時間（ISO 8601形式）
+
+    Returns:
+        動画情報
+    """
+    video_id = f"video{n:04d}"
+    return {
+        "playlist_item_id": f"item{n:04d}",
+        "video_id": video_id,
+        "playlist_id": TEST_PLAYLIST_ID,
+        "title": f"テスト動画 {n}",
+        "channel": "テストチャンネル",
+        "published_at": "2024-01-01T00:00:00Z",
+        "added_at": "2024-01-02T00:00:00Z",
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "duration": duration,
+    }
+
+
+class FakeBackendTestCase(unittest.TestCase):
+    """疑似Gemini APIと一時ディレクトリで実行するテストの基底クラス"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.work_dir = tmp.name
+
+        # .env の設定に関わらず、APIを呼び出さない設定で実行
+        patcher = mock.patch.multiple(
+            config,
+            GEMINI_API_KEY=TEST_API_KEY,
+            GEMINI_API_KEYS=[TEST_API_KEY],
+            PLAYLISTS=[(TEST_PLAYLIST_ID, "")],
+            DELETE_FROM_PLAYLIST=False,
+            OBSIDIAN_VAULT_PATH="",
+            DIRECT_TO_VAULT=False,
+            STREAMING_MODE=False,
+            SINGLE_PASS_MODE=False,
+            CAPTIONS_ENABLED=False,
+            HEDGE_STAGES=[],
+            REMOVE_BATCH_WAIT_SECONDS=0,
+            BATCH_POLL_SECONDS=0,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = FakeGeminiClient(self.gemini_profile(), seed=0)
+        gemini_api._clients[TEST_API_KEY] = self.client
+        self.addCleanup(gemini_api._clients.pop, TEST_API_KEY, None)
+        key_pool._pools.clear()
+        self.addCleanup(key_pool._pools.clear)
+
+        self.state = self.open_state()
+        self.cache = ContentCache(os.path.join(self.work_dir, "cache"), 1 << 30)
+
+    def gemini_profile(self) -> GeminiProfile:
+        """疑似Gemini APIの応答設定（レイテンシなし）"""
+        return GeminiProfile(latency=LatencyProfile())
+
+    def open_state(self) -> StateStore:
+        """処理状態ストアを開く（同じファイルを開き直すと再起動後の状態になる）"""
+        state = StateStore(os.path.join(self.work_dir, "state.db"))
+        self.addCleanup(state.close)
+        return state
+
+    def run_pipeline(self, videos: List[Dict[str, str]]) -> List[VideoJob]:
+        """
+        動画をパイプラインで処理
+
+        Args:
+            videos: 動画情報のリスト
+
+        Returns:
+            処理が終了した動画のリスト
+        """
+
+        async def run() -> List[VideoJob]:
+            pipeline = VideoPipeline(
+                self.state,
+                self.cache,
+                output_dir=os.path.join(self.work_dir, "output"),
+            )
+            pipeline.start()
+            for n, video in enumerate(videos, 1):
+                await pipeline.submit(VideoJob(video, n, len(videos)))
+            return await pipeline.join()
+
+        return asyncio.run(run())
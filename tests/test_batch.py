@@ -0,0 +1,194 @@
+"""
+バッチモード（src/batch.py）のテスト
+疑似Gemini APIのバッチジョブで、結果のキャッシュへの格納・再起動後の結果取得の再開・
+失敗したリクエストのパイプラインでの生成を確認する
+"""
+
+import asyncio
+import re
+import unittest
+from types import SimpleNamespace
+
+from src import batch, config
+from src.batch import run_batch
+from src.cache import content_hash
+from src.gemini_api import (
+    article_cache_key,
+    create_batch_job,
+    transcript_cache_key,
+)
+from src.youtube import video_duration_seconds
+
+from .helpers import TEST_API_KEY, FakeBackendTestCase, make_video
+
+
+class BatchTest(FakeBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        # リクエストごとに異なる応答を返し、結果とキャッシュキーの対応を確認できるようにする
+        models = self.client.aio.models
+        response_for = models.response_for
+
+        def echo_response(contents, config=None):
+            response = response_for(contents, config)
+            if isinstance(contents, str):
+                video_id = re.search(r"video\d{4}", contents).group(0)
+                response.text = f"記事 {video_id}\n{response.text}"
+            else:
+                url = contents.parts[0].file_data.file_uri
+                response.text = f"文字起こし {url}\n{response.text}"
+            return response
+
+        models.response_for = echo_response
+
+    def transcript_of(self, video):
+        """キャッシュ済みの文字起こし（未キャッシュの場合はNone）"""
+        return self.cache.get(
+            transcript_cache_key(video["video_id"], video_duration_seconds(video))
+        )
+
+    def article_of(self, video):
+        """キャッシュ済みの記事（未キャッシュの場合はNone）"""
+        transcript = self.transcript_of(video)
+        if transcript is None:
+            return None
+        return self.cache.get(
+            article_cache_key(
+                video["video_id"],
+                content_hash(transcript),
+                len(transcript),
+                config.ARTICLE_MODEL,
+            )
+        )
+
+    def batch_jobs(self, kind):
+        """作成されたバッチジョブ（文字起こしは動画、記事は文字列のリクエスト）"""
+        is_article = kind == "article"
+        return [
+            job
+            for job in self.client.aio.batches.jobs.values()
+            if isinstance(job.requests[0], str) == is_article
+        ]
+
+    def test_responses_are_cached_by_position(self):
+        videos = [make_video(n) for n in range(1, 6)]
+        asyncio.run(run_batch(self.state, self.cache, videos))
+
+        self.assertEqual(len(self.batch_jobs("transcript")), 1)
+        self.assertEqual(len(self.batch_jobs("article")), 1)
+        for video in videos:
+            self.assertTrue(
+                self.transcript_of(video).startswith(f"文字起こし {video['url']}\n")
+            )
+            self.assertTrue(
+                self.article_of(video).startswith(f"記事 {video['video_id']}\n")
+            )
+        self.assertEqual(self.state.pending_batch_jobs("transcript"), [])
+        self.assertEqual(self.state.pending_batch_jobs("article"), [])
+
+        # キャッシュ済みの動画はパイプラインでAPIを呼ばない
+        jobs = self.run_pipeline(videos)
+        self.assertTrue(all(job.success for job in jobs))
+        self.assertEqual(self.client.calls, {})
+
+    def test_pending_jobs_resume_after_restart(self):
+        videos = [make_video(n) for n in range(1, 4)]
+        requests = batch._transcript_requests(self.cache, videos)
+        name = asyncio.run(
+            create_batch_job(
+                TEST_API_KEY,
+                config.TRANSCRIPT_MODEL,
+                [contents for _, contents in requests],
+                batch.DISPLAY_NAMES["transcript"],
+            )
+        )
+        self.state.add_batch_job(
+            name, "transcript", config.TRANSCRIPT_MODEL, [key for key, _ in requests]
+        )
+
+        # 結果を取得する前に終了し、同じ状態データベースで再起動
+        self.state.close()
+        state = self.open_state()
+        self.assertEqual(len(state.pending_batch_jobs("transcript")), 1)
+
+        added = make_video(4)
+        asyncio.run(run_batch(state, self.cache, videos + [added]))
+
+        # 前回のジョブの動画は依頼し直さず、追加された動画のみ新しいジョブで依頼する
+        transcript_jobs = self.batch_jobs("transcript")
+        self.assertEqual([len(job.requests) for job in transcript_jobs], [3, 1])
+        for video in videos + [added]:
+            self.assertTrue(
+                self.transcript_of(video).startswith(f"文字起こし {video['url']}\n")
+            )
+        self.assertEqual(state.pending_batch_jobs("transcript"), [])
+
+        # すべてキャッシュ済みのため、再実行してもジョブを作成しない
+        created = len(self.client.aio.batches.jobs)
+        asyncio.run(run_batch(state, self.cache, videos + [added]))
+        self.assertEqual(len(self.client.aio.batches.jobs), created)
+
+    def test_failed_requests_fall_back_to_pipeline(self):
+        batches = self.client.aio.batches
+        get = batches.get
+
+        async def partially_succeeded(name):
+            job = await get(name)
+            if job.dest is not None and not isinstance(job.requests[0], str):
+                # 1件目のリクエストは失敗、2件目は応答なし
+                job.dest.inlined_responses[0] = SimpleNamespace(
+                    response=None, error="INTERNAL"
+                )
+                job.dest.inlined_responses[1] = SimpleNamespace(
+                    response=None, error=None
+                )
+                job.state = SimpleNamespace(name="JOB_STATE_PARTIALLY_SUCCEEDED")
+            return job
+
+        batches.get = partially_succeeded
+        videos = [make_video(n) for n in range(1, 5)]
+        asyncio.run(run_batch(self.state, self.cache, videos))
+
+        self.assertIsNone(self.transcript_of(videos[0]))
+        self.assertIsNone(self.transcript_of(videos[1]))
+        for video in videos[2:]:
+            self.assertTrue(
+                self.transcript_of(video).startswith(f"文字起こし {video['url']}\n")
+            )
+            self.assertIsNotNone(self.article_of(video))
+        # 一部が失敗したジョブも終了として記録し、次回の実行で再確認しない
+        self.assertEqual(self.state.pending_batch_jobs("transcript"), [])
+
+        # 失敗した動画のみパイプラインで通常どおり生成する
+        jobs = self.run_pipeline(videos)
+        self.assertTrue(all(job.success for job in jobs))
+        self.assertEqual(sum(self.client.calls.values()), 4)
+        for video in videos:
+            self.assertIsNotNone(self.article_of(video))
+
+    def test_failed_job_falls_back_to_pipeline(self):
+        batches = self.client.aio.batches
+        get = batches.get
+
+        async def failed(name):
+            job = await get(name)
+            if job.dest is not None:
+                job.dest = None
+                job.state = SimpleNamespace(name="JOB_STATE_FAILED")
+            return job
+
+        batches.get = failed
+        videos = [make_video(n) for n in range(1, 3)]
+        asyncio.run(run_batch(self.state, self.cache, videos))
+
+        self.assertEqual(len(self.batch_jobs("transcript")), 1)
+        self.assertEqual(self.batch_jobs("article"), [])
+        self.assertEqual(self.state.pending_batch_jobs("transcript"), [])
+
+        jobs = self.run_pipeline(videos)
+        self.assertTrue(all(job.success for job in jobs))
+        self.assertEqual(sum(self.client.calls.values()), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
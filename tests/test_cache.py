@@ -0,0 +1,67 @@
+"""
+生成結果キャッシュ（src/cache.py）のテスト
+参照中のエントリの削除除外と、起動時の古い一時ファイルの削除を確認する
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from src.cache import PARTIAL_MAX_AGE_SECONDS, ContentCache
+
+
+class ContentCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+
+    def test_pinned_key_survives_until_every_user_unpins(self):
+        # 1件分の容量しかないキャッシュ
+        cache = ContentCache(self.cache_dir, 10)
+        cache.put("shared", "0123456789")
+        # 2つの動画が同じエントリを参照する
+        cache.pin("shared")
+        cache.pin("shared")
+
+        cache.put("other", "0123456789")
+        self.assertTrue(os.path.exists(cache.path_for("shared")))
+
+        # 1つ目の参照を解除しても、2つ目の参照中は削除しない
+        cache.unpin("shared")
+        cache.put("another", "0123456789")
+        self.assertTrue(os.path.exists(cache.path_for("shared")))
+        self.assertEqual(cache.get("shared"), "0123456789")
+
+        # すべての参照を解除すると削除対象になる
+        cache.unpin("shared")
+        cache.put("last", "0123456789")
+        self.assertFalse(os.path.exists(cache.path_for("shared")))
+
+    def test_stale_temporary_files_are_removed_at_startup(self):
+        stale = time.time() - PARTIAL_MAX_AGE_SECONDS - 60
+        names = {
+            "key.part": True,
+            "key.part.seg000.tmp": True,
+            "abc123.tmp": True,
+            "fresh.part": False,
+            "fresh123.tmp": False,
+        }
+        for name, old in names.items():
+            path = os.path.join(self.cache_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("partial")
+            if old:
+                os.utime(path, (stale, stale))
+
+        ContentCache(self.cache_dir, 1 << 20)
+
+        for name, old in names.items():
+            self.assertEqual(
+                os.path.exists(os.path.join(self.cache_dir, name)), not old, name
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+"""
+字幕（src/captions.py）のテスト
+字幕トラックの選択・SRT/WebVTTのテキストへの変換・字幕を使用できない場合の
+Geminiによる文字起こしへの切り替えを確認する
+"""
+
+import unittest
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+from unittest import mock
+
+from googleapiclient.errors import HttpError
+
+from src import captions, config
+from src.captions import (
+    KIND_ASR,
+    KIND_MANUAL,
+    CaptionTrack,
+    captions_to_text,
+    fetch_caption_transcript,
+    select_track,
+)
+
+from .helpers import FakeBackendTestCase, make_video
+
+SRT = """1
+00:00:01,000 --> 00:00:04,000
+<font color="#ffffff">こんにちは</font>
+今日は字幕のテストです
+
+2
+00:00:04,000 --> 00:00:06,500
+こんにちは
+今日は字幕のテストです
+
+3
+01:02:03,000 --> 01:02:05,000
+<i>最後の</i>キュー
+"""
+
+VTT = """WEBVTT
+Kind: captions
+Language: ja
+
+NOTE コメントは本文に含めない
+
+00:05.000 --> 00:07.000 align:start position:0%
+<c>自動生成</c><00:00:05.500><c> の字幕</c>
+
+00:00:07.000 --> 00:00:09.000
+次の文
+"""
+
+
+def long_srt(text: str, cues: int = 30) -> str:
+    """CAPTION_MIN_CHARS を超える長さのSRT形式の字幕"""
+    return "\n".join(
+        f"{n}\n00:00:{n:02d},000 --> 00:00:{n + 1:02d},000\n{text} {n}\n"
+        for n in range(cues)
+    )
+
+
+class StubCaptionSource:
+    """動画ID -> (字幕トラック, 字幕の内容) のリストを返す字幕の取得元"""
+
+    def __init__(self, tracks: Dict[str, List[Tuple[CaptionTrack, str]]]):
+        self.tracks = tracks
+        self.downloaded: List[str] = []
+
+    def list_tracks(self, video_id: str) -> List[CaptionTrack]:
+        return [track for track, _ in self.tracks.get(video_id, [])]
+
+    def download(self, track: CaptionTrack) -> str:
+        self.downloaded.append(track.id)
+        for candidate, content in self.tracks[track.id.split(":", 1)[0]]:
+            if candidate.id == track.id:
+                if isinstance(content, Exception):
+                    raise content
+                return content
+        raise KeyError(track.id)
+
+
+class SelectTrackTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(config, "CAPTION_ALLOW_AUTO", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_manual_track_is_preferred_over_auto(self):
+        tracks = [
+            CaptionTrack("asr-ja", "ja", KIND_ASR),
+            CaptionTrack("manual-en", "en", KIND_MANUAL),
+        ]
+        self.assertEqual(select_track(tracks, ["ja", "en"]).id, "manual-en")
+
+    def test_language_preference_ignores_region(self):
+        tracks = [
+            CaptionTrack("en", "en", KIND_MANUAL),
+            CaptionTrack("ja-jp", "ja-JP", KIND_MANUAL),
+            CaptionTrack("fr", "fr", KIND_MANUAL),
+        ]
+        self.assertEqual(select_track(tracks, ["ja", "en"]).id, "ja-jp")
+        self.assertEqual(select_track(tracks, ["en", "ja"]).id, "en")
+        # 優先順にない言語は使用しない
+        self.assertIsNone(select_track(tracks[2:], ["ja", "en"]))
+        # 優先順が空の場合はすべての言語を使用する
+        self.assertEqual(select_track(tracks[2:], []).id, "fr")
+
+    def test_auto_tracks_can_be_disabled(self):
+        tracks = [CaptionTrack("asr-ja", "ja", KIND_ASR)]
+        self.assertEqual(select_track(tracks, ["ja"]).id, "asr-ja")
+        with mock.patch.object(config, "CAPTION_ALLOW_AUTO", False):
+            self.assertIsNone(select_track(tracks, ["ja"]))
+
+
+class CaptionsToTextTest(unittest.TestCase):
+    def test_srt(self):
+        self.assertEqual(
+            captions_to_text(SRT),
+            "[00:00:01] こんにちは 今日は字幕のテストです\n"
+            "[01:02:03] 最後のキュー\n",
+        )
+
+    def test_vtt(self):
+        self.assertEqual(
+            captions_to_text(VTT),
+            "[00:00:05] 自動生成 の字幕\n[00:00:07] 次の文\n",
+        )
+
+    def test_empty(self):
+        self.assertEqual(captions_to_text(""), "")
+        self.assertEqual(captions_to_text("WEBVTT\n\n"), "")
+
+
+class FetchCaptionTranscriptTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(
+            config,
+            CAPTION_LANGUAGES="ja,en",
+            CAPTION_ALLOW_AUTO=True,
+            CAPTION_MIN_CHARS=200,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, tracks, video_id="video"):
+        source = StubCaptionSource({video_id: tracks})
+        with mock.patch.object(captions, "_source", source):
+            return fetch_caption_transcript(video_id), source
+
+    def test_uses_preferred_track(self):
+        text, source = self.fetch(
+            [
+                (CaptionTrack("video:ja:asr", "ja", KIND_ASR), long_srt("自動")),
+                (CaptionTrack("video:en", "en", KIND_MANUAL), long_srt("manual")),
+            ]
+        )
+        self.assertEqual(source.downloaded, ["video:en"])
+        self.assertTrue(text.startswith("[00:00:00] manual 0\n"))
+
+    def test_missing_track(self):
+        text, source = self.fetch([])
+        self.assertEqual(text, "")
+        self.assertEqual(source.downloaded, [])
+
+        text, source = self.fetch([(CaptionTrack("video:de", "de"), long_srt("de"))])
+        self.assertEqual(text, "")
+        self.assertEqual(source.downloaded, [])
+
+    def test_empty_or_short_track(self):
+        for content in ("", "WEBVTT\n\n", long_srt("短い", cues=2)):
+            text, _ = self.fetch([(CaptionTrack("video:ja", "ja"), content)])
+            self.assertEqual(text, "")
+
+    def test_download_error(self):
+        error = HttpError(SimpleNamespace(status=403, reason="Forbidden"), b"")
+        text, _ = self.fetch([(CaptionTrack("video:ja", "ja"), error)])
+        self.assertEqual(text, "")
+
+
+class CaptionFallbackTest(FakeBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.multiple(
+            config,
+            CAPTIONS_ENABLED=True,
+            CAPTION_LANGUAGES="ja,en",
+            CAPTION_ALLOW_AUTO=True,
+            CAPTION_MIN_CHARS=200,
+            TRANSCRIPT_MODEL="models/transcript-test",
+            ARTICLE_MODEL="models/article-test",
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_falls_back_to_gemini_without_usable_captions(self):
+        with_captions, without_track, empty_track = (make_video(n) for n in (1, 2, 3))
+        source = StubCaptionSource(
+            {
+                with_captions["video_id"]: [
+                    (CaptionTrack("video0001:ja", "ja"), long_srt("字幕"))
+                ],
+                empty_track["video_id"]: [(CaptionTrack("video0003:ja", "ja"), "")],
+            }
+        )
+        with mock.patch.object(captions, "_source", source):
+            jobs = self.run_pipeline([with_captions, without_track, empty_track])
+
+        self.assertTrue(all(job.success for job in jobs))
+        notes = {}
+        for job in jobs:
+            with open(job.saved_path, encoding="utf-8") as f:
+                notes[job.video["video_id"]] = f.read()
+        self.assertIn("[00:00:00] 字幕 0", notes["video0001"])
+        self.assertNotIn("transcript ", notes["video0001"])
+        self.assertIn("transcript ", notes["video0002"])
+        self.assertIn("transcript ", notes["video0003"])
+        # 字幕を使用できなかった2件のみGeminiで文字起こしする
+        self.assertEqual(
+            self.client.calls,
+            {"models/transcript-test": 2, "models/article-test": 3},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+"""
+計測（src/metrics.py）のテスト
+ヒストグラムが保持する観測値の上限と、パーセンタイル値の更新を確認する
+"""
+
+import unittest
+
+from src.metrics import PERCENTILE_WINDOW, Histogram
+
+
+class HistogramTest(unittest.TestCase):
+    def test_percentile(self):
+        histogram = Histogram()
+        for i in range(1, 101):
+            histogram.observe(i / 100)
+        self.assertEqual(histogram.percentile(50), 0.5)
+        self.assertEqual(histogram.percentile(95), 0.95)
+        self.assertEqual(histogram.summary()["max_seconds"], 1.0)
+
+    def test_values_are_bounded(self):
+        histogram = Histogram()
+        for _ in range(PERCENTILE_WINDOW * 3):
+            histogram.observe(100.0)
+        for _ in range(PERCENTILE_WINDOW):
+            histogram.observe(1.0)
+
+        # 件数・合計・最大値は全観測値、パーセンタイルは直近の観測値から算出する
+        self.assertEqual(len(histogram.values), PERCENTILE_WINDOW)
+        self.assertEqual(histogram.count, PERCENTILE_WINDOW * 4)
+        self.assertEqual(histogram.sum, PERCENTILE_WINDOW * 301.0)
+        self.assertEqual(histogram.summary()["max_seconds"], 100.0)
+        self.assertEqual(histogram.percentile(99), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
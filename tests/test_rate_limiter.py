@@ -0,0 +1,42 @@
+"""
+レート制限（src/rate_limiter.py）のテスト
+レート制限エラーを例外のステータスコードで判定することを確認する
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from googleapiclient.errors import HttpError
+
+from src.rate_limiter import is_rate_limit_error
+
+
+class ApiError(Exception):
+    """google.genai の APIError と同じく code・status を持つ例外"""
+
+    def __init__(self, code, status, message=""):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+class IsRateLimitErrorTest(unittest.TestCase):
+    def test_structured_status(self):
+        self.assertTrue(is_rate_limit_error(ApiError(429, "RESOURCE_EXHAUSTED")))
+        self.assertTrue(is_rate_limit_error(ApiError(None, "RESOURCE_EXHAUSTED")))
+        self.assertTrue(
+            is_rate_limit_error(HttpError(SimpleNamespace(status=429, reason=""), b""))
+        )
+
+    def test_message_is_not_used(self):
+        self.assertFalse(is_rate_limit_error(ValueError("429 pages")))
+        self.assertFalse(
+            is_rate_limit_error(ValueError("quota RESOURCE_EXHAUSTED in description"))
+        )
+        self.assertFalse(
+            is_rate_limit_error(ApiError(500, "INTERNAL", "RESOURCE_EXHAUSTED"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
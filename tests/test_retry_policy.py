@@ -0,0 +1,70 @@
+"""
+失敗の分類（src/retry_policy.py）のテスト
+例外の分類と、パイプラインで例外なしに失敗した動画に記録される分類を確認する
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from googleapiclient.errors import HttpError
+
+from src import config
+from src.retry_policy import (
+    ERROR_EMPTY,
+    ERROR_PERMANENT,
+    ERROR_RATE_LIMIT,
+    ERROR_TRANSIENT,
+    ERROR_UNKNOWN,
+    classify_error,
+)
+
+from .helpers import FakeBackendTestCase, make_video
+
+
+class ClassifyErrorTest(unittest.TestCase):
+    def test_classify_error(self):
+        def http_error(status):
+            return HttpError(SimpleNamespace(status=status, reason=""), b"")
+
+        self.assertEqual(classify_error(http_error(404)), ERROR_PERMANENT)
+        self.assertEqual(classify_error(http_error(503)), ERROR_TRANSIENT)
+        self.assertEqual(classify_error(http_error(429)), ERROR_RATE_LIMIT)
+        self.assertEqual(classify_error(TimeoutError()), ERROR_TRANSIENT)
+        self.assertEqual(
+            classify_error(ValueError("Video is private")), ERROR_PERMANENT
+        )
+        self.assertEqual(classify_error(ValueError("429 pages")), ERROR_UNKNOWN)
+
+
+class FailureReasonTest(FakeBackendTestCase):
+    def gemini_profile(self):
+        # 生成結果が空の応答を返す
+        profile = super().gemini_profile()
+        profile.transcript_chars = 0
+        return profile
+
+    def failure_of(self, video):
+        """記録された失敗の分類"""
+        return self.state.retry_block(video)["error_class"]
+
+    def test_empty_response_is_recorded_as_empty(self):
+        video = make_video(1)
+        jobs = self.run_pipeline([video])
+
+        self.assertFalse(jobs[0].success)
+        self.assertEqual(jobs[0].failure_reason, ERROR_EMPTY)
+        self.assertEqual(self.failure_of(video), ERROR_EMPTY)
+
+    def test_empty_stream_is_recorded_as_transient(self):
+        video = make_video(1)
+        with mock.patch.object(config, "STREAMING_MODE", True):
+            jobs = self.run_pipeline([video])
+
+        self.assertFalse(jobs[0].success)
+        self.assertEqual(jobs[0].failure_reason, ERROR_TRANSIENT)
+        self.assertEqual(self.failure_of(video), ERROR_TRANSIENT)
+
+
+if __name__ == "__main__":
+    unittest.main()
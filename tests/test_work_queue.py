@@ -0,0 +1,144 @@
+"""
+作業キュー（src/work_queue.py）のテスト
+同じデータベースファイルを複数のプロセスで共有し、リースの取得・期限切れ後の引き継ぎ・
+ハートビートによる延長・重複のない分担を確認する
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+from src.work_queue import WorkQueue
+
+ITEM_COUNT = 40
+PROCESS_COUNT = 4
+
+
+def _acquire_once(db_path, worker_id, lease_seconds, item_id, results):
+    """別プロセスで1件のリースを取得し、結果を返す"""
+    queue = WorkQueue(db_path, worker_id=worker_id, lease_seconds=lease_seconds)
+    try:
+        results.put(queue.acquire(item_id, f"video-{item_id}"))
+    finally:
+        queue.close()
+
+
+def _process_all(db_path, worker_id, start, results):
+    """別プロセスですべての項目のリース取得を試み、取得できた項目を処理済みにする"""
+    queue = WorkQueue(db_path, worker_id=worker_id, lease_seconds=60)
+    acquired = []
+    try:
+        start.wait()
+        for i in range(ITEM_COUNT):
+            item_id = f"item-{i}"
+            if queue.acquire(item_id, f"video-{i}"):
+                acquired.append(item_id)
+                # 処理中に他のプロセスが取得を試みる余地を作る
+                time.sleep(0.005)
+                queue.complete(item_id)
+    finally:
+        queue.close()
+        results.put((worker_id, acquired))
+
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, "queue.db")
+        self.ctx = multiprocessing.get_context("spawn")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run(self, target, *args):
+        """別プロセスで target を実行し、結果を1件返す"""
+        results = self.ctx.Queue()
+        process = self.ctx.Process(target=target, args=(*args, results))
+        process.start()
+        result = results.get(timeout=30)
+        process.join(timeout=30)
+        self.assertEqual(process.exitcode, 0)
+        return result
+
+    def test_uses_wal(self):
+        queue = WorkQueue(self.db_path, worker_id="a")
+        try:
+            mode = queue._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            queue.close()
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_acquire_excludes_other_processes(self):
+        queue = WorkQueue(self.db_path, worker_id="a", lease_seconds=60)
+        try:
+            self.assertTrue(queue.acquire("item", "video"))
+            # 保持しているリースは再取得できる
+            self.assertTrue(queue.acquire("item", "video"))
+            self.assertFalse(self._run(_acquire_once, self.db_path, "b", 60, "item"))
+
+            # 解放した項目は他のワーカーが取得できる
+            queue.release("item")
+            self.assertTrue(self._run(_acquire_once, self.db_path, "b", 60, "item"))
+            # 処理完了の項目はどのワーカーも取得できない
+            self.assertTrue(queue.acquire("done", "video"))
+            queue.complete("done")
+            self.assertFalse(self._run(_acquire_once, self.db_path, "b", 60, "done"))
+            self.assertFalse(queue.acquire("done", "video"))
+        finally:
+            queue.close()
+
+    def test_expired_lease_is_reclaimed(self):
+        queue = WorkQueue(self.db_path, worker_id="a", lease_seconds=0.5)
+        try:
+            self.assertTrue(queue.acquire("item", "video"))
+            time.sleep(0.6)
+            self.assertTrue(self._run(_acquire_once, self.db_path, "b", 60, "item"))
+            # 引き継がれたリースは延長・完了できない
+            self.assertFalse(queue.renew("item"))
+            queue.complete("item")
+            self.assertFalse(self._run(_acquire_once, self.db_path, "c", 60, "item"))
+        finally:
+            queue.close()
+
+    def test_heartbeat_extends_lease(self):
+        queue = WorkQueue(self.db_path, worker_id="a", lease_seconds=1.0)
+        try:
+            self.assertTrue(queue.acquire("item", "video"))
+            # 期間の1/3ごとに延長し、当初の期限を過ぎても保持し続ける
+            for _ in range(5):
+                time.sleep(0.3)
+                self.assertEqual(queue.heartbeat(), 1)
+            self.assertFalse(self._run(_acquire_once, self.db_path, "b", 60, "item"))
+            self.assertTrue(queue.renew("item"))
+        finally:
+            queue.close()
+
+    def test_processes_do_not_overlap(self):
+        # 事前にテーブルを作成（各プロセスの初期化が競合しないように）
+        WorkQueue(self.db_path, worker_id="setup").close()
+        results = self.ctx.Queue()
+        start = self.ctx.Event()
+        processes = [
+            self.ctx.Process(
+                target=_process_all,
+                args=(self.db_path, f"worker-{i}", start, results),
+            )
+            for i in range(PROCESS_COUNT)
+        ]
+        for process in processes:
+            process.start()
+        start.set()
+        acquired = dict(results.get(timeout=60) for _ in processes)
+        for process in processes:
+            process.join(timeout=30)
+            self.assertEqual(process.exitcode, 0)
+
+        processed = [item for items in acquired.values() for item in items]
+        self.assertEqual(len(processed), len(set(processed)))
+        self.assertEqual(set(processed), {f"item-{i}" for i in range(ITEM_COUNT)})
+
+
+if __name__ == "__main__":
+    unittest.main()